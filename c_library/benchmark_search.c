@@ -0,0 +1,203 @@
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+#include <time.h>
+#ifdef _WIN32
+#include <windows.h>
+#endif
+#include "search.h"
+
+// 搜索内核微基准测试
+// 由 benchmark_search.py 与搜索库源码一起编译运行，也可手动编译：
+//   gcc -O2 -o benchmark_search benchmark_search.c search.c ...
+// 用法：benchmark_search [项数量]
+
+static unsigned int bench_seed = 20240601u;
+
+static unsigned int bench_rand() {
+    bench_seed = bench_seed * 1103515245u + 12345u;
+    return (bench_seed >> 8) & 0xFFFFFF;
+}
+
+static const char* ascii_words[] = {
+    "report", "data", "project", "src", "lib", "test", "photo", "backup",
+    "config", "main", "module", "release", "draft", "summary", "invoice", "notes"
+};
+
+static const char* cjk_words[] = {
+    "报告", "文档", "项目", "数据", "图片", "会议", "记录", "总结",
+    "合同", "发票", "备份", "草稿", "计划", "资料", "工作", "学习"
+};
+
+static const char* extensions[] = {".txt", ".docx", ".xlsx", ".pdf", ".png", ".py"};
+
+// 生成形如 /home/user/<词><数字>/<词><数字>/<词><词>.ext 的路径
+static char** generate_corpus(int count, const char** words, int word_count) {
+    char** items = (char**)malloc(sizeof(char*) * count);
+    char buffer[512];
+    for (int i = 0; i < count; i++) {
+        int len = snprintf(buffer, sizeof(buffer), "/home/user");
+        int depth = 2 + bench_rand() % 3;
+        for (int d = 0; d < depth; d++) {
+            len += snprintf(buffer + len, sizeof(buffer) - len, "/%s%u",
+                            words[bench_rand() % word_count], bench_rand() % 100);
+        }
+        len += snprintf(buffer + len, sizeof(buffer) - len, "/%s%s%s",
+                        words[bench_rand() % word_count], words[bench_rand() % word_count],
+                        extensions[bench_rand() % 6]);
+        items[i] = (char*)malloc(len + 1);
+        memcpy(items[i], buffer, len + 1);
+    }
+    return items;
+}
+
+static void free_corpus(char** items, int count) {
+    for (int i = 0; i < count; i++) free(items[i]);
+    free(items);
+}
+
+// 墙钟时间（秒）；多线程测试不能使用 clock()，它统计的是所有线程的CPU时间
+static double wall_time() {
+#ifdef _WIN32
+    LARGE_INTEGER freq, now;
+    QueryPerformanceFrequency(&freq);
+    QueryPerformanceCounter(&now);
+    return (double)now.QuadPart / freq.QuadPart;
+#else
+    struct timespec ts;
+    clock_gettime(CLOCK_MONOTONIC, &ts);
+    return ts.tv_sec + ts.tv_nsec / 1e9;
+#endif
+}
+
+static double seconds_since(double start) {
+    return wall_time() - start;
+}
+
+static void report(const char* label, double seconds, int pairs, int matches) {
+    printf("  %-28s %8.3f s  %9.1f ns/pair  %7d matches\n",
+           label, seconds, seconds * 1e9 / (pairs > 0 ? pairs : 1), matches);
+}
+
+// 对比旧的字节级全矩阵实现与新的有界码点实现（对路径与文件名分别测试）
+static void bench_edit_distance(const char* corpus_name, char** items, int count, const char* keyword, int k) {
+    printf("[edit distance] corpus=%s keyword=\"%s\" k=%d items=%d\n", corpus_name, keyword, k, count);
+
+    for (int scope = 0; scope < 2; scope++) {
+        const char* scope_name = scope == 0 ? "path" : "basename";
+        char label[64];
+
+        double start = wall_time();
+        int matches = 0;
+        for (int i = 0; i < count; i++) {
+            const char* text = scope == 0 ? items[i] : path_basename(items[i]);
+            if (levenshtein_distance(text, keyword) <= k) matches++;
+        }
+        snprintf(label, sizeof(label), "levenshtein (%s)", scope_name);
+        report(label, seconds_since(start), count, matches);
+
+        EditScratch* scratch = create_edit_scratch();
+        start = wall_time();
+        matches = 0;
+        for (int i = 0; i < count; i++) {
+            const char* text = scope == 0 ? items[i] : path_basename(items[i]);
+            if (bounded_edit_distance(text, keyword, k, scratch) <= k) matches++;
+        }
+        snprintf(label, sizeof(label), "bounded myers (%s)", scope_name);
+        report(label, seconds_since(start), count, matches);
+        free_edit_scratch(scratch);
+    }
+}
+
+// 对比区分大小写的 strstr 线性搜索与忽略大小写的搜索
+static void bench_substring(const char* corpus_name, char** items, int count, const char* keyword) {
+    printf("[substring] corpus=%s keyword=\"%s\" items=%d\n", corpus_name, keyword, count);
+
+    double start = wall_time();
+    SearchResult* result = linear_search((const char**)items, count, keyword);
+    report("strstr (case-sensitive)", seconds_since(start), count, result->count);
+    free_search_result(result);
+
+    start = wall_time();
+    result = case_insensitive_search((const char**)items, count, keyword);
+    report("folded (ignore case)", seconds_since(start), count, result->count);
+    free_search_result(result);
+}
+
+// perform_search 在不同线程数下的耗时（0表示按CPU核数自动选择）
+static void bench_threads(const char* corpus_name, char** items, int count, const char* keyword, bool use_fuzzy, bool ignore_case) {
+    printf("[threads] corpus=%s keyword=\"%s\" fuzzy=%d ignore_case=%d items=%d cpus=%d\n",
+           corpus_name, keyword, use_fuzzy, ignore_case, count, search_pool_default_threads());
+    int thread_counts[] = {1, 2, 4, 0};
+    for (int t = 0; t < 4; t++) {
+        char label[64];
+        snprintf(label, sizeof(label), "perform_search threads=%d", thread_counts[t]);
+        double start = wall_time();
+        SearchResult* result = perform_search((const char**)items, count, keyword, false, use_fuzzy, 2, ignore_case, thread_counts[t], NULL);
+        report(label, seconds_since(start), count, result->count);
+        free_search_result(result);
+    }
+}
+
+// 相关度排序：取前 K 项（有界堆）与取全部匹配项的耗时
+static void bench_ranked(const char* corpus_name, char** items, int count, const char* keyword) {
+    printf("[ranked] corpus=%s keyword=\"%s\" items=%d\n", corpus_name, keyword, count);
+    ItemSet set = {(const char**)items, NULL, NULL, count, NULL, false, NULL};
+    int limits[] = {20, 200, 0};
+    for (int l = 0; l < 3; l++) {
+        char label[64];
+        snprintf(label, sizeof(label), "ranked_search limit=%d", limits[l]);
+        double start = wall_time();
+        SearchOptions options = {false, false, 0, 1, true, limits[l], false, NULL, false, NULL, 0, 0};
+        SearchResult* result = ranked_search(&set, keyword, &options);
+        report(label, seconds_since(start), count, result->count);
+        free_search_result(result);
+    }
+}
+
+// 模糊搜索：有无q-gram签名预过滤的耗时（签名在计时之外预先计算，与语料库追加时一致）
+static void bench_qgram_filter(const char* corpus_name, char** items, int count, const char* keyword, int k) {
+    printf("[qgram filter] corpus=%s keyword=\"%s\" k=%d items=%d\n", corpus_name, keyword, k, count);
+    QgramSignature* signatures = (QgramSignature*)malloc(sizeof(QgramSignature) * count);
+    for (int i = 0; i < count; i++) {
+        size_t len = strlen(items[i]);
+        qgram_signature(items[i], len, path_basename_offset(items[i], len), &signatures[i]);
+    }
+    for (int scope = 0; scope < 2; scope++) {
+        for (int filtered = 0; filtered < 2; filtered++) {
+            char label[64];
+            snprintf(label, sizeof(label), "%s (%s)", filtered ? "qgram + myers" : "myers", scope == 0 ? "path" : "basename");
+            ItemSet set = {(const char**)items, NULL, NULL, count, NULL, scope == 1, filtered ? signatures : NULL};
+            SearchOptions options = {true, false, k, 1, false, 0, false, NULL, false, NULL, 0, 0};
+            double start = wall_time();
+            SearchResult* result = search_item_set(&set, keyword, &options);
+            report(label, seconds_since(start), count, result->count);
+            free_search_result(result);
+        }
+    }
+    free(signatures);
+}
+
+int main(int argc, char** argv) {
+    int count = argc > 1 ? atoi(argv[1]) : 200000;
+    if (count <= 0) count = 200000;
+
+    char** ascii_items = generate_corpus(count, ascii_words, 16);
+    char** cjk_items = generate_corpus(count, cjk_words, 16);
+
+    bench_edit_distance("ascii", ascii_items, count, "reportdata.txt", 2);
+    bench_edit_distance("cjk", cjk_items, count, "报告总结.docx", 2);
+    bench_substring("ascii", ascii_items, count, "Summary");
+    bench_substring("ascii", ascii_items, count, "data.PDF");
+    bench_substring("cjk", cjk_items, count, "会议记录");
+    bench_threads("ascii", ascii_items, count, "Summary", false, true);
+    bench_threads("ascii", ascii_items, count, "reportdata.txt", true, false);
+    bench_qgram_filter("ascii", ascii_items, count, "reportdata.txt", 2);
+    bench_qgram_filter("ascii", ascii_items, count, "summary.pdf", 1);
+    bench_ranked("ascii", ascii_items, count, "sumrep");
+    bench_ranked("cjk", cjk_items, count, "会议");
+
+    free_corpus(ascii_items, count);
+    free_corpus(cjk_items, count);
+    return 0;
+}
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+搜索内核基准测试脚本
+将 benchmark_search.c 与搜索库源码一起编译为可执行文件并运行
+"""
+import os
+import sys
+import subprocess
+import platform
+import tempfile
+
+from build_search_lib import SEARCH_SOURCES, check_command
+
+def run_benchmark(item_count=None):
+    """编译并运行基准测试程序"""
+    current_dir = os.path.dirname(os.path.abspath(__file__))
+    compiler = 'cc' if platform.system() == 'Darwin' else 'gcc'
+    if not check_command(compiler):
+        print(f"提示: 未找到编译器 {compiler}，无法运行基准测试")
+        return False
+
+    exe_name = 'benchmark_search.exe' if platform.system() == 'Windows' else 'benchmark_search'
+    with tempfile.TemporaryDirectory() as build_dir:
+        exe_path = os.path.join(build_dir, exe_name)
+        cmd = [compiler, '-O2', '-o', exe_path, 'benchmark_search.c'] + SEARCH_SOURCES
+        if platform.system() != 'Windows':
+            cmd.append('-pthread')
+        print(f"编译命令: {' '.join(cmd)}")
+        try:
+            subprocess.run(cmd, cwd=current_dir, check=True)
+            args = [exe_path] + ([str(item_count)] if item_count else [])
+            subprocess.run(args, check=True)
+        except subprocess.CalledProcessError as e:
+            print(f"基准测试失败! 错误代码: {e.returncode}")
+            return False
+    return True
+
+def main():
+    print("搜索内核基准测试")
+    print("=" * 50)
+    item_count = int(sys.argv[1]) if len(sys.argv) > 1 else None
+    return 0 if run_benchmark(item_count) else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -8,15 +8,18 @@ import sys
 import subprocess
 import platform
 
+# 搜索库由多个源文件编译而成
+SEARCH_SOURCES = ['search.c', 'trigram_index.c', 'suffix_array.c', 'fuzzy_index.c', 'thread_pool.c', 'corpus.c', 'ranked_search.c', 'regex_search.c']
+
 def build_library():
     """根据平台编译动态链接库"""
     # 获取当前目录
     current_dir = os.path.dirname(os.path.abspath(__file__))
     
     # C源文件
-    source_search = 'search.c'
+    search_sources = SEARCH_SOURCES
     source_scanner = 'directory_scanner.c'
-    header_files = ['search.h']
+    header_files = ['search.h', 'platform_sync.h']
     
     # 根据平台设置输出文件名和编译命令
     if platform.system() == 'Windows':
@@ -24,29 +27,29 @@ def build_library():
         compiler = 'gcc' if check_command('gcc') else 'cl'
         if compiler == 'gcc':
             cmds = [
-                ['gcc', '-shared', '-o', outputs[0], '-O2', source_search],
+                ['gcc', '-shared', '-o', outputs[0], '-O2'] + search_sources,
                 ['gcc', '-shared', '-o', outputs[1], '-O2', source_scanner],
             ]
         else:
             cmds = [
-                ['cl', '/LD', '/Fe:' + outputs[0], '/Ox', source_search],
+                ['cl', '/LD', '/Fe:' + outputs[0], '/Ox'] + search_sources,
                 ['cl', '/LD', '/Fe:' + outputs[1], '/Ox', source_scanner],
             ]
     elif platform.system() == 'Darwin':
         outputs = ['libsearch.dylib', 'libdirectory_scanner.dylib']
         cmds = [
-            ['cc', '-dynamiclib', '-o', outputs[0], '-fPIC', '-O2', source_search],
+            ['cc', '-dynamiclib', '-o', outputs[0], '-fPIC', '-O2'] + search_sources,
             ['cc', '-dynamiclib', '-o', outputs[1], '-fPIC', '-O2', source_scanner],
         ]
     else:
         outputs = ['libsearch.so', 'libdirectory_scanner.so']
         cmds = [
-            ['gcc', '-shared', '-o', outputs[0], '-fPIC', '-O2', source_search],
+            ['gcc', '-shared', '-o', outputs[0], '-fPIC', '-O2', '-pthread'] + search_sources,
             ['gcc', '-shared', '-o', outputs[1], '-fPIC', '-O2', source_scanner],
         ]
     
     # 检查源文件是否存在
-    for file in [source_search, source_scanner] + header_files:
+    for file in search_sources + [source_scanner] + header_files:
         if not os.path.exists(os.path.join(current_dir, file)):
             print(f"错误: 文件不存在: {file}")
             return False
@@ -0,0 +1,681 @@
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+#include <stdbool.h>
+#include "search.h"
+#include "platform_sync.h"
+
+// 路径语料库
+// 文件路径以连续存储形式（各项以'\0'结尾依次拼接，另有起始偏移数组）常驻C内存，
+// 追加时同时记录每项文件名部分的偏移（只搜索文件名时无需再逐项查找路径分隔符）与q-gram签名（模糊搜索的预过滤）；
+// 扫描过程中可分批追加，查询只需传入语料库句柄，不再跨越 ctypes 边界逐项传递路径。
+//
+// 并发约定：追加与查询可以在不同线程同时进行。查询在锁内取得 (blob, offsets, count) 快照后
+// 解锁搜索；追加只写入快照范围之外的位置。扩容产生的旧缓冲区在没有查询引用时才释放。
+
+// 扩展名字典：折叠为小写的扩展名 -> 编号（从1开始，0表示没有扩展名）
+#define CORPUS_MAX_EXTENSION_BYTES 32
+
+typedef struct {
+    char** names;               // names[id]，names[0] 未使用
+    int count;                  // 已分配的编号数（含0）
+    int names_capacity;
+    int* slots;                 // 开放寻址哈希表，存放编号，0表示空位
+    int slot_capacity;          // 2的幂
+} ExtensionTable;
+
+struct SearchCorpus {
+    pool_mutex_t lock;          // 保护以下所有字段
+    char* blob;
+    long long blob_len;
+    long long blob_capacity;
+    long long* offsets;         // count + 1 项
+    int* basename_offsets;      // 各项文件名部分相对项起始的字节偏移，容量同 offsets
+    int* extension_ids;         // 各项扩展名在 extensions 中的编号，容量同 offsets
+    QgramSignature* signatures; // 各项路径与文件名的q-gram签名，容量同 offsets
+    ExtensionTable extensions;
+    int* path_order;            // 前 path_order_count 项按路径字节序排序后的索引，用于目录前缀查询
+    int path_order_count;
+    int* basename_order;        // 同样的项按文件名（折叠ASCII大小写）排序后的索引，用于文件名前缀查询
+    bool order_building;        // 正在构建排序，同一时间只有一个线程构建
+    pool_cond_t order_built;    // 排序构建完成时广播，等待中的构建请求据此复用结果
+    int count;
+    int offsets_capacity;
+    int readers;                // 正在进行的查询数
+    void** retired;             // 扩容后等待释放的旧缓冲区
+    int retired_count;
+    int retired_capacity;
+    const char** item_pointers; // corpus_items_acquire 返回的指针数组
+    int item_pointers_count;    // item_pointers 对应的项数，-1 表示已失效
+};
+
+SearchCorpus* corpus_create() {
+    SearchCorpus* corpus = (SearchCorpus*)calloc(1, sizeof(SearchCorpus));
+    pool_mutex_init(&corpus->lock);
+    pool_cond_init(&corpus->order_built);
+    corpus->blob_capacity = 4096;
+    corpus->blob = (char*)malloc(corpus->blob_capacity);
+    corpus->offsets_capacity = 1024;
+    corpus->offsets = (long long*)malloc(sizeof(long long) * corpus->offsets_capacity);
+    corpus->offsets[0] = 0;
+    corpus->basename_offsets = (int*)malloc(sizeof(int) * corpus->offsets_capacity);
+    corpus->extension_ids = (int*)malloc(sizeof(int) * corpus->offsets_capacity);
+    corpus->signatures = (QgramSignature*)malloc(sizeof(QgramSignature) * corpus->offsets_capacity);
+    corpus->extensions.count = 1;
+    corpus->extensions.names_capacity = 64;
+    corpus->extensions.names = (char**)calloc(corpus->extensions.names_capacity, sizeof(char*));
+    corpus->extensions.slot_capacity = 128;
+    corpus->extensions.slots = (int*)calloc(corpus->extensions.slot_capacity, sizeof(int));
+    corpus->item_pointers_count = -1;
+    return corpus;
+}
+
+// 释放或暂存被替换的缓冲区（调用时持有锁）
+static void corpus_retire(SearchCorpus* corpus, void* buffer) {
+    if (corpus->readers == 0) {
+        free(buffer);
+        return;
+    }
+    if (corpus->retired_count >= corpus->retired_capacity) {
+        corpus->retired_capacity = corpus->retired_capacity ? corpus->retired_capacity * 2 : 8;
+        corpus->retired = (void**)realloc(corpus->retired, sizeof(void*) * corpus->retired_capacity);
+    }
+    corpus->retired[corpus->retired_count++] = buffer;
+}
+
+// 扩容时复制到新缓冲区而不是 realloc，正在进行的查询仍可读取旧缓冲区
+static void* corpus_grow(SearchCorpus* corpus, void* buffer, long long used_bytes, long long new_bytes) {
+    void* grown = malloc(new_bytes);
+    memcpy(grown, buffer, used_bytes);
+    corpus_retire(corpus, buffer);
+    return grown;
+}
+
+static unsigned int extension_hash(const char* ext, size_t len) {
+    unsigned int hash = 2166136261u;
+    for (size_t i = 0; i < len; i++) {
+        hash = (hash ^ (unsigned char)ext[i]) * 16777619u;
+    }
+    return hash;
+}
+
+// 取文件名中最后一个'.'之后的扩展名并折叠为小写写入 out（与目录扫描的扩展名规则一致），
+// 返回其长度；没有扩展名或超过 CORPUS_MAX_EXTENSION_BYTES 时返回 -1
+static int fold_extension(const char* name, size_t len, char* out) {
+    size_t dot = len;
+    while (dot > 0 && name[dot - 1] != '.') dot--;
+    if (dot == 0 || len - dot > CORPUS_MAX_EXTENSION_BYTES) return -1;
+    for (size_t i = dot; i < len; i++) {
+        out[i - dot] = (char)to_lower((unsigned char)name[i]);
+    }
+    return (int)(len - dot);
+}
+
+// 查找已折叠的扩展名的编号，不存在时返回0
+static int extension_lookup(const ExtensionTable* table, const char* ext, size_t len) {
+    unsigned int mask = (unsigned int)table->slot_capacity - 1;
+    for (unsigned int slot = extension_hash(ext, len) & mask; table->slots[slot] != 0; slot = (slot + 1) & mask) {
+        const char* name = table->names[table->slots[slot]];
+        if (strlen(name) == len && memcmp(name, ext, len) == 0) {
+            return table->slots[slot];
+        }
+    }
+    return 0;
+}
+
+// 返回已折叠的扩展名的编号，不存在时分配新编号（调用时持有锁）
+static int extension_intern(ExtensionTable* table, const char* ext, size_t len) {
+    int id = extension_lookup(table, ext, len);
+    if (id != 0) return id;
+
+    if (table->count >= table->names_capacity) {
+        table->names_capacity *= 2;
+        table->names = (char**)realloc(table->names, sizeof(char*) * table->names_capacity);
+    }
+    id = table->count++;
+    table->names[id] = (char*)malloc(len + 1);
+    memcpy(table->names[id], ext, len);
+    table->names[id][len] = '\0';
+
+    if (table->count * 2 > table->slot_capacity) {
+        // 负载超过一半时扩容并重新插入全部编号
+        free(table->slots);
+        table->slot_capacity *= 2;
+        table->slots = (int*)calloc(table->slot_capacity, sizeof(int));
+        for (int existing = 1; existing < table->count; existing++) {
+            const char* name = table->names[existing];
+            unsigned int mask = (unsigned int)table->slot_capacity - 1;
+            unsigned int slot = extension_hash(name, strlen(name)) & mask;
+            while (table->slots[slot] != 0) slot = (slot + 1) & mask;
+            table->slots[slot] = existing;
+        }
+    } else {
+        unsigned int mask = (unsigned int)table->slot_capacity - 1;
+        unsigned int slot = extension_hash(ext, len) & mask;
+        while (table->slots[slot] != 0) slot = (slot + 1) & mask;
+        table->slots[slot] = id;
+    }
+    return id;
+}
+
+// 追加一批项：data 为 item_count 个以'\0'结尾的UTF-8字符串依次拼接，长度 data_len
+// 返回追加后的项数，数据格式不符时返回 -1 且不做修改
+int corpus_append(SearchCorpus* corpus, const char* data, long long data_len, int item_count) {
+    if (corpus == NULL || item_count < 0 || data_len < 0 || (data_len > 0 && data == NULL)) {
+        return -1;
+    }
+    if (item_count == 0) {
+        return data_len == 0 ? corpus_count(corpus) : -1;
+    }
+    if (data[data_len - 1] != '\0') {
+        return -1;
+    }
+
+    // 先在锁外统计分隔符，确认项数一致
+    int separators = 0;
+    const char* p = data;
+    const char* end = data + data_len;
+    while (p < end) {
+        const char* nul = (const char*)memchr(p, '\0', end - p);
+        separators++;
+        p = nul + 1;
+    }
+    if (separators != item_count) {
+        return -1;
+    }
+    // q-gram签名的计算量较大，同样在锁外完成
+    QgramSignature* signatures = (QgramSignature*)malloc(sizeof(QgramSignature) * item_count);
+    p = data;
+    for (int i = 0; i < item_count; i++) {
+        const char* nul = (const char*)memchr(p, '\0', end - p);
+        size_t len = (size_t)(nul - p);
+        qgram_signature(p, len, path_basename_offset(p, len), &signatures[i]);
+        p = nul + 1;
+    }
+
+    pool_mutex_lock(&corpus->lock);
+    if (corpus->blob_len + data_len > corpus->blob_capacity) {
+        long long capacity = corpus->blob_capacity;
+        while (capacity < corpus->blob_len + data_len) capacity *= 2;
+        corpus->blob = (char*)corpus_grow(corpus, corpus->blob, corpus->blob_len, capacity);
+        corpus->blob_capacity = capacity;
+    }
+    if ((long long)corpus->count + item_count + 1 > corpus->offsets_capacity) {
+        long long capacity = corpus->offsets_capacity;
+        while (capacity < (long long)corpus->count + item_count + 1) capacity *= 2;
+        corpus->offsets = (long long*)corpus_grow(corpus, corpus->offsets,
+                                                  sizeof(long long) * ((long long)corpus->count + 1),
+                                                  sizeof(long long) * capacity);
+        corpus->basename_offsets = (int*)corpus_grow(corpus, corpus->basename_offsets,
+                                                     sizeof(int) * (long long)corpus->count,
+                                                     sizeof(int) * capacity);
+        corpus->extension_ids = (int*)corpus_grow(corpus, corpus->extension_ids,
+                                                  sizeof(int) * (long long)corpus->count,
+                                                  sizeof(int) * capacity);
+        corpus->signatures = (QgramSignature*)corpus_grow(corpus, corpus->signatures,
+                                                          sizeof(QgramSignature) * (long long)corpus->count,
+                                                          sizeof(QgramSignature) * capacity);
+        corpus->offsets_capacity = (int)capacity;
+    }
+
+    long long base = corpus->blob_len;
+    memcpy(corpus->blob + base, data, data_len);
+    int index = corpus->count;
+    char ext[CORPUS_MAX_EXTENSION_BYTES];
+    p = data;
+    while (p < end) {
+        const char* nul = (const char*)memchr(p, '\0', end - p);
+        size_t name_offset = path_basename_offset(p, (size_t)(nul - p));
+        int ext_len = fold_extension(p + name_offset, (size_t)(nul - p) - name_offset, ext);
+        corpus->basename_offsets[index] = (int)name_offset;
+        corpus->extension_ids[index] = ext_len < 0 ? 0 : extension_intern(&corpus->extensions, ext, (size_t)ext_len);
+        corpus->offsets[++index] = base + (nul + 1 - data);
+        p = nul + 1;
+    }
+    memcpy(corpus->signatures + corpus->count, signatures, sizeof(QgramSignature) * item_count);
+    // 数据写入完成后再更新项数，之后的查询快照才能看到新项
+    corpus->blob_len = base + data_len;
+    corpus->count = index;
+    int count = corpus->count;
+    pool_mutex_unlock(&corpus->lock);
+    free(signatures);
+    return count;
+}
+
+int corpus_count(SearchCorpus* corpus) {
+    if (corpus == NULL) return 0;
+    pool_mutex_lock(&corpus->lock);
+    int count = corpus->count;
+    pool_mutex_unlock(&corpus->lock);
+    return count;
+}
+
+static int compare_indices(const void* a, const void* b) {
+    int x = *(const int*)a;
+    int y = *(const int*)b;
+    return (x > y) - (x < y);
+}
+
+// 开始一次查询：取得当前内容的快照并登记读者，期间扩容不会释放快照引用的缓冲区
+static ItemSet corpus_begin_read(SearchCorpus* corpus) {
+    pool_mutex_lock(&corpus->lock);
+    ItemSet set = {NULL, corpus->blob, corpus->offsets, corpus->count, corpus->basename_offsets, false, corpus->signatures};
+    corpus->readers++;
+    pool_mutex_unlock(&corpus->lock);
+    return set;
+}
+
+// 结束查询，最后一个读者负责释放等待释放的旧缓冲区
+static void corpus_end_read(SearchCorpus* corpus) {
+    pool_mutex_lock(&corpus->lock);
+    if (--corpus->readers == 0) {
+        for (int i = 0; i < corpus->retired_count; i++) {
+            free(corpus->retired[i]);
+        }
+        corpus->retired_count = 0;
+    }
+    pool_mutex_unlock(&corpus->lock);
+}
+
+// 取得指向存储区内各项的指针数组（供需要 const char** 的索引接口使用），*count 为数组的项数。
+// 与查询一样登记为读者：调用 corpus_items_release 之前，追加与扩容都不会释放数组及其引用的存储区
+const char** corpus_items_acquire(SearchCorpus* corpus, int* count) {
+    if (corpus == NULL || count == NULL) return NULL;
+    pool_mutex_lock(&corpus->lock);
+    if (corpus->item_pointers_count != corpus->count || corpus->item_pointers == NULL) {
+        // 旧数组可能仍被其他读者使用，与扩容的旧缓冲区一样延迟释放
+        if (corpus->item_pointers != NULL) {
+            corpus_retire(corpus, (void*)corpus->item_pointers);
+        }
+        corpus->item_pointers = (const char**)malloc(sizeof(const char*) * (corpus->count > 0 ? corpus->count : 1));
+        for (int i = 0; i < corpus->count; i++) {
+            corpus->item_pointers[i] = corpus->blob + corpus->offsets[i];
+        }
+        corpus->item_pointers_count = corpus->count;
+    }
+    const char** items = corpus->item_pointers;
+    *count = corpus->item_pointers_count;
+    corpus->readers++;
+    pool_mutex_unlock(&corpus->lock);
+    return items;
+}
+
+// 结束对 corpus_items_acquire 返回的数组的使用
+void corpus_items_release(SearchCorpus* corpus) {
+    if (corpus == NULL) return;
+    corpus_end_read(corpus);
+}
+
+// 在语料库当前已有的项中搜索，结果按索引升序（排序搜索按得分排序）
+SearchResult* corpus_search(SearchCorpus* corpus, const char* keyword, const SearchOptions* options) {
+    if (corpus == NULL || keyword == NULL || options == NULL) {
+        return NULL;
+    }
+
+    ItemSet set = corpus_begin_read(corpus);
+    SearchResult* result = search_item_set(&set, keyword, options);
+    corpus_end_read(corpus);
+    return result;
+}
+
+// 只在 candidates 列出的项（升序索引，通常是上一次较短关键词的匹配结果）中搜索
+// 返回的索引与 corpus_search 相同，均为语料库中的索引；候选索引越界或未升序时返回 NULL
+SearchResult* corpus_search_subset(SearchCorpus* corpus, const char* keyword, const SearchOptions* options, const int* candidates, int candidate_count) {
+    if (corpus == NULL || keyword == NULL || options == NULL || candidate_count < 0 ||
+        (candidate_count > 0 && candidates == NULL)) {
+        return NULL;
+    }
+
+    ItemSet snapshot = corpus_begin_read(corpus);
+    int previous = -1;
+    for (int i = 0; i < candidate_count; i++) {
+        if (candidates[i] <= previous || candidates[i] >= snapshot.count) {
+            corpus_end_read(corpus);
+            return NULL;
+        }
+        previous = candidates[i];
+    }
+    SearchResult* result = search_item_subset(&snapshot, candidates, candidate_count, keyword, options);
+    corpus_end_read(corpus);
+    return result;
+}
+
+// 在语料库中按正则表达式搜索，结果按索引升序；candidates 为 NULL 时搜索全部项，
+// 否则只搜索其中列出的项（升序），候选索引越界或未升序时返回 NULL
+SearchResult* corpus_regex_search(SearchCorpus* corpus, const SearchRegex* regex, const SearchOptions* options, const int* candidates, int candidate_count) {
+    if (corpus == NULL || regex == NULL || options == NULL || candidate_count < 0) {
+        return NULL;
+    }
+
+    ItemSet snapshot = corpus_begin_read(corpus);
+    SearchResult* result;
+    if (candidates == NULL) {
+        result = regex_search_item_set(&snapshot, regex, options);
+    } else {
+        int previous = -1;
+        for (int i = 0; i < candidate_count; i++) {
+            if (candidates[i] <= previous || candidates[i] >= snapshot.count) {
+                corpus_end_read(corpus);
+                return NULL;
+            }
+            previous = candidates[i];
+        }
+        result = regex_search_item_subset(&snapshot, candidates, candidate_count, regex, options);
+    }
+    corpus_end_read(corpus);
+    return result;
+}
+
+// 流式搜索语料库当前已有的项，匹配项分批通过 callback 交付，参见 search_item_set_stream
+// 回调在调用线程中执行
+SearchResult* corpus_search_stream(SearchCorpus* corpus, const char* keyword, const SearchOptions* options, int batch_size, SearchBatchCallback callback, void* context) {
+    if (corpus == NULL || keyword == NULL || options == NULL || callback == NULL) {
+        return NULL;
+    }
+
+    ItemSet set = corpus_begin_read(corpus);
+    SearchResult* result = search_item_set_stream(&set, keyword, options, batch_size, callback, context);
+    corpus_end_read(corpus);
+    return result;
+}
+
+// 按路径或文件名排序时使用的项
+typedef struct {
+    const char* text;
+    int index;
+} PathOrderEntry;
+
+// 比较 text 与 key：folded 为真时忽略ASCII大小写；prefix 为真时只比较前 key_len 个字节，
+// text 以 key 开头即视为相等（排序后以 key 开头的项连续排列，其前后的项分别小于、大于 key）
+static int order_compare(const char* text, const char* key, size_t key_len, bool folded, bool prefix) {
+    for (size_t i = 0; !prefix || i < key_len; i++) {
+        unsigned char a = (unsigned char)text[i];
+        unsigned char b = (unsigned char)key[i];
+        if (folded) {
+            a = to_lower(a);
+            b = to_lower(b);
+        }
+        if (a != b) return a < b ? -1 : 1;
+        if (a == '\0') return 0;
+    }
+    return 0;
+}
+
+static int compare_path_entries(const void* a, const void* b) {
+    const PathOrderEntry* x = (const PathOrderEntry*)a;
+    const PathOrderEntry* y = (const PathOrderEntry*)b;
+    int cmp = strcmp(x->text, y->text);
+    if (cmp != 0) return cmp;
+    return (x->index > y->index) - (x->index < y->index);
+}
+
+static int compare_basename_entries(const void* a, const void* b) {
+    const PathOrderEntry* x = (const PathOrderEntry*)a;
+    const PathOrderEntry* y = (const PathOrderEntry*)b;
+    int cmp = order_compare(x->text, y->text, 0, true, false);
+    if (cmp != 0) return cmp;
+    return (x->index > y->index) - (x->index < y->index);
+}
+
+// 按 compare 排序 set 的全部项（basename 为真时按文件名部分），返回排序后的索引数组
+static int* build_order(const ItemSet* set, bool basename, int (*compare)(const void*, const void*)) {
+    PathOrderEntry* entries = (PathOrderEntry*)malloc(sizeof(PathOrderEntry) * (set->count > 0 ? set->count : 1));
+    for (int i = 0; i < set->count; i++) {
+        entries[i].text = set->blob + set->offsets[i] + (basename ? set->basename_offsets[i] : 0);
+        entries[i].index = i;
+    }
+    qsort(entries, set->count, sizeof(PathOrderEntry), compare);
+    int* order = (int*)malloc(sizeof(int) * (set->count > 0 ? set->count : 1));
+    for (int i = 0; i < set->count; i++) {
+        order[i] = entries[i].index;
+    }
+    free(entries);
+    return order;
+}
+
+// 为当前已有的项构建按路径与按文件名排序的索引（前缀查询用二分查找定位区间），返回已排序的项数
+// 排序在锁外进行，期间的查询继续使用旧的排序结果；其他线程正在构建时等待其完成，
+// 完成的排序已覆盖当前全部项时直接返回，不重复排序
+int corpus_build_path_order(SearchCorpus* corpus) {
+    if (corpus == NULL) return 0;
+    pool_mutex_lock(&corpus->lock);
+    while (corpus->order_building) {
+        pool_cond_wait(&corpus->order_built, &corpus->lock);
+    }
+    if (corpus->path_order_count == corpus->count) {
+        int sorted = corpus->path_order_count;
+        pool_mutex_unlock(&corpus->lock);
+        return sorted;
+    }
+    corpus->order_building = true;
+    // 与 corpus_begin_read 相同：取得快照并登记读者
+    ItemSet set = {NULL, corpus->blob, corpus->offsets, corpus->count, corpus->basename_offsets, false, NULL};
+    corpus->readers++;
+    pool_mutex_unlock(&corpus->lock);
+
+    int* order = build_order(&set, false, compare_path_entries);
+    int* basename_order = build_order(&set, true, compare_basename_entries);
+
+    pool_mutex_lock(&corpus->lock);
+    if (corpus->path_order != NULL) corpus_retire(corpus, corpus->path_order);
+    if (corpus->basename_order != NULL) corpus_retire(corpus, corpus->basename_order);
+    corpus->path_order = order;
+    corpus->basename_order = basename_order;
+    corpus->path_order_count = set.count;
+    corpus->order_building = false;
+    pool_cond_broadcast(&corpus->order_built);
+    pool_mutex_unlock(&corpus->lock);
+    corpus_end_read(corpus);
+    return set.count;
+}
+
+// order 中第 k 项参与比较的文本（路径或文件名部分）
+static inline const char* order_text(const ItemSet* set, const int* order, int k, bool basename) {
+    int index = order[k];
+    return set->blob + set->offsets[index] + (basename ? set->basename_offsets[index] : 0);
+}
+
+// 在已排序的 order[from, count) 中查找与 key 比较（见 order_compare）相等的区间 [*lo, *hi)
+static void order_range(const ItemSet* set, const int* order, int from, int count, bool basename,
+                        const char* key, size_t key_len, bool prefix, int* lo, int* hi) {
+    int left = from, right = count;
+    while (left < right) {
+        int mid = left + (right - left) / 2;
+        if (order_compare(order_text(set, order, mid, basename), key, key_len, basename, prefix) < 0) left = mid + 1;
+        else right = mid;
+    }
+    *lo = left;
+    right = count;
+    while (left < right) {
+        int mid = left + (right - left) / 2;
+        if (order_compare(order_text(set, order, mid, basename), key, key_len, basename, prefix) <= 0) left = mid + 1;
+        else right = mid;
+    }
+    *hi = left;
+}
+
+// 第 i 项是否满足过滤条件：路径以 prefix 开头且扩展名编号在 allowed 中（allowed 为 NULL 表示不限）
+static bool corpus_filter_match(const ItemSet* set, const int* extension_ids, const bool* allowed, int i,
+                                const char* prefix, size_t prefix_len) {
+    if (allowed != NULL && !allowed[extension_ids[i]]) return false;
+    if (prefix_len == 0) return true;
+    size_t item_len = 0;
+    const char* item = item_set_get(set, i, &item_len);
+    return item_len >= prefix_len && memcmp(item, prefix, prefix_len) == 0;
+}
+
+// 按目录前缀与扩展名过滤语料库中的项，返回满足条件的项的索引（升序）
+// prefix 为 NULL 或空串时不限路径；extensions 为不带点的扩展名（忽略大小写），extension_count 为0时不限；
+// candidates 不为 NULL 时只在这些项（升序索引）中过滤，越界或未升序时返回 NULL。
+// 不指定 candidates 的前缀查询使用按路径排序的索引二分定位，排序之后追加的项逐项检查，
+// 未排序的项超过四分之一时先重新排序（其他线程正在排序时等待其完成）
+SearchResult* corpus_filter(SearchCorpus* corpus, const char* prefix, const char** extensions, int extension_count, const int* candidates, int candidate_count) {
+    if (corpus == NULL || extension_count < 0 || (extension_count > 0 && extensions == NULL) ||
+        (candidates != NULL && candidate_count < 0)) {
+        return NULL;
+    }
+    size_t prefix_len = prefix != NULL ? strlen(prefix) : 0;
+    if (candidates == NULL && prefix_len > 0) {
+        pool_mutex_lock(&corpus->lock);
+        bool stale = corpus->path_order_count < corpus->count - corpus->count / 4;
+        pool_mutex_unlock(&corpus->lock);
+        if (stale) corpus_build_path_order(corpus);
+    }
+
+    // 在锁内取得快照、扩展名编号与排序索引，并把扩展名映射为编号
+    pool_mutex_lock(&corpus->lock);
+    ItemSet set = {NULL, corpus->blob, corpus->offsets, corpus->count, corpus->basename_offsets, false, NULL};
+    const int* extension_ids = corpus->extension_ids;
+    const int* order = corpus->path_order;
+    int order_count = corpus->path_order_count;
+    bool* allowed = NULL;
+    if (extension_count > 0) {
+        allowed = (bool*)calloc(corpus->extensions.count, sizeof(bool));
+        char folded[CORPUS_MAX_EXTENSION_BYTES];
+        for (int e = 0; e < extension_count; e++) {
+            size_t len = extensions[e] != NULL ? strlen(extensions[e]) : 0;
+            if (len == 0 || len > CORPUS_MAX_EXTENSION_BYTES) continue;
+            for (size_t k = 0; k < len; k++) folded[k] = (char)to_lower((unsigned char)extensions[e][k]);
+            int id = extension_lookup(&corpus->extensions, folded, len);
+            if (id != 0) allowed[id] = true;
+        }
+    }
+    corpus->readers++;
+    pool_mutex_unlock(&corpus->lock);
+
+    SearchResult* result = init_search_result();
+    if (candidates != NULL) {
+        int previous = -1;
+        for (int i = 0; i < candidate_count; i++) {
+            int index = candidates[i];
+            if (index <= previous || index >= set.count) {
+                free_search_result(result);
+                result = NULL;
+                break;
+            }
+            previous = index;
+            if (corpus_filter_match(&set, extension_ids, allowed, index, prefix, prefix_len)) {
+                add_to_result(result, index);
+            }
+        }
+    } else if (prefix_len > 0 && order != NULL) {
+        int lo, hi;
+        order_range(&set, order, 0, order_count, false, prefix, prefix_len, true, &lo, &hi);
+        for (int k = lo; k < hi; k++) {
+            if (allowed == NULL || allowed[extension_ids[order[k]]]) {
+                add_to_result(result, order[k]);
+            }
+        }
+        qsort(result->indices, result->count, sizeof(int), compare_indices);
+        // 排序之后追加的项索引都更大，逐项检查后接在末尾仍保持升序
+        for (int i = order_count; i < set.count; i++) {
+            if (corpus_filter_match(&set, extension_ids, allowed, i, prefix, prefix_len)) {
+                add_to_result(result, i);
+            }
+        }
+    } else {
+        for (int i = 0; i < set.count; i++) {
+            if (corpus_filter_match(&set, extension_ids, allowed, i, prefix, prefix_len)) {
+                add_to_result(result, i);
+            }
+        }
+    }
+    free(allowed);
+    corpus_end_read(corpus);
+    return result;
+}
+
+// 路径以 prefix 开头之后的下一级路径（到下一个路径分隔符为止，含分隔符）的字节数，没有下一级时为整个路径的长度
+static size_t next_component_length(const char* path, size_t prefix_len) {
+    size_t i = prefix_len;
+    while (path[i] != '\0' && path[i] != '/' && path[i] != '\\') i++;
+    return path[i] == '\0' ? i : i + 1;
+}
+
+// 前缀区间查询（自动补全）：在排序索引中二分定位以 prefix 开头的项，按排序顺序返回最多 limit 项（0表示不限）。
+// basename_only 为真时按文件名前缀匹配（忽略ASCII大小写），否则按路径前缀匹配（区分大小写）；
+// distinct 为真时每个不同的补全只返回一项：文件名模式下文件名（忽略大小写）相同的项只取第一项，
+// 路径模式下 prefix 之后的下一级路径相同的项只取第一项，每次用二分查找跳过整组，
+// 因此返回 k 项的代价为 O(k log n)，与匹配项总数无关。
+// match_count 为匹配 prefix 的项数；排序之后追加的项逐项检查后接在末尾（不去重）。
+// 这里从不排序（补全在界面线程中调用）：排序由调用方在后台通过 corpus_build_path_order 更新，
+// 见 corpus_path_order_count
+SearchResult* corpus_prefix_range(SearchCorpus* corpus, const char* prefix, bool basename_only, bool distinct, int limit) {
+    if (corpus == NULL || prefix == NULL || limit < 0) {
+        return NULL;
+    }
+    pool_mutex_lock(&corpus->lock);
+    ItemSet set = {NULL, corpus->blob, corpus->offsets, corpus->count, corpus->basename_offsets, false, NULL};
+    const int* order = basename_only ? corpus->basename_order : corpus->path_order;
+    int order_count = order != NULL ? corpus->path_order_count : 0;
+    corpus->readers++;
+    pool_mutex_unlock(&corpus->lock);
+
+    size_t prefix_len = strlen(prefix);
+    SearchResult* result = init_search_result();
+    int lo, hi;
+    order_range(&set, order, 0, order_count, basename_only, prefix, prefix_len, true, &lo, &hi);
+    result->match_count = hi - lo;
+    int k = lo;
+    while (k < hi && (limit == 0 || result->count < limit)) {
+        add_to_result(result, order[k]);
+        if (!distinct) {
+            k++;
+            continue;
+        }
+        // 跳过与第 k 项给出相同补全的整组项
+        const char* text = order_text(&set, order, k, basename_only);
+        int group_lo, group_hi;
+        if (basename_only) {
+            order_range(&set, order, k, hi, true, text, 0, false, &group_lo, &group_hi);
+        } else {
+            size_t key_len = next_component_length(text, prefix_len);
+            order_range(&set, order, k, hi, false, text, key_len, text[key_len] != '\0', &group_lo, &group_hi);
+        }
+        k = group_hi > k ? group_hi : k + 1;
+    }
+    for (int i = order_count; i < set.count; i++) {
+        size_t item_len = 0;
+        const char* item = item_set_get(&set, i, &item_len);
+        if (basename_only) item += set.basename_offsets[i];
+        if (order_compare(item, prefix, prefix_len, basename_only, true) == 0) {
+            if (limit == 0 || result->count < limit) add_to_result(result, i);
+            result->match_count++;
+        }
+    }
+    corpus_end_read(corpus);
+    return result;
+}
+
+// 排序索引覆盖的项数（之后追加的项未排序）
+int corpus_path_order_count(SearchCorpus* corpus) {
+    if (corpus == NULL) return 0;
+    pool_mutex_lock(&corpus->lock);
+    int count = corpus->path_order_count;
+    pool_mutex_unlock(&corpus->lock);
+    return count;
+}
+
+void corpus_free(SearchCorpus* corpus) {
+    if (corpus == NULL) return;
+    for (int i = 0; i < corpus->retired_count; i++) {
+        free(corpus->retired[i]);
+    }
+    free(corpus->retired);
+    free(corpus->item_pointers);
+    free(corpus->blob);
+    free(corpus->offsets);
+    free(corpus->basename_offsets);
+    free(corpus->extension_ids);
+    free(corpus->signatures);
+    free(corpus->path_order);
+    free(corpus->basename_order);
+    for (int id = 1; id < corpus->extensions.count; id++) {
+        free(corpus->extensions.names[id]);
+    }
+    free(corpus->extensions.names);
+    free(corpus->extensions.slots);
+    pool_mutex_destroy(&corpus->lock);
+    pool_cond_destroy(&corpus->order_built);
+    free(corpus);
+}
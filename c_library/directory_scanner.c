@@ -74,12 +74,17 @@ int is_extension_allowed(const char* filename, const char** allowed_extensions,
     return 0;
 }
 
+// 取消标记是否已被设置（由其他线程置为非0，扫描在下一个目录项处结束并返回已扫描到的文件）
+static int scan_cancelled(const volatile int* cancel) {
+    return cancel != NULL && *cancel != 0;
+}
+
 // 递归扫描目录的Windows实现
 #ifdef _WIN32
 void scan_directory(const char* directory, int current_depth, int max_depth, 
                     const char** allowed_extensions, int extension_count, 
-                    struct ScanResult* result) {
-    if (current_depth > max_depth) {
+                    struct ScanResult* result, const volatile int* cancel) {
+    if (current_depth > max_depth || scan_cancelled(cancel)) {
         return;
     }
     
@@ -97,6 +102,10 @@ void scan_directory(const char* directory, int current_depth, int max_depth,
     }
     
     do {
+        if (scan_cancelled(cancel)) {
+            break;
+        }
+        
         // 跳过 . 和 ..
         if (strcmp(findFileData.cFileName, ".") == 0 || strcmp(findFileData.cFileName, "..") == 0) {
             continue;
@@ -109,7 +118,7 @@ void scan_directory(const char* directory, int current_depth, int max_depth,
         if (findFileData.dwFileAttributes & FILE_ATTRIBUTE_DIRECTORY) {
             // 递归扫描子目录
             scan_directory(fullPath, current_depth + 1, max_depth, 
-                          allowed_extensions, extension_count, result);
+                          allowed_extensions, extension_count, result, cancel);
         } else {
             // 检查文件扩展名
             if (is_extension_allowed(findFileData.cFileName, allowed_extensions, extension_count)) {
@@ -124,8 +133,8 @@ void scan_directory(const char* directory, int current_depth, int max_depth,
 // 递归扫描目录的POSIX实现
 void scan_directory(const char* directory, int current_depth, int max_depth, 
                     const char** allowed_extensions, int extension_count, 
-                    struct ScanResult* result) {
-    if (current_depth > max_depth) {
+                    struct ScanResult* result, const volatile int* cancel) {
+    if (current_depth > max_depth || scan_cancelled(cancel)) {
         return;
     }
     
@@ -136,6 +145,10 @@ void scan_directory(const char* directory, int current_depth, int max_depth,
     
     struct dirent* entry;
     while ((entry = readdir(dir)) != NULL) {
+        if (scan_cancelled(cancel)) {
+            break;
+        }
+        
         // 跳过 . 和 ..
         if (strcmp(entry->d_name, ".") == 0 || strcmp(entry->d_name, "..") == 0) {
             continue;
@@ -151,7 +164,7 @@ void scan_directory(const char* directory, int current_depth, int max_depth,
             if (S_ISDIR(fileStat.st_mode)) {
                 // 递归扫描子目录
                 scan_directory(fullPath, current_depth + 1, max_depth, 
-                              allowed_extensions, extension_count, result);
+                              allowed_extensions, extension_count, result, cancel);
             } else {
                 // 检查文件扩展名
                 if (is_extension_allowed(entry->d_name, allowed_extensions, extension_count)) {
@@ -166,13 +179,14 @@ void scan_directory(const char* directory, int current_depth, int max_depth,
 #endif
 
 // 导出函数：扫描目录
+// cancel 为取消标记（可为 NULL），被置为非0后尽快返回已扫描到的部分文件
 DLL_EXPORT char** scan_directory_c(const char* directory, int depth, 
                                   const char** allowed_extensions, int extension_count, 
-                                  int* file_count) {
+                                  int* file_count, const volatile int* cancel) {
     struct ScanResult result;
     init_scan_result(&result);
     
-    scan_directory(directory, 0, depth, allowed_extensions, extension_count, &result);
+    scan_directory(directory, 0, depth, allowed_extensions, extension_count, &result, cancel);
     
     *file_count = result.count;
     return result.files;
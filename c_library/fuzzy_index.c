@@ -0,0 +1,299 @@
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+#include <stdbool.h>
+#include "search.h"
+
+// 模糊搜索索引（BK树）
+// 以文件名（路径最后一段）为键，大小写不同的文件名合并为同一节点。
+// 编辑距离满足三角不等式，查询时只需访问边距离落在 [d - k, d + k] 内的子节点，
+// 大部分子树在不计算距离的情况下即被剪枝。
+
+#define FUZZY_INDEX_MAGIC "BKTI"
+#define FUZZY_INDEX_VERSION 2  // 版本2：距离改为按码点计算
+
+struct FuzzyIndex {
+    int item_count;
+    int node_count;
+    int text_len;
+    char* text;               // 节点文件名，'\0'分隔拼接
+    int* node_text;           // 节点文件名在 text 中的偏移
+    int* node_first_child;    // 第一个子节点，-1 表示无
+    int* node_next_sibling;   // 下一个兄弟节点，-1 表示无
+    int* node_edge;           // 与父节点的编辑距离
+    int* node_item_offsets;   // node_count + 1 项，node_items 中每个节点的起止位置
+    int* node_items;          // 各节点对应的项索引（升序）
+    int posting_count;
+};
+
+typedef struct {
+    const char* name;
+    int index;
+} NamedItem;
+
+// 返回路径中文件名部分的起始位置
+const char* path_basename(const char* path) {
+    const char* name = path;
+    for (const char* p = path; *p; p++) {
+        if (*p == '/' || *p == '\\') {
+            name = p + 1;
+        }
+    }
+    return name;
+}
+
+// ASCII大小写不敏感的字符串比较（与编辑距离的大小写规则一致）
+static int compare_folded(const char* a, const char* b) {
+    const unsigned char* p1 = (const unsigned char*)a;
+    const unsigned char* p2 = (const unsigned char*)b;
+    while (*p1 && to_lower(*p1) == to_lower(*p2)) {
+        p1++;
+        p2++;
+    }
+    return (int)to_lower(*p1) - (int)to_lower(*p2);
+}
+
+static int compare_named_items(const void* a, const void* b) {
+    const NamedItem* x = (const NamedItem*)a;
+    const NamedItem* y = (const NamedItem*)b;
+    int cmp = compare_folded(x->name, y->name);
+    if (cmp != 0) return cmp;
+    return (x->index > y->index) - (x->index < y->index);
+}
+
+// 建树和查询都需要精确距离，以不可能达到的上限调用有界距离函数
+#define FUZZY_UNBOUNDED_DISTANCE (EDIT_SCRATCH_CHARS * 2)
+
+static void fuzzy_index_insert(FuzzyIndex* index, int node, EditScratch* scratch) {
+    const char* name = index->text + index->node_text[node];
+    int current = 0;
+    while (1) {
+        int d = bounded_edit_distance(name, index->text + index->node_text[current], FUZZY_UNBOUNDED_DISTANCE, scratch);
+        int child = index->node_first_child[current];
+        while (child != -1 && index->node_edge[child] != d) {
+            child = index->node_next_sibling[child];
+        }
+        if (child == -1) {
+            index->node_edge[node] = d;
+            index->node_next_sibling[node] = index->node_first_child[current];
+            index->node_first_child[current] = node;
+            return;
+        }
+        current = child;
+    }
+}
+
+FuzzyIndex* fuzzy_index_build(const char** items, int items_count) {
+    NamedItem* named = (NamedItem*)malloc(sizeof(NamedItem) * (items_count > 0 ? items_count : 1));
+    int named_count = 0;
+    for (int i = 0; i < items_count; i++) {
+        if (items[i] == NULL) continue;
+        const char* name = path_basename(items[i]);
+        if (*name == '\0') continue;
+        named[named_count].name = name;
+        named[named_count].index = i;
+        named_count++;
+    }
+
+    // 排序后相同文件名相邻，合并为一个节点
+    qsort(named, named_count, sizeof(NamedItem), compare_named_items);
+
+    FuzzyIndex* index = (FuzzyIndex*)calloc(1, sizeof(FuzzyIndex));
+    index->item_count = items_count;
+    index->posting_count = named_count;
+    index->node_items = (int*)malloc(sizeof(int) * (named_count > 0 ? named_count : 1));
+    index->node_item_offsets = (int*)malloc(sizeof(int) * (named_count + 1));
+    index->node_text = (int*)malloc(sizeof(int) * (named_count > 0 ? named_count : 1));
+
+    long long text_len = 0;
+    int node_count = 0;
+    for (int i = 0; i < named_count; i++) {
+        if (i == 0 || compare_folded(named[i].name, named[i - 1].name) != 0) {
+            index->node_item_offsets[node_count] = i;
+            index->node_text[node_count] = (int)text_len;
+            text_len += strlen(named[i].name) + 1;
+            node_count++;
+        }
+        index->node_items[i] = named[i].index;
+    }
+    index->node_item_offsets[node_count] = named_count;
+    index->node_count = node_count;
+    index->text_len = (int)text_len;
+
+    index->text = (char*)malloc(text_len > 0 ? text_len : 1);
+    for (int n = 0; n < node_count; n++) {
+        const char* name = named[index->node_item_offsets[n]].name;
+        strcpy(index->text + index->node_text[n], name);
+    }
+    free(named);
+
+    index->node_first_child = (int*)malloc(sizeof(int) * (node_count > 0 ? node_count : 1));
+    index->node_next_sibling = (int*)malloc(sizeof(int) * (node_count > 0 ? node_count : 1));
+    index->node_edge = (int*)malloc(sizeof(int) * (node_count > 0 ? node_count : 1));
+    for (int n = 0; n < node_count; n++) {
+        index->node_first_child[n] = -1;
+        index->node_next_sibling[n] = -1;
+        index->node_edge[n] = 0;
+    }
+
+    // 按字典序插入会让树退化，这里用固定种子的置换打乱插入顺序（节点0作为根）
+    if (node_count > 1) {
+        int* order = (int*)malloc(sizeof(int) * node_count);
+        for (int n = 0; n < node_count; n++) order[n] = n;
+        unsigned int seed = 2166136261u;
+        for (int n = node_count - 1; n > 1; n--) {
+            seed = seed * 1103515245u + 12345u;
+            int j = 1 + (int)(seed % (unsigned int)n);
+            int t = order[n]; order[n] = order[j]; order[j] = t;
+        }
+        EditScratch* scratch = create_edit_scratch();
+        for (int n = 1; n < node_count; n++) {
+            fuzzy_index_insert(index, order[n], scratch);
+        }
+        free_edit_scratch(scratch);
+        free(order);
+    }
+    return index;
+}
+
+static int compare_ints(const void* a, const void* b) {
+    int x = *(const int*)a;
+    int y = *(const int*)b;
+    return (x > y) - (x < y);
+}
+
+// 查找文件名与关键词编辑距离不超过 max_distance 的项，结果按索引升序
+// 单个中文字符的关键词在 fuzzy_search 中按子串匹配，索引无法表达，返回 NULL 由调用方回退
+SearchResult* fuzzy_index_search(const FuzzyIndex* index, const char* keyword, int max_distance) {
+    if (index == NULL || keyword == NULL) {
+        return NULL;
+    }
+    int keyword_len = strlen(keyword);
+    if (keyword_len == 3 && (unsigned char)keyword[0] >= 0xE0) {
+        return NULL;
+    }
+
+    SearchResult* result = init_search_result();
+    if (index->node_count == 0 || keyword_len == 0) {
+        return result;
+    }
+
+    int k = adjust_fuzzy_distance(keyword, max_distance);
+    int* stack = (int*)malloc(sizeof(int) * index->node_count);
+    int top = 0;
+    stack[top++] = 0;
+    EditScratch* scratch = create_edit_scratch();
+
+    while (top > 0) {
+        int node = stack[--top];
+        int d = bounded_edit_distance(keyword, index->text + index->node_text[node], FUZZY_UNBOUNDED_DISTANCE, scratch);
+        if (d <= k) {
+            for (int p = index->node_item_offsets[node]; p < index->node_item_offsets[node + 1]; p++) {
+                add_to_result(result, index->node_items[p]);
+            }
+        }
+        for (int child = index->node_first_child[node]; child != -1; child = index->node_next_sibling[child]) {
+            int edge = index->node_edge[child];
+            if (edge >= d - k && edge <= d + k) {
+                stack[top++] = child;
+            }
+        }
+    }
+    free(stack);
+    free_edit_scratch(scratch);
+
+    qsort(result->indices, result->count, sizeof(int), compare_ints);
+    return result;
+}
+
+int fuzzy_index_item_count(const FuzzyIndex* index) {
+    return index ? index->item_count : 0;
+}
+
+// 序列化格式：magic(4) | version | item_count | node_count | text_len | posting_count |
+//             text | node_text | node_first_child | node_next_sibling | node_edge | node_item_offsets | node_items
+char* fuzzy_index_dump(const FuzzyIndex* index, long long* size) {
+    long long header = 4 + sizeof(int) * 5;
+    long long node_size = sizeof(int) * (long long)index->node_count;
+    long long offsets_size = sizeof(int) * ((long long)index->node_count + 1);
+    long long postings_size = sizeof(int) * (long long)index->posting_count;
+
+    *size = header + index->text_len + node_size * 4 + offsets_size + postings_size;
+    char* buffer = (char*)malloc(*size);
+    char* p = buffer;
+    int version = FUZZY_INDEX_VERSION;
+
+    memcpy(p, FUZZY_INDEX_MAGIC, 4); p += 4;
+    memcpy(p, &version, sizeof(int)); p += sizeof(int);
+    memcpy(p, &index->item_count, sizeof(int)); p += sizeof(int);
+    memcpy(p, &index->node_count, sizeof(int)); p += sizeof(int);
+    memcpy(p, &index->text_len, sizeof(int)); p += sizeof(int);
+    memcpy(p, &index->posting_count, sizeof(int)); p += sizeof(int);
+    memcpy(p, index->text, index->text_len); p += index->text_len;
+    memcpy(p, index->node_text, node_size); p += node_size;
+    memcpy(p, index->node_first_child, node_size); p += node_size;
+    memcpy(p, index->node_next_sibling, node_size); p += node_size;
+    memcpy(p, index->node_edge, node_size); p += node_size;
+    memcpy(p, index->node_item_offsets, offsets_size); p += offsets_size;
+    memcpy(p, index->node_items, postings_size);
+    return buffer;
+}
+
+static int* restore_ints(const char** p, long long bytes) {
+    int* array = (int*)malloc(bytes > 0 ? bytes : 1);
+    memcpy(array, *p, bytes);
+    *p += bytes;
+    return array;
+}
+
+FuzzyIndex* fuzzy_index_restore(const char* data, long long size) {
+    long long header = 4 + sizeof(int) * 5;
+    if (data == NULL || size < header || memcmp(data, FUZZY_INDEX_MAGIC, 4) != 0) {
+        return NULL;
+    }
+
+    int version, item_count, node_count, text_len, posting_count;
+    const char* p = data + 4;
+    memcpy(&version, p, sizeof(int)); p += sizeof(int);
+    memcpy(&item_count, p, sizeof(int)); p += sizeof(int);
+    memcpy(&node_count, p, sizeof(int)); p += sizeof(int);
+    memcpy(&text_len, p, sizeof(int)); p += sizeof(int);
+    memcpy(&posting_count, p, sizeof(int)); p += sizeof(int);
+    if (version != FUZZY_INDEX_VERSION || item_count < 0 || node_count < 0 || text_len < 0 || posting_count < 0) {
+        return NULL;
+    }
+
+    long long node_size = sizeof(int) * (long long)node_count;
+    long long offsets_size = sizeof(int) * ((long long)node_count + 1);
+    long long postings_size = sizeof(int) * (long long)posting_count;
+    if (size != header + text_len + node_size * 4 + offsets_size + postings_size) {
+        return NULL;
+    }
+
+    FuzzyIndex* index = (FuzzyIndex*)malloc(sizeof(FuzzyIndex));
+    index->item_count = item_count;
+    index->node_count = node_count;
+    index->text_len = text_len;
+    index->posting_count = posting_count;
+    index->text = (char*)malloc(text_len > 0 ? text_len : 1);
+    memcpy(index->text, p, text_len); p += text_len;
+    index->node_text = restore_ints(&p, node_size);
+    index->node_first_child = restore_ints(&p, node_size);
+    index->node_next_sibling = restore_ints(&p, node_size);
+    index->node_edge = restore_ints(&p, node_size);
+    index->node_item_offsets = restore_ints(&p, offsets_size);
+    index->node_items = restore_ints(&p, postings_size);
+    return index;
+}
+
+void fuzzy_index_free(FuzzyIndex* index) {
+    if (index == NULL) return;
+    free(index->text);
+    free(index->node_text);
+    free(index->node_first_child);
+    free(index->node_next_sibling);
+    free(index->node_edge);
+    free(index->node_item_offsets);
+    free(index->node_items);
+    free(index);
+}
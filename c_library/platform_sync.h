@@ -0,0 +1,37 @@
+#ifndef PLATFORM_SYNC_H
+#define PLATFORM_SYNC_H
+
+// 线程与同步原语的跨平台封装（Windows 使用 Win32 API，其他平台使用 pthreads），仅供库内部使用
+
+#ifdef _WIN32
+#include <windows.h>
+typedef HANDLE pool_thread_t;
+typedef CRITICAL_SECTION pool_mutex_t;
+typedef CONDITION_VARIABLE pool_cond_t;
+#define pool_mutex_init(m) InitializeCriticalSection(m)
+#define pool_mutex_destroy(m) DeleteCriticalSection(m)
+#define pool_mutex_lock(m) EnterCriticalSection(m)
+#define pool_mutex_trylock(m) (TryEnterCriticalSection(m) != 0)
+#define pool_mutex_unlock(m) LeaveCriticalSection(m)
+#define pool_cond_init(c) InitializeConditionVariable(c)
+#define pool_cond_wait(c, m) SleepConditionVariableCS(c, m, INFINITE)
+#define pool_cond_broadcast(c) WakeAllConditionVariable(c)
+#define pool_cond_destroy(c) ((void)(c))  // Win32 条件变量无需销毁
+#else
+#include <pthread.h>
+#include <unistd.h>
+typedef pthread_t pool_thread_t;
+typedef pthread_mutex_t pool_mutex_t;
+typedef pthread_cond_t pool_cond_t;
+#define pool_mutex_init(m) pthread_mutex_init(m, NULL)
+#define pool_mutex_destroy(m) pthread_mutex_destroy(m)
+#define pool_mutex_lock(m) pthread_mutex_lock(m)
+#define pool_mutex_trylock(m) (pthread_mutex_trylock(m) == 0)
+#define pool_mutex_unlock(m) pthread_mutex_unlock(m)
+#define pool_cond_init(c) pthread_cond_init(c, NULL)
+#define pool_cond_wait(c, m) pthread_cond_wait(c, m)
+#define pool_cond_broadcast(c) pthread_cond_broadcast(c)
+#define pool_cond_destroy(c) pthread_cond_destroy(c)
+#endif
+
+#endif // PLATFORM_SYNC_H
@@ -0,0 +1,414 @@
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+#include <stdbool.h>
+#include "search.h"
+
+// 按相关度排序的搜索（与 fzf / Sublime Text 的模糊匹配类似）
+// 关键词的字符按顺序出现在路径中即为匹配（子序列，ASCII大小写不敏感），再按以下规则打分：
+// - 每个匹配字符得分，字符之间的间隔扣分
+// - 匹配位于单词边界（路径分隔符、空格/下划线/连字符/点之后、驼峰、数字开头）时加分
+// - 连续匹配沿用片段首字符的边界加分，首字符的加分加倍
+// - 能在文件名（路径最后一段）内完成匹配时额外加分，且只在文件名内计算得分
+// - 匹配项再加上调用方给出的附加得分（options->boosts，如经常打开的文件的加分）
+// 只保留得分最高的 limit 项（每个线程一个有界小顶堆）。堆中最低分已超过文件名之外的匹配可能达到的
+// 最高分时，之后的项只在文件名内匹配打分。文件名内的匹配总能达到含文件名加分的上界，扫描不提前结束。
+
+#define SCORE_MATCH 16
+#define SCORE_GAP_START (-3)
+#define SCORE_GAP_EXTENSION (-1)
+#define BONUS_BOUNDARY 8
+#define BONUS_BOUNDARY_PATH 9     // 紧跟路径分隔符（或位于开头）
+#define BONUS_NONWORD 8
+#define BONUS_CAMEL 7
+#define BONUS_CONSECUTIVE 4
+#define BONUS_FIRST_CHAR_MULTIPLIER 2
+#define BONUS_BASENAME 48         // 匹配完全落在文件名内
+
+typedef enum {
+    CHAR_PATH_SEP,
+    CHAR_DELIMITER,
+    CHAR_NONWORD,
+    CHAR_LOWER,
+    CHAR_UPPER,
+    CHAR_DIGIT,
+    CHAR_LETTER   // 非ASCII字符（中文等）视为单词字符
+} CharClass;
+
+static CharClass char_class(unsigned char c) {
+    if (c >= 'a' && c <= 'z') return CHAR_LOWER;
+    if (c >= 'A' && c <= 'Z') return CHAR_UPPER;
+    if (c >= '0' && c <= '9') return CHAR_DIGIT;
+    if (c >= 0x80) return CHAR_LETTER;
+    if (c == '/' || c == '\\') return CHAR_PATH_SEP;
+    if (c == ' ' || c == '_' || c == '-' || c == '.') return CHAR_DELIMITER;
+    return CHAR_NONWORD;
+}
+
+static int bonus_for(CharClass prev, CharClass curr) {
+    if (curr == CHAR_PATH_SEP || curr == CHAR_DELIMITER || curr == CHAR_NONWORD) {
+        return BONUS_NONWORD;
+    }
+    if (prev == CHAR_PATH_SEP) return BONUS_BOUNDARY_PATH;
+    if (prev == CHAR_DELIMITER || prev == CHAR_NONWORD) return BONUS_BOUNDARY;
+    if (prev == CHAR_LOWER && curr == CHAR_UPPER) return BONUS_CAMEL;
+    if (prev != CHAR_DIGIT && curr == CHAR_DIGIT) return BONUS_CAMEL;
+    return 0;
+}
+
+// 当前位置UTF-8字符的字节长度（不超过剩余长度）
+static size_t char_length_at(const char* s, size_t pos, size_t len) {
+    size_t n = (size_t)get_utf8_char_length((unsigned char)s[pos]);
+    return pos + n > len ? len - pos : n;
+}
+
+// 回退到前一个UTF-8字符的起始位置
+static size_t previous_char(const char* s, size_t pos) {
+    if (pos == 0) return 0;
+    pos--;
+    while (pos > 0 && ((unsigned char)s[pos] & 0xC0) == 0x80) pos--;
+    return pos;
+}
+
+// 文本在 pos 处是否与已折叠关键词中的一个字符相同
+// ASCII字节与多字节字符的首字节只会出现在字符起始位置，因此可以按字节定位
+static bool char_matches(const char* text, size_t pos, size_t len, const char* pattern, size_t pattern_char_len) {
+    if (pattern_char_len == 1) {
+        unsigned char c = (unsigned char)text[pos];
+        if (c >= 'A' && c <= 'Z') c += 'a' - 'A';
+        return c == (unsigned char)pattern[0];
+    }
+    return pos + pattern_char_len <= len && memcmp(text + pos, pattern, pattern_char_len) == 0;
+}
+
+// 正向贪心匹配关键词的全部字符，成功时返回 true 并通过 end 返回最后一个匹配字符之后的位置
+static bool find_subsequence(const char* text, size_t len, const char* pattern, size_t pattern_len, size_t* end) {
+    size_t ti = 0;
+    for (size_t pi = 0; pi < pattern_len; ) {
+        size_t pl = char_length_at(pattern, pi, pattern_len);
+        if (pl == 1) {
+            unsigned char lower = (unsigned char)pattern[pi];
+            unsigned char upper = (lower >= 'a' && lower <= 'z') ? (unsigned char)(lower - ('a' - 'A')) : lower;
+            while (ti < len && (unsigned char)text[ti] != lower && (unsigned char)text[ti] != upper) ti++;
+            if (ti >= len) return false;
+            ti++;
+        } else {
+            while (1) {
+                const char* hit = (const char*)memchr(text + ti, pattern[pi], len - ti);
+                if (hit == NULL) return false;
+                ti = (size_t)(hit - text);
+                if (char_matches(text, ti, len, pattern + pi, pl)) break;
+                ti++;
+            }
+            ti += pl;
+        }
+        pi += pl;
+    }
+    *end = ti;
+    return true;
+}
+
+// 对 text 中以 end 结束的匹配计分
+// 先从 end 反向匹配得到最短的窗口，再逐字符累计匹配得分、边界加分与间隔扣分
+static int score_window(const char* text, size_t len, size_t end, const char* pattern, size_t pattern_len) {
+    size_t start = end;
+    size_t pi = pattern_len;
+    while (pi > 0) {
+        size_t prev_p = previous_char(pattern, pi);
+        start = previous_char(text, start);
+        while (!char_matches(text, start, len, pattern + prev_p, pi - prev_p)) {
+            start = previous_char(text, start);
+        }
+        pi = prev_p;
+    }
+
+    int score = 0;
+    int consecutive = 0;
+    int first_bonus = 0;
+    bool in_gap = false;
+    CharClass prev_class = start == 0 ? CHAR_PATH_SEP : char_class((unsigned char)text[previous_char(text, start)]);
+    pi = 0;
+    for (size_t ti = start; ti < end && pi < pattern_len; ) {
+        size_t tl = char_length_at(text, ti, len);
+        size_t pl = char_length_at(pattern, pi, pattern_len);
+        CharClass curr_class = char_class((unsigned char)text[ti]);
+        if (tl == pl && char_matches(text, ti, len, pattern + pi, pl)) {
+            int bonus = bonus_for(prev_class, curr_class);
+            if (consecutive == 0) {
+                first_bonus = bonus;
+            } else {
+                // 连续片段沿用首字符的边界加分
+                if (bonus >= BONUS_BOUNDARY && bonus > first_bonus) first_bonus = bonus;
+                if (first_bonus > bonus) bonus = first_bonus;
+                if (BONUS_CONSECUTIVE > bonus) bonus = BONUS_CONSECUTIVE;
+            }
+            score += SCORE_MATCH + (pi == 0 ? bonus * BONUS_FIRST_CHAR_MULTIPLIER : bonus);
+            in_gap = false;
+            consecutive++;
+            pi += pl;
+        } else {
+            score += in_gap ? SCORE_GAP_EXTENSION : SCORE_GAP_START;
+            in_gap = true;
+            consecutive = 0;
+            first_bonus = 0;
+        }
+        prev_class = curr_class;
+        ti += tl;
+    }
+    return score;
+}
+
+// 只在文件名内匹配并计分（含文件名加分），不匹配时返回 -1
+static int basename_score(const char* item, size_t item_len, const char* folded_keyword, size_t keyword_len) {
+    size_t base = (size_t)(path_basename(item) - item);
+    size_t end;
+    if (!find_subsequence(item + base, item_len - base, folded_keyword, keyword_len, &end)) {
+        return -1;
+    }
+    return score_window(item + base, item_len - base, end, folded_keyword, keyword_len) + BONUS_BASENAME;
+}
+
+// 计算路径与已折叠关键词的匹配得分，不匹配时返回 -1
+// 能在文件名内完成匹配时只在文件名内计分并加上文件名加分，否则在整个路径上计分
+int match_score(const char* item, size_t item_len, const char* folded_keyword, size_t keyword_len) {
+    size_t end;
+    if (!find_subsequence(item, item_len, folded_keyword, keyword_len, &end)) {
+        return -1;  // 整个路径都不匹配时文件名也不可能匹配
+    }
+    int score = basename_score(item, item_len, folded_keyword, keyword_len);
+    if (score >= 0) {
+        return score;
+    }
+    return score_window(item, item_len, end, folded_keyword, keyword_len);
+}
+
+// 关键词可能达到的最高得分（不含文件名加分，可以取到），用于跳过文件名之外的匹配
+static int max_possible_score(const char* pattern, size_t pattern_len) {
+    int chars = 0;
+    for (size_t i = 0; i < pattern_len; i += char_length_at(pattern, i, pattern_len)) {
+        chars++;
+    }
+    return chars * (SCORE_MATCH + BONUS_BOUNDARY_PATH) + BONUS_BOUNDARY_PATH * (BONUS_FIRST_CHAR_MULTIPLIER - 1);
+}
+
+typedef struct {
+    int score;
+    int length;
+    int index;
+} RankedEntry;
+
+// a 是否排在 b 之前：得分高优先，其次路径短优先，最后按索引
+static bool ranks_before(const RankedEntry* a, const RankedEntry* b) {
+    if (a->score != b->score) return a->score > b->score;
+    if (a->length != b->length) return a->length < b->length;
+    return a->index < b->index;
+}
+
+// 有界小顶堆：堆顶是当前保留项中排名最靠后的一项；limit 为0时不限容量（只追加）
+typedef struct {
+    RankedEntry* entries;
+    int count;
+    int capacity;
+    int limit;
+} RankedHeap;
+
+static void heap_init(RankedHeap* heap, int limit) {
+    heap->limit = limit;
+    heap->capacity = limit > 0 ? limit : 64;
+    heap->count = 0;
+    heap->entries = (RankedEntry*)malloc(sizeof(RankedEntry) * heap->capacity);
+}
+
+static void heap_sift_down(RankedHeap* heap, int i) {
+    RankedEntry* e = heap->entries;
+    while (1) {
+        int worst = i;
+        int left = 2 * i + 1;
+        int right = left + 1;
+        if (left < heap->count && ranks_before(&e[worst], &e[left])) worst = left;
+        if (right < heap->count && ranks_before(&e[worst], &e[right])) worst = right;
+        if (worst == i) return;
+        RankedEntry t = e[i]; e[i] = e[worst]; e[worst] = t;
+        i = worst;
+    }
+}
+
+static void heap_sift_up(RankedHeap* heap, int i) {
+    RankedEntry* e = heap->entries;
+    while (i > 0) {
+        int parent = (i - 1) / 2;
+        if (!ranks_before(&e[parent], &e[i])) return;
+        RankedEntry t = e[i]; e[i] = e[parent]; e[parent] = t;
+        i = parent;
+    }
+}
+
+static bool heap_full(const RankedHeap* heap) {
+    return heap->limit > 0 && heap->count >= heap->limit;
+}
+
+static void heap_push(RankedHeap* heap, RankedEntry entry) {
+    if (heap->limit <= 0) {
+        if (heap->count >= heap->capacity) {
+            heap->capacity *= 2;
+            heap->entries = (RankedEntry*)realloc(heap->entries, sizeof(RankedEntry) * heap->capacity);
+        }
+        heap->entries[heap->count++] = entry;
+        return;
+    }
+    if (heap->count < heap->limit) {
+        heap->entries[heap->count] = entry;
+        heap_sift_up(heap, heap->count++);
+    } else if (ranks_before(&entry, &heap->entries[0])) {
+        heap->entries[0] = entry;
+        heap_sift_down(heap, 0);
+    }
+}
+
+typedef struct {
+    const ItemSet* set;
+    const char* keyword;        // 已折叠
+    size_t keyword_len;
+    int limit;
+    int max_score;              // 不含文件名加分与附加得分的最高可能得分
+    const int* boosts;          // 各项的附加得分，NULL 表示不加分
+    int boost_count;
+    int max_boost;
+    int chunk_size;
+    RankedHeap* heaps;          // 每块一个堆
+    SearchResult** matches;     // 每块的全部匹配项，不收集时为 NULL
+    const volatile int* cancel;
+} RankedSearchTask;
+
+// matches 不为 NULL 时另记录全部匹配项（只计算文件名内得分的项也要确认整个路径是否匹配）
+static void ranked_scan_range(const RankedSearchTask* task, int start, int end, RankedHeap* heap, SearchResult* matches) {
+    size_t item_len = 0;
+    for (int i = start; i < end; i++) {
+        if (((i - start) & (SEARCH_CANCEL_CHECK_INTERVAL - 1)) == 0 && search_cancelled(task->cancel)) {
+            break;
+        }
+        const char* item = item_set_get(task->set, i, &item_len);
+        if (item == NULL) continue;
+
+        int score;
+        bool basename_only = heap_full(heap) && heap->entries[0].score > task->max_score + task->max_boost;
+        if (basename_only) {
+            // 只有文件名内的匹配还有机会进入
+            score = basename_score(item, item_len, task->keyword, task->keyword_len);
+        } else {
+            score = match_score(item, item_len, task->keyword, task->keyword_len);
+        }
+        if (score < 0 && basename_only && matches != NULL) {
+            // 只计算了文件名内的得分，还需确认整个路径是否匹配
+            size_t match_end;
+            if (find_subsequence(item, item_len, task->keyword, task->keyword_len, &match_end)) {
+                add_to_result(matches, i);
+            }
+        }
+        if (score >= 0) {
+            if (task->boosts != NULL && i < task->boost_count) score += task->boosts[i];
+            RankedEntry entry = {score, (int)item_len, i};
+            heap_push(heap, entry);
+            if (matches != NULL) add_to_result(matches, i);
+        }
+    }
+}
+
+static void ranked_search_chunk(void* context, int task_index) {
+    RankedSearchTask* task = (RankedSearchTask*)context;
+    int start = task_index * task->chunk_size;
+    int end = start + task->chunk_size;
+    if (end > task->set->count) end = task->set->count;
+    ranked_scan_range(task, start, end, &task->heaps[task_index],
+                      task->matches != NULL ? task->matches[task_index] : NULL);
+}
+
+static int compare_ranked(const void* a, const void* b) {
+    const RankedEntry* x = (const RankedEntry*)a;
+    const RankedEntry* y = (const RankedEntry*)b;
+    if (ranks_before(x, y)) return -1;
+    if (ranks_before(y, x)) return 1;
+    return 0;
+}
+
+// 按相关度搜索，返回得分最高的 options->limit 项（0表示全部匹配项），按排名排序并附带得分
+// options->collect_matches 为真时另在 matches 中返回全部匹配项的索引（升序）
+SearchResult* ranked_search(const ItemSet* set, const char* keyword, const SearchOptions* options) {
+    SearchResult* result = init_search_result();
+    if (keyword == NULL || *keyword == '\0' || set->count == 0) {
+        return result;
+    }
+
+    int limit = options->limit;
+    int num_threads = options->num_threads;
+    bool collect_matches = options->collect_matches;
+    RankedSearchTask task;
+    char* folded = fold_keyword(keyword);
+    task.set = set;
+    task.keyword = folded;
+    task.keyword_len = strlen(folded);
+    task.limit = limit > 0 ? limit : 0;
+    task.max_score = max_possible_score(folded, task.keyword_len);
+    task.boosts = options->boost_count > 0 ? options->boosts : NULL;
+    task.boost_count = task.boosts != NULL ? options->boost_count : 0;
+    task.max_boost = task.boosts != NULL && options->max_boost > 0 ? options->max_boost : 0;
+    int chunk_count = plan_search_chunks(set->count, &num_threads, &task.chunk_size);
+    task.heaps = (RankedHeap*)malloc(sizeof(RankedHeap) * chunk_count);
+    for (int c = 0; c < chunk_count; c++) {
+        heap_init(&task.heaps[c], task.limit);
+    }
+    task.matches = NULL;
+    task.cancel = options->cancel;
+    if (collect_matches) {
+        task.matches = (SearchResult**)malloc(sizeof(SearchResult*) * chunk_count);
+        for (int c = 0; c < chunk_count; c++) {
+            task.matches[c] = init_search_result();
+        }
+    }
+
+    if (chunk_count <= 1) {
+        ranked_search_chunk(&task, 0);
+    } else {
+        search_pool_run(num_threads, ranked_search_chunk, &task, chunk_count);
+    }
+
+    // 合并各块保留的项，再取前 limit 项
+    RankedHeap merged;
+    heap_init(&merged, task.limit);
+    for (int c = 0; c < chunk_count; c++) {
+        for (int i = 0; i < task.heaps[c].count; i++) {
+            heap_push(&merged, task.heaps[c].entries[i]);
+        }
+        free(task.heaps[c].entries);
+    }
+    free(task.heaps);
+    free(folded);
+
+    if (collect_matches) {
+        // 各块按索引顺序扫描，按块顺序拼接即为升序
+        int total = 0;
+        for (int c = 0; c < chunk_count; c++) {
+            total += task.matches[c]->count;
+        }
+        result->matches = (int*)malloc(sizeof(int) * (total > 0 ? total : 1));
+        for (int c = 0; c < chunk_count; c++) {
+            memcpy(result->matches + result->match_count, task.matches[c]->indices, sizeof(int) * task.matches[c]->count);
+            result->match_count += task.matches[c]->count;
+            free_search_result(task.matches[c]);
+        }
+        free(task.matches);
+    }
+
+    qsort(merged.entries, merged.count, sizeof(RankedEntry), compare_ranked);
+    free(result->indices);
+    result->capacity = merged.count > 0 ? merged.count : 1;
+    result->count = merged.count;
+    result->indices = (int*)malloc(sizeof(int) * result->capacity);
+    result->scores = (int*)malloc(sizeof(int) * result->capacity);
+    for (int i = 0; i < merged.count; i++) {
+        result->indices[i] = merged.entries[i].index;
+        result->scores[i] = merged.entries[i].score;
+    }
+    free(merged.entries);
+    return result;
+}
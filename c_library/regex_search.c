@@ -0,0 +1,1092 @@
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+#include <stdbool.h>
+#include "search.h"
+
+// 正则表达式搜索
+// 模式在编译时依次转换为语法树、Thompson NFA，再用子集构造一次性生成DFA（字节按等价类压缩），
+// 匹配时每个字节只查一次转移表，每项的匹配时间与其长度成线性关系，且与模式的复杂度无关。
+// 同时从语法树中提取每个匹配都必须包含的最长字面量，扫描时先用子串查找排除不含该字面量的项，
+// Python 端还可用它在三元组索引中预先缩小候选范围。
+//
+// 支持的语法（按字节匹配UTF-8文本，'.'与取反的字符类匹配一个完整的UTF-8字符）：
+//   字面字符、.、[abc]、[^a-z]、\d \w \s \D \W \S、\t \n \r \f \v \xHH、\A、\z、
+//   ^、$、|、(...)、(?:...)、*、+、?、{m}、{m,}、{m,n}（惰性量词按贪婪处理，不影响是否匹配）
+// \d \s 只匹配ASCII字符，\w 匹配ASCII单词字符与所有非ASCII字符。
+// 不支持反向引用、环视与单词边界。ignore_case 只折叠ASCII字母。
+// 匹配不要求覆盖整项（与 re.search 相同），需要时用 ^ 与 $ 锚定。
+//
+// 通配符模式（glob_compile）转换为同样的语法树后编译为DFA，因此同样按线性时间匹配、不会回溯：
+//   * 匹配任意多个字符，? 匹配一个字符，[abc] / [a-z] / [!abc] 匹配一个字符（方括号未闭合时按字面处理），
+//   其他字符（包括'\\'）均按字面匹配；模式需匹配整项（与 fnmatch 相同）。
+
+#define REGEX_MAX_NODES 8192        // 语法树节点数上限
+#define REGEX_MAX_NFA_STATES 16384  // NFA状态数上限（重复次数展开后）
+#define REGEX_MAX_DFA_STATES 4096   // DFA状态数上限，超过时编译失败
+#define REGEX_MAX_REPEAT 255        // {m,n} 中的最大重复次数
+#define REGEX_MAX_LITERAL 64        // 提取的字面量的最大字节数
+
+#define REGEX_STATE_MATCH 1         // 已经匹配（之后的输入不影响结果）
+#define REGEX_STATE_END_MATCH 2     // 在输入末尾时匹配（经过 $）
+#define REGEX_STATE_DEAD 4          // 之后不可能再匹配
+
+typedef struct {
+    unsigned int bits[8];
+} ByteSet;
+
+static void byte_set_add(ByteSet* set, int c) {
+    set->bits[c >> 5] |= 1u << (c & 31);
+}
+
+static bool byte_set_has(const ByteSet* set, int c) {
+    return (set->bits[c >> 5] >> (c & 31)) & 1u;
+}
+
+static void byte_set_add_range(ByteSet* set, int lo, int hi) {
+    for (int c = lo; c <= hi; c++) byte_set_add(set, c);
+}
+
+// 补齐ASCII字母的另一种大小写
+static void byte_set_fold_case(ByteSet* set) {
+    for (int c = 'a'; c <= 'z'; c++) {
+        if (byte_set_has(set, c) || byte_set_has(set, c - 'a' + 'A')) {
+            byte_set_add(set, c);
+            byte_set_add(set, c - 'a' + 'A');
+        }
+    }
+}
+
+// 只包含一个字符（忽略大小写时为一对大小写字母）时返回该字符（小写），否则返回-1
+static int byte_set_single(const ByteSet* set, bool ignore_case) {
+    int found = -1;
+    for (int c = 0; c < 256; c++) {
+        if (!byte_set_has(set, c)) continue;
+        int folded = ignore_case ? to_lower((unsigned char)c) : c;
+        if (found >= 0 && found != folded) return -1;
+        found = folded;
+    }
+    return found;
+}
+
+typedef enum {
+    NODE_EMPTY,   // 空串
+    NODE_SET,     // 一个字节（属于 set）
+    NODE_BEGIN,   // ^
+    NODE_END,     // $
+    NODE_CONCAT,
+    NODE_ALT,
+    NODE_STAR,
+    NODE_PLUS,
+    NODE_QUEST,
+    NODE_REPEAT   // left 重复 [min, max] 次，max 为 -1 表示不限
+} NodeKind;
+
+typedef struct {
+    NodeKind kind;
+    int left;
+    int right;
+    int set;
+    int min;
+    int max;
+} RegexNode;
+
+typedef struct {
+    const unsigned char* p;
+    const unsigned char* end;
+    bool ignore_case;
+    RegexNode* nodes;
+    int node_count;
+    ByteSet* sets;
+    int set_count;
+    int set_capacity;
+    char* error;
+    int error_size;
+    bool failed;
+} RegexParser;
+
+static int parse_alternation(RegexParser* parser);
+
+static int parse_fail(RegexParser* parser, const char* message) {
+    if (!parser->failed && parser->error != NULL && parser->error_size > 0) {
+        snprintf(parser->error, (size_t)parser->error_size, "%s", message);
+    }
+    parser->failed = true;
+    return -1;
+}
+
+static int new_node(RegexParser* parser, NodeKind kind, int left, int right) {
+    if (parser->failed) return -1;
+    if (parser->node_count >= REGEX_MAX_NODES) return parse_fail(parser, "模式过长");
+    RegexNode* node = &parser->nodes[parser->node_count];
+    node->kind = kind;
+    node->left = left;
+    node->right = right;
+    node->set = -1;
+    node->min = 0;
+    node->max = 0;
+    return parser->node_count++;
+}
+
+static int new_set_node(RegexParser* parser, ByteSet set) {
+    int node = new_node(parser, NODE_SET, -1, -1);
+    if (node < 0) return -1;
+    if (parser->ignore_case) byte_set_fold_case(&set);
+    if (parser->set_count >= parser->set_capacity) {
+        parser->set_capacity *= 2;
+        parser->sets = (ByteSet*)realloc(parser->sets, sizeof(ByteSet) * parser->set_capacity);
+    }
+    parser->sets[parser->set_count] = set;
+    parser->nodes[node].set = parser->set_count++;
+    return node;
+}
+
+static int new_byte_node(RegexParser* parser, int lo, int hi) {
+    ByteSet set;
+    memset(&set, 0, sizeof(set));
+    byte_set_add_range(&set, lo, hi);
+    return new_set_node(parser, set);
+}
+
+// 拼接两个节点（-1 表示不存在）
+static int concat_nodes(RegexParser* parser, int left, int right) {
+    if (left < 0) return right;
+    if (right < 0) return left;
+    return new_node(parser, NODE_CONCAT, left, right);
+}
+
+// 匹配一个多字节UTF-8字符的节点
+static int any_multibyte_node(RegexParser* parser) {
+    int two = concat_nodes(parser, new_byte_node(parser, 0xC0, 0xDF), new_byte_node(parser, 0x80, 0xBF));
+    int three = new_byte_node(parser, 0xE0, 0xEF);
+    for (int i = 0; i < 2; i++) three = concat_nodes(parser, three, new_byte_node(parser, 0x80, 0xBF));
+    int four = new_byte_node(parser, 0xF0, 0xF7);
+    for (int i = 0; i < 3; i++) four = concat_nodes(parser, four, new_byte_node(parser, 0x80, 0xBF));
+    return new_node(parser, NODE_ALT, new_node(parser, NODE_ALT, two, three), four);
+}
+
+// ASCII部分为 ascii 取反后的字符集，include_multibyte 为真时同时匹配任意多字节字符
+static int negated_class_node(RegexParser* parser, ByteSet ascii, bool include_multibyte) {
+    if (parser->ignore_case) byte_set_fold_case(&ascii);
+    ByteSet complement;
+    memset(&complement, 0, sizeof(complement));
+    for (int c = 0; c < 128; c++) {
+        if (!byte_set_has(&ascii, c)) byte_set_add(&complement, c);
+    }
+    int node = new_set_node(parser, complement);
+    return include_multibyte ? new_node(parser, NODE_ALT, node, any_multibyte_node(parser)) : node;
+}
+
+// 解析 \d \w \s 类转义的ASCII部分，成功时填充 set 并返回 true
+// （\w 另外匹配所有非ASCII字符，与 ranked_search.c 把中文等字符视为单词字符一致）
+static bool class_escape(unsigned char c, ByteSet* set) {
+    memset(set, 0, sizeof(*set));
+    switch (c) {
+        case 'd': case 'D':
+            byte_set_add_range(set, '0', '9');
+            return true;
+        case 'w': case 'W':
+            byte_set_add_range(set, '0', '9');
+            byte_set_add_range(set, 'a', 'z');
+            byte_set_add_range(set, 'A', 'Z');
+            byte_set_add(set, '_');
+            return true;
+        case 's': case 'S':
+            byte_set_add(set, ' ');
+            byte_set_add_range(set, '\t', '\r');
+            return true;
+        default:
+            return false;
+    }
+}
+
+static int hex_value(unsigned char c) {
+    if (c >= '0' && c <= '9') return c - '0';
+    if (c >= 'a' && c <= 'f') return c - 'a' + 10;
+    if (c >= 'A' && c <= 'F') return c - 'A' + 10;
+    return -1;
+}
+
+// 解析表示单个字节的转义（反斜杠已读取），返回字节值，不是字节转义时返回-1
+static int byte_escape(RegexParser* parser) {
+    unsigned char c = *parser->p++;
+    switch (c) {
+        case 't': return '\t';
+        case 'n': return '\n';
+        case 'r': return '\r';
+        case 'f': return '\f';
+        case 'v': return '\v';
+        case 'x': {
+            if (parser->end - parser->p < 2 || hex_value(parser->p[0]) < 0 || hex_value(parser->p[1]) < 0) {
+                return parse_fail(parser, "\\x 之后需要两位十六进制数");
+            }
+            int value = hex_value(parser->p[0]) * 16 + hex_value(parser->p[1]);
+            parser->p += 2;
+            return value;
+        }
+        default:
+            if ((c >= 'a' && c <= 'z') || (c >= 'A' && c <= 'Z') || (c >= '0' && c <= '9')) {
+                return parse_fail(parser, "不支持的转义序列");
+            }
+            return c;
+    }
+}
+
+// 解析字符类（'['已读取）；glob 为真时按通配符语法：'!'表示取反，'^'与'\\'按字面处理（与 fnmatch 相同）
+static int parse_class(RegexParser* parser, bool glob) {
+    ByteSet ascii;
+    memset(&ascii, 0, sizeof(ascii));
+    int multibyte = -1;  // 非ASCII成员组成的分支
+    bool word = false;   // 含 \w（匹配所有非ASCII字符）
+    bool negate = parser->p < parser->end && *parser->p == (glob ? '!' : '^');
+    if (negate) parser->p++;
+    bool first = true;
+    while (parser->p < parser->end && (*parser->p != ']' || first)) {
+        first = false;
+        int lo;
+        if (*parser->p == '\\' && parser->p + 1 < parser->end && !glob) {
+            parser->p++;
+            ByteSet escaped;
+            if (class_escape(*parser->p, &escaped)) {
+                if (*parser->p >= 'A' && *parser->p <= 'Z') {
+                    return parse_fail(parser, "字符类中不支持 \\D \\W \\S");
+                }
+                if (*parser->p == 'w') word = true;
+                parser->p++;
+                for (int i = 0; i < 8; i++) ascii.bits[i] |= escaped.bits[i];
+                continue;
+            }
+            lo = byte_escape(parser);
+            if (lo < 0) return -1;
+        } else if (*parser->p >= 0x80) {
+            // 非ASCII字符作为整体加入（不支持范围与取反）
+            int length = get_utf8_char_length(*parser->p);
+            if (negate) return parse_fail(parser, "取反的字符类中不支持非ASCII字符");
+            if (parser->end - parser->p < length) return parse_fail(parser, "无效的UTF-8字符");
+            int sequence = -1;
+            for (int i = 0; i < length; i++) {
+                sequence = concat_nodes(parser, sequence, new_byte_node(parser, parser->p[i], parser->p[i]));
+            }
+            parser->p += length;
+            if (parser->p + 1 < parser->end && *parser->p == '-' && parser->p[1] != ']') {
+                return parse_fail(parser, "字符类中不支持非ASCII字符的范围");
+            }
+            multibyte = multibyte < 0 ? sequence : new_node(parser, NODE_ALT, multibyte, sequence);
+            continue;
+        } else {
+            lo = *parser->p++;
+        }
+        if (parser->p + 1 < parser->end && *parser->p == '-' && parser->p[1] != ']') {
+            parser->p++;
+            int hi;
+            if (*parser->p == '\\' && parser->p + 1 < parser->end && !glob) {
+                parser->p++;
+                hi = byte_escape(parser);
+                if (hi < 0) return -1;
+            } else {
+                hi = *parser->p++;
+            }
+            if (hi >= 0x80) return parse_fail(parser, "字符类中不支持非ASCII字符的范围");
+            if (hi < lo) return parse_fail(parser, "字符类的范围无效");
+            byte_set_add_range(&ascii, lo, hi);
+        } else {
+            byte_set_add(&ascii, lo);
+        }
+    }
+    if (parser->p >= parser->end) return parse_fail(parser, "字符类缺少 ']'");
+    parser->p++;
+    if (negate) return negated_class_node(parser, ascii, !word);
+    if (word) multibyte = any_multibyte_node(parser);  // 已包含全部非ASCII字符
+    int node = new_set_node(parser, ascii);
+    return multibyte < 0 ? node : new_node(parser, NODE_ALT, node, multibyte);
+}
+
+// 解析原子：字符、字符类、分组、锚点或转义
+static int parse_atom(RegexParser* parser) {
+    unsigned char c = *parser->p;
+    if (c == '(') {
+        parser->p++;
+        if (parser->end - parser->p >= 2 && parser->p[0] == '?' && parser->p[1] == ':') {
+            parser->p += 2;
+        } else if (parser->p < parser->end && *parser->p == '?') {
+            return parse_fail(parser, "不支持的分组语法");
+        }
+        int node = parse_alternation(parser);
+        if (parser->failed) return -1;
+        if (parser->p >= parser->end || *parser->p != ')') return parse_fail(parser, "缺少 ')'");
+        parser->p++;
+        return node < 0 ? new_node(parser, NODE_EMPTY, -1, -1) : node;
+    }
+    if (c == '[') {
+        parser->p++;
+        return parse_class(parser, false);
+    }
+    if (c == '.') {
+        parser->p++;
+        ByteSet none;
+        memset(&none, 0, sizeof(none));
+        return negated_class_node(parser, none, true);
+    }
+    if (c == '^' || c == '$') {
+        parser->p++;
+        return new_node(parser, c == '^' ? NODE_BEGIN : NODE_END, -1, -1);
+    }
+    if (c == '*' || c == '+' || c == '?') {
+        return parse_fail(parser, "量词之前缺少内容");
+    }
+    if (c == '\\') {
+        parser->p++;
+        if (parser->p >= parser->end) return parse_fail(parser, "模式以 '\\' 结尾");
+        unsigned char escaped = *parser->p;
+        ByteSet set;
+        if (class_escape(escaped, &set)) {
+            parser->p++;
+            if (escaped == 'w') return new_node(parser, NODE_ALT, new_set_node(parser, set), any_multibyte_node(parser));
+            if (escaped == 'W') return negated_class_node(parser, set, false);
+            return escaped >= 'A' && escaped <= 'Z' ? negated_class_node(parser, set, true) : new_set_node(parser, set);
+        }
+        if (escaped == 'A' || escaped == 'z' || escaped == 'Z') {
+            parser->p++;
+            return new_node(parser, escaped == 'A' ? NODE_BEGIN : NODE_END, -1, -1);
+        }
+        if (escaped == 'b' || escaped == 'B') return parse_fail(parser, "不支持单词边界");
+        int value = byte_escape(parser);
+        return value < 0 ? -1 : new_byte_node(parser, value, value);
+    }
+    // 普通字符：多字节UTF-8字符作为整体，量词作用于整个字符
+    int length = c >= 0x80 ? get_utf8_char_length(c) : 1;
+    if (parser->end - parser->p < length) return parse_fail(parser, "无效的UTF-8字符");
+    int node = -1;
+    for (int i = 0; i < length; i++) {
+        node = concat_nodes(parser, node, new_byte_node(parser, parser->p[i], parser->p[i]));
+    }
+    parser->p += length;
+    return node;
+}
+
+// 解析 {m}、{m,}、{m,n}（'{'未读取），不是合法量词时返回 false 且不移动位置
+static bool parse_braces(RegexParser* parser, int* min, int* max) {
+    const unsigned char* p = parser->p + 1;
+    int values[2] = {-1, -1};
+    bool comma = false;
+    for (int k = 0; k < 2; k++) {
+        int value = -1;
+        while (p < parser->end && *p >= '0' && *p <= '9') {
+            value = (value < 0 ? 0 : value * 10) + (*p - '0');
+            if (value > 100000) value = 100000;
+            p++;
+        }
+        values[k] = value;
+        if (k == 0 && p < parser->end && *p == ',') {
+            comma = true;
+            p++;
+        } else {
+            break;
+        }
+    }
+    if (p >= parser->end || *p != '}' || values[0] < 0) return false;
+    *min = values[0];
+    *max = comma ? values[1] : values[0];
+    parser->p = p + 1;
+    return true;
+}
+
+// 解析原子及其后的量词
+static int parse_repeat(RegexParser* parser) {
+    int node = parse_atom(parser);
+    while (!parser->failed && parser->p < parser->end) {
+        unsigned char c = *parser->p;
+        int min, max;
+        if (c == '*' || c == '+' || c == '?') {
+            parser->p++;
+            node = new_node(parser, c == '*' ? NODE_STAR : c == '+' ? NODE_PLUS : NODE_QUEST, node, -1);
+        } else if (c == '{' && parse_braces(parser, &min, &max)) {
+            if (min > REGEX_MAX_REPEAT || max > REGEX_MAX_REPEAT) return parse_fail(parser, "重复次数过大");
+            if (max >= 0 && max < min) return parse_fail(parser, "重复次数的范围无效");
+            node = new_node(parser, NODE_REPEAT, node, -1);
+            if (node >= 0) {
+                parser->nodes[node].min = min;
+                parser->nodes[node].max = max;
+            }
+        } else {
+            break;
+        }
+        if (parser->p < parser->end && *parser->p == '?') parser->p++;  // 惰性量词
+    }
+    return node;
+}
+
+static int parse_concatenation(RegexParser* parser) {
+    int node = -1;
+    while (!parser->failed && parser->p < parser->end && *parser->p != '|' && *parser->p != ')') {
+        node = concat_nodes(parser, node, parse_repeat(parser));
+    }
+    return node < 0 ? new_node(parser, NODE_EMPTY, -1, -1) : node;
+}
+
+static int parse_alternation(RegexParser* parser) {
+    int node = parse_concatenation(parser);
+    while (!parser->failed && parser->p < parser->end && *parser->p == '|') {
+        parser->p++;
+        node = new_node(parser, NODE_ALT, node, parse_concatenation(parser));
+    }
+    return node;
+}
+
+// 通配符模式中 p 处的'['之后是否有闭合的']'（紧跟'['或'[!'的']'按字面处理）
+static bool glob_class_closed(const unsigned char* p, const unsigned char* end) {
+    p++;
+    if (p < end && *p == '!') p++;
+    if (p < end && *p == ']') p++;
+    while (p < end && *p != ']') p++;
+    return p < end;
+}
+
+// 解析通配符模式：两端锚定，* 转换为任意字符的重复
+static int parse_glob(RegexParser* parser) {
+    ByteSet none;
+    memset(&none, 0, sizeof(none));
+    int node = new_node(parser, NODE_BEGIN, -1, -1);
+    while (!parser->failed && parser->p < parser->end) {
+        unsigned char c = *parser->p;
+        int atom;
+        if (c == '*') {
+            while (parser->p < parser->end && *parser->p == '*') parser->p++;
+            atom = new_node(parser, NODE_STAR, negated_class_node(parser, none, true), -1);
+        } else if (c == '?') {
+            parser->p++;
+            atom = negated_class_node(parser, none, true);
+        } else if (c == '[' && glob_class_closed(parser->p, parser->end)) {
+            parser->p++;
+            atom = parse_class(parser, true);
+        } else {
+            int length = c >= 0x80 ? get_utf8_char_length(c) : 1;
+            if (parser->end - parser->p < length) return parse_fail(parser, "无效的UTF-8字符");
+            atom = -1;
+            for (int i = 0; i < length; i++) {
+                atom = concat_nodes(parser, atom, new_byte_node(parser, parser->p[i], parser->p[i]));
+            }
+            parser->p += length;
+        }
+        node = concat_nodes(parser, node, atom);
+    }
+    return concat_nodes(parser, node, new_node(parser, NODE_END, -1, -1));
+}
+
+// ---------- 必需字面量 ----------
+
+// 节点的字面量信息：每个匹配都以 prefix 开头、以 suffix 结尾、包含 best；
+// exact 为真时节点只匹配一个固定字符串（即 prefix）
+typedef struct {
+    bool exact;
+    char prefix[REGEX_MAX_LITERAL];
+    int prefix_len;
+    char suffix[REGEX_MAX_LITERAL];
+    int suffix_len;
+    char best[REGEX_MAX_LITERAL];
+    int best_len;
+} LiteralInfo;
+
+static void literal_set_exact(LiteralInfo* info, const char* text, int len) {
+    info->exact = true;
+    memcpy(info->prefix, text, (size_t)len);
+    memcpy(info->suffix, text, (size_t)len);
+    memcpy(info->best, text, (size_t)len);
+    info->prefix_len = info->suffix_len = info->best_len = len;
+}
+
+static void literal_set_unknown(LiteralInfo* info) {
+    info->exact = false;
+    info->prefix_len = info->suffix_len = info->best_len = 0;
+}
+
+// 拼接 a 与 b 写入 out：keep_front 为真时超长部分从尾部截掉，否则从头部截掉
+static int literal_join(const char* a, int a_len, const char* b, int b_len, char* out, bool keep_front) {
+    char joined[REGEX_MAX_LITERAL * 2];
+    memcpy(joined, a, (size_t)a_len);
+    memcpy(joined + a_len, b, (size_t)b_len);
+    int len = a_len + b_len;
+    int keep = len < REGEX_MAX_LITERAL ? len : REGEX_MAX_LITERAL;
+    memcpy(out, keep_front ? joined : joined + (len - keep), (size_t)keep);
+    return keep;
+}
+
+static void literal_info(const RegexParser* parser, int node, LiteralInfo* info) {
+    const RegexNode* n = &parser->nodes[node];
+    switch (n->kind) {
+        case NODE_EMPTY:
+        case NODE_BEGIN:
+        case NODE_END:
+            literal_set_exact(info, "", 0);
+            return;
+        case NODE_SET: {
+            int c = byte_set_single(&parser->sets[n->set], parser->ignore_case);
+            if (c < 0) {
+                literal_set_unknown(info);
+            } else {
+                char text = (char)c;
+                literal_set_exact(info, &text, 1);
+            }
+            return;
+        }
+        case NODE_CONCAT: {
+            LiteralInfo a, b;
+            literal_info(parser, n->left, &a);
+            literal_info(parser, n->right, &b);
+            if (a.exact && b.exact && a.prefix_len + b.prefix_len <= REGEX_MAX_LITERAL) {
+                char joined[REGEX_MAX_LITERAL];
+                int len = literal_join(a.prefix, a.prefix_len, b.prefix, b.prefix_len, joined, true);
+                literal_set_exact(info, joined, len);
+                return;
+            }
+            info->exact = false;
+            if (a.exact) {
+                info->prefix_len = literal_join(a.prefix, a.prefix_len, b.prefix, b.prefix_len, info->prefix, true);
+            } else {
+                memcpy(info->prefix, a.prefix, (size_t)a.prefix_len);
+                info->prefix_len = a.prefix_len;
+            }
+            if (b.exact) {
+                info->suffix_len = literal_join(a.suffix, a.suffix_len, b.suffix, b.suffix_len, info->suffix, false);
+            } else {
+                memcpy(info->suffix, b.suffix, (size_t)b.suffix_len);
+                info->suffix_len = b.suffix_len;
+            }
+            // 最长的必需字面量来自左右两侧之一，或横跨两者的连接处
+            char junction[REGEX_MAX_LITERAL];
+            int junction_len = literal_join(a.suffix, a.suffix_len, b.prefix, b.prefix_len, junction, true);
+            const char* best = junction;
+            int best_len = junction_len;
+            if (a.best_len > best_len) { best = a.best; best_len = a.best_len; }
+            if (b.best_len > best_len) { best = b.best; best_len = b.best_len; }
+            memcpy(info->best, best, (size_t)best_len);
+            info->best_len = best_len;
+            return;
+        }
+        case NODE_PLUS:
+        case NODE_REPEAT:
+            if (n->kind == NODE_PLUS || n->min > 0) {
+                // 至少出现一次：子节点的字面量仍是必需的，但不再是固定字符串
+                literal_info(parser, n->left, info);
+                info->exact = info->exact && n->kind == NODE_REPEAT && n->min == 1 && n->max == 1;
+                return;
+            }
+            literal_set_unknown(info);
+            return;
+        default:
+            literal_set_unknown(info);
+            return;
+    }
+}
+
+// ---------- NFA ----------
+
+typedef enum {
+    NFA_SET,    // 读取一个属于 set 的字节后转到 out
+    NFA_SPLIT,  // 不读取输入，同时转到 out 与 out1（out1 可为 -1）
+    NFA_BEGIN,  // 位于输入开头时转到 out
+    NFA_END,    // 位于输入末尾时转到 out
+    NFA_MATCH
+} NfaKind;
+
+typedef struct {
+    NfaKind kind;
+    int set;
+    int out;
+    int out1;
+} NfaState;
+
+typedef struct {
+    const RegexParser* parser;
+    NfaState* states;
+    int count;
+    bool overflow;
+} NfaBuilder;
+
+static int nfa_add(NfaBuilder* nfa, NfaKind kind, int set, int out, int out1) {
+    if (nfa->count >= REGEX_MAX_NFA_STATES) {
+        nfa->overflow = true;
+        return out;
+    }
+    NfaState* state = &nfa->states[nfa->count];
+    state->kind = kind;
+    state->set = set;
+    state->out = out;
+    state->out1 = out1;
+    return nfa->count++;
+}
+
+// 从后向前构造：返回匹配 node 之后转到 next 的起始状态
+static int nfa_compile(NfaBuilder* nfa, int node, int next) {
+    if (nfa->overflow) return next;
+    const RegexNode* n = &nfa->parser->nodes[node];
+    switch (n->kind) {
+        case NODE_EMPTY:
+            return next;
+        case NODE_SET:
+            return nfa_add(nfa, NFA_SET, n->set, next, -1);
+        case NODE_BEGIN:
+            return nfa_add(nfa, NFA_BEGIN, -1, next, -1);
+        case NODE_END:
+            return nfa_add(nfa, NFA_END, -1, next, -1);
+        case NODE_CONCAT:
+            return nfa_compile(nfa, n->left, nfa_compile(nfa, n->right, next));
+        case NODE_ALT: {
+            int left = nfa_compile(nfa, n->left, next);
+            int right = nfa_compile(nfa, n->right, next);
+            return nfa_add(nfa, NFA_SPLIT, -1, left, right);
+        }
+        case NODE_QUEST:
+            return nfa_add(nfa, NFA_SPLIT, -1, nfa_compile(nfa, n->left, next), next);
+        case NODE_STAR:
+        case NODE_PLUS: {
+            int loop = nfa_add(nfa, NFA_SPLIT, -1, -1, next);
+            if (nfa->overflow) return next;
+            int body = nfa_compile(nfa, n->left, loop);
+            nfa->states[loop].out = body;
+            return n->kind == NODE_STAR ? loop : body;
+        }
+        case NODE_REPEAT: {
+            int state = next;
+            if (n->max < 0) {
+                int loop = nfa_add(nfa, NFA_SPLIT, -1, -1, next);
+                if (nfa->overflow) return next;
+                nfa->states[loop].out = nfa_compile(nfa, n->left, loop);
+                state = loop;
+            } else {
+                // 可选的 max - min 次嵌套为 (x(x)?)?，跳过时直接转到 next
+                for (int i = 0; i < n->max - n->min && !nfa->overflow; i++) {
+                    state = nfa_add(nfa, NFA_SPLIT, -1, nfa_compile(nfa, n->left, state), next);
+                }
+            }
+            for (int i = 0; i < n->min && !nfa->overflow; i++) {
+                state = nfa_compile(nfa, n->left, state);
+            }
+            return state;
+        }
+    }
+    return next;
+}
+
+// ---------- DFA ----------
+
+struct SearchRegex {
+    int class_count;
+    unsigned char byte_class[256];  // 字节 -> 等价类
+    int* transitions;               // transitions[state * class_count + class]
+    unsigned char* flags;           // REGEX_STATE_*
+    int state_count;
+    int start;
+    char* literal;                  // 必需字面量（ignore_case 时为小写），可为空串
+    size_t literal_len;
+    bool ignore_case;
+};
+
+typedef struct {
+    const NfaState* nfa;
+    int nfa_count;
+    const ByteSet* sets;
+    int* marks;           // 闭包计算的访问标记
+    int stamp;
+    int* stack;
+    int* members;         // 当前状态集合
+    int member_count;
+    // DFA状态：成员存放在 pool 中
+    int* pool;
+    long long pool_len;
+    long long pool_capacity;
+    long long* member_offsets;
+    int* member_counts;
+    int state_count;
+    int state_capacity;
+    int* table;           // 哈希表：DFA状态编号 + 1，0表示空
+    int table_capacity;
+} DfaBuilder;
+
+// 把 state 的闭包加入 members：跟随 SPLIT，位于开头时跟随 BEGIN；at_end 为真时跟随 END
+static void dfa_closure(DfaBuilder* b, int state, bool at_begin, bool at_end) {
+    int top = 0;
+    b->stack[top++] = state;
+    while (top > 0) {
+        int s = b->stack[--top];
+        if (s < 0 || b->marks[s] == b->stamp) continue;
+        b->marks[s] = b->stamp;
+        const NfaState* n = &b->nfa[s];
+        switch (n->kind) {
+            case NFA_SPLIT:
+                b->stack[top++] = n->out1;
+                b->stack[top++] = n->out;
+                break;
+            case NFA_BEGIN:
+                if (at_begin) b->stack[top++] = n->out;
+                break;
+            case NFA_END:
+                if (at_end) {
+                    b->stack[top++] = n->out;
+                } else {
+                    b->members[b->member_count++] = s;
+                }
+                break;
+            default:
+                b->members[b->member_count++] = s;
+                break;
+        }
+    }
+}
+
+static int compare_ints(const void* a, const void* b) {
+    int x = *(const int*)a;
+    int y = *(const int*)b;
+    return (x > y) - (x < y);
+}
+
+static unsigned int members_hash(const int* members, int count) {
+    unsigned int hash = 2166136261u;
+    for (int i = 0; i < count; i++) {
+        hash = (hash ^ (unsigned int)members[i]) * 16777619u;
+    }
+    return hash;
+}
+
+// 查找或加入当前 members 组成的DFA状态（members 需已排序），返回状态编号，超过上限时返回 -1
+static int dfa_intern(DfaBuilder* b) {
+    unsigned int mask = (unsigned int)b->table_capacity - 1;
+    unsigned int slot = members_hash(b->members, b->member_count) & mask;
+    for (; b->table[slot] != 0; slot = (slot + 1) & mask) {
+        int id = b->table[slot] - 1;
+        if (b->member_counts[id] == b->member_count &&
+            memcmp(b->pool + b->member_offsets[id], b->members, sizeof(int) * b->member_count) == 0) {
+            return id;
+        }
+    }
+    if (b->state_count >= REGEX_MAX_DFA_STATES) return -1;
+    if (b->state_count >= b->state_capacity) {
+        b->state_capacity *= 2;
+        b->member_offsets = (long long*)realloc(b->member_offsets, sizeof(long long) * b->state_capacity);
+        b->member_counts = (int*)realloc(b->member_counts, sizeof(int) * b->state_capacity);
+    }
+    if (b->pool_len + b->member_count > b->pool_capacity) {
+        while (b->pool_len + b->member_count > b->pool_capacity) b->pool_capacity *= 2;
+        b->pool = (int*)realloc(b->pool, sizeof(int) * b->pool_capacity);
+    }
+    int id = b->state_count++;
+    memcpy(b->pool + b->pool_len, b->members, sizeof(int) * b->member_count);
+    b->member_offsets[id] = b->pool_len;
+    b->member_counts[id] = b->member_count;
+    b->pool_len += b->member_count;
+    b->table[slot] = id + 1;
+    return id;
+}
+
+// 计算各字节的等价类：属于完全相同的NFA字节集合的字节归为一类
+static int compute_byte_classes(const ByteSet* sets, int set_count, unsigned char* byte_class) {
+    int class_count = 1;
+    byte_class[0] = 0;
+    for (int c = 1; c < 256; c++) {
+        bool same = true;
+        for (int s = 0; s < set_count && same; s++) {
+            same = byte_set_has(&sets[s], c) == byte_set_has(&sets[s], c - 1);
+        }
+        if (!same) class_count++;
+        byte_class[c] = (unsigned char)(class_count - 1);
+    }
+    return class_count;
+}
+
+static bool dfa_build(SearchRegex* regex, const NfaState* nfa, int nfa_count, int nfa_start, const ByteSet* sets, int set_count) {
+    DfaBuilder b;
+    memset(&b, 0, sizeof(b));
+    b.nfa = nfa;
+    b.nfa_count = nfa_count;
+    b.sets = sets;
+    b.marks = (int*)calloc((size_t)nfa_count, sizeof(int));
+    b.stack = (int*)malloc(sizeof(int) * (size_t)(nfa_count * 2 + 2));
+    b.members = (int*)malloc(sizeof(int) * (size_t)(nfa_count + 1));
+    b.pool_capacity = 1024;
+    b.pool = (int*)malloc(sizeof(int) * b.pool_capacity);
+    b.state_capacity = 64;
+    b.member_offsets = (long long*)malloc(sizeof(long long) * b.state_capacity);
+    b.member_counts = (int*)malloc(sizeof(int) * b.state_capacity);
+    b.table_capacity = REGEX_MAX_DFA_STATES * 2;
+    b.table = (int*)calloc((size_t)b.table_capacity, sizeof(int));
+
+    regex->class_count = compute_byte_classes(sets, set_count, regex->byte_class);
+    unsigned char representative[256];
+    for (int c = 255; c >= 0; c--) representative[regex->byte_class[c]] = (unsigned char)c;
+
+    // 非锚定搜索：每读取一个字节后都从起始状态重新开始一次匹配
+    int* restart = (int*)malloc(sizeof(int) * (size_t)(nfa_count + 1));
+    b.stamp++;
+    b.member_count = 0;
+    dfa_closure(&b, nfa_start, false, false);
+    int restart_count = b.member_count;
+    memcpy(restart, b.members, sizeof(int) * restart_count);
+
+    b.stamp++;
+    b.member_count = 0;
+    dfa_closure(&b, nfa_start, true, false);
+    qsort(b.members, b.member_count, sizeof(int), compare_ints);
+    regex->start = dfa_intern(&b);
+
+    int transitions_capacity = 64;
+    regex->transitions = (int*)malloc(sizeof(int) * (size_t)transitions_capacity * regex->class_count);
+    regex->flags = (unsigned char*)malloc((size_t)transitions_capacity);
+    bool ok = true;
+    bool restart_consumes = false;
+    for (int i = 0; i < restart_count; i++) {
+        if (nfa[restart[i]].kind == NFA_SET) restart_consumes = true;
+    }
+
+    for (int id = 0; id < b.state_count && ok; id++) {
+        if (id >= transitions_capacity) {
+            transitions_capacity *= 2;
+            regex->transitions = (int*)realloc(regex->transitions, sizeof(int) * (size_t)transitions_capacity * regex->class_count);
+            regex->flags = (unsigned char*)realloc(regex->flags, (size_t)transitions_capacity);
+        }
+        // 复制成员，之后的 dfa_intern 可能使 pool 重新分配
+        int count = b.member_counts[id];
+        int* members = (int*)malloc(sizeof(int) * (size_t)(count + 1));
+        memcpy(members, b.pool + b.member_offsets[id], sizeof(int) * count);
+
+        unsigned char flags = 0;
+        bool consumes = false;
+        b.stamp++;
+        b.member_count = 0;
+        for (int i = 0; i < count; i++) {
+            if (nfa[members[i]].kind == NFA_MATCH) flags |= REGEX_STATE_MATCH;
+            if (nfa[members[i]].kind == NFA_SET) consumes = true;
+            if (nfa[members[i]].kind == NFA_END) dfa_closure(&b, nfa[members[i]].out, false, true);
+        }
+        for (int i = 0; i < b.member_count; i++) {
+            if (nfa[b.members[i]].kind == NFA_MATCH) flags |= REGEX_STATE_END_MATCH;
+        }
+        if (!(flags & REGEX_STATE_MATCH) && !consumes && !restart_consumes && !(flags & REGEX_STATE_END_MATCH)) {
+            flags |= REGEX_STATE_DEAD;
+        }
+        regex->flags[id] = flags;
+
+        int* row = regex->transitions + (size_t)id * regex->class_count;
+        if (flags & (REGEX_STATE_MATCH | REGEX_STATE_DEAD)) {
+            // 已匹配或不可能匹配时扫描立即结束，不需要转移
+            for (int c = 0; c < regex->class_count; c++) row[c] = id;
+            free(members);
+            continue;
+        }
+        for (int c = 0; c < regex->class_count && ok; c++) {
+            b.stamp++;
+            b.member_count = 0;
+            for (int i = 0; i < count; i++) {
+                const NfaState* n = &nfa[members[i]];
+                if (n->kind == NFA_SET && byte_set_has(&sets[n->set], representative[c])) {
+                    dfa_closure(&b, n->out, false, false);
+                }
+            }
+            for (int i = 0; i < restart_count; i++) {
+                if (b.marks[restart[i]] != b.stamp) {
+                    b.marks[restart[i]] = b.stamp;
+                    b.members[b.member_count++] = restart[i];
+                }
+            }
+            qsort(b.members, b.member_count, sizeof(int), compare_ints);
+            int target = dfa_intern(&b);
+            if (target < 0) {
+                ok = false;
+            } else {
+                row[c] = target;
+            }
+        }
+        free(members);
+    }
+    regex->state_count = b.state_count;
+
+    free(restart);
+    free(b.marks);
+    free(b.stack);
+    free(b.members);
+    free(b.pool);
+    free(b.member_offsets);
+    free(b.member_counts);
+    free(b.table);
+    return ok;
+}
+
+// 按正则表达式或通配符语法编译模式，失败时返回 NULL 并把原因（UTF-8）写入 error
+static SearchRegex* compile_pattern(const char* pattern, bool ignore_case, bool glob, char* error, int error_size) {
+    if (error != NULL && error_size > 0) error[0] = '\0';
+    if (pattern == NULL) return NULL;
+
+    RegexParser parser;
+    memset(&parser, 0, sizeof(parser));
+    parser.p = (const unsigned char*)pattern;
+    parser.end = parser.p + strlen(pattern);
+    parser.ignore_case = ignore_case;
+    parser.nodes = (RegexNode*)malloc(sizeof(RegexNode) * REGEX_MAX_NODES);
+    parser.set_capacity = 16;
+    parser.sets = (ByteSet*)malloc(sizeof(ByteSet) * parser.set_capacity);
+    parser.error = error;
+    parser.error_size = error_size;
+
+    int root = glob ? parse_glob(&parser) : parse_alternation(&parser);
+    if (!parser.failed && parser.p < parser.end) parse_fail(&parser, "多余的 ')'");
+
+    SearchRegex* regex = NULL;
+    if (!parser.failed) {
+        NfaBuilder nfa;
+        nfa.parser = &parser;
+        nfa.states = (NfaState*)malloc(sizeof(NfaState) * REGEX_MAX_NFA_STATES);
+        nfa.count = 0;
+        nfa.overflow = false;
+        int match = nfa_add(&nfa, NFA_MATCH, -1, -1, -1);
+        int start = nfa_compile(&nfa, root, match);
+        if (nfa.overflow) {
+            parse_fail(&parser, "模式过于复杂（重复展开后状态过多）");
+        } else {
+            regex = (SearchRegex*)calloc(1, sizeof(SearchRegex));
+            regex->ignore_case = ignore_case;
+            if (!dfa_build(regex, nfa.states, nfa.count, start, parser.sets, parser.set_count)) {
+                parse_fail(&parser, "模式过于复杂（DFA状态数超过上限）");
+                regex_free(regex);
+                regex = NULL;
+            } else {
+                LiteralInfo info;
+                literal_info(&parser, root, &info);
+                regex->literal = (char*)malloc((size_t)info.best_len + 1);
+                memcpy(regex->literal, info.best, (size_t)info.best_len);
+                regex->literal[info.best_len] = '\0';
+                regex->literal_len = (size_t)info.best_len;
+            }
+        }
+        free(nfa.states);
+    }
+    free(parser.nodes);
+    free(parser.sets);
+    return regex;
+}
+
+// 编译正则表达式，失败时返回 NULL 并把原因（UTF-8）写入 error
+SearchRegex* regex_compile(const char* pattern, bool ignore_case, char* error, int error_size) {
+    return compile_pattern(pattern, ignore_case, false, error, error_size);
+}
+
+// 编译通配符模式（需匹配整项），失败时返回 NULL 并把原因（UTF-8）写入 error
+SearchRegex* glob_compile(const char* pattern, bool ignore_case, char* error, int error_size) {
+    return compile_pattern(pattern, ignore_case, true, error, error_size);
+}
+
+// 每个匹配都必须包含的最长字面量（ignore_case 时为小写），没有时为空串
+const char* regex_literal(const SearchRegex* regex) {
+    return regex != NULL && regex->literal != NULL ? regex->literal : "";
+}
+
+int regex_state_count(const SearchRegex* regex) {
+    return regex != NULL ? regex->state_count : 0;
+}
+
+// text 中是否存在匹配（与 re.search 相同，不要求匹配整个文本）
+bool regex_match(const SearchRegex* regex, const char* text, size_t len) {
+    const int* transitions = regex->transitions;
+    const unsigned char* flags = regex->flags;
+    int class_count = regex->class_count;
+    int state = regex->start;
+    for (size_t i = 0; i < len; i++) {
+        if (flags[state] & (REGEX_STATE_MATCH | REGEX_STATE_DEAD)) break;
+        state = transitions[(size_t)state * class_count + regex->byte_class[(unsigned char)text[i]]];
+    }
+    return (flags[state] & (REGEX_STATE_MATCH | REGEX_STATE_END_MATCH)) != 0;
+}
+
+void regex_free(SearchRegex* regex) {
+    if (regex == NULL) return;
+    free(regex->transitions);
+    free(regex->flags);
+    free(regex->literal);
+    free(regex);
+}
+
+// ---------- 扫描 ----------
+
+// 扫描 [start, end) 中的项：先查找必需字面量，再运行DFA
+static SearchResult* regex_scan_items(const ItemSet* set, int start, int end, const SearchRegex* regex, const volatile int* cancel) {
+    SearchResult* result = init_search_result();
+    size_t item_len = 0;
+    for (int i = start; i < end; i++) {
+        if (((i - start) & (SEARCH_CANCEL_CHECK_INTERVAL - 1)) == 0 && search_cancelled(cancel)) break;
+        const char* item = item_set_get(set, i, &item_len);
+        if (item == NULL) continue;
+        if (regex->literal_len > 0) {
+            const char* found = regex->ignore_case ? find_folded(item, item_len, regex->literal, regex->literal_len)
+                                                   : strstr(item, regex->literal);
+            if (found == NULL) continue;
+        }
+        if (regex_match(regex, item, item_len)) {
+            add_to_result(result, i);
+        }
+    }
+    return result;
+}
+
+typedef struct {
+    const ItemSet* set;
+    const SearchRegex* regex;
+    int chunk_size;
+    SearchResult** chunk_results;
+    const volatile int* cancel;
+} RegexSearchTask;
+
+static void regex_search_chunk(void* context, int task_index) {
+    RegexSearchTask* task = (RegexSearchTask*)context;
+    int start = task_index * task->chunk_size;
+    int end = start + task->chunk_size;
+    if (end > task->set->count) end = task->set->count;
+    task->chunk_results[task_index] = regex_scan_items(task->set, start, end, task->regex, task->cancel);
+}
+
+// 在项集合中按正则表达式搜索，结果按索引升序；使用 options 中的 num_threads、cancel 与 basename_only
+SearchResult* regex_search_item_set(const ItemSet* set, const SearchRegex* regex, const SearchOptions* options) {
+    ItemSet view = *set;
+    view.basename_only = set->basename_only || options->basename_only;
+    int num_threads = options->num_threads;
+    RegexSearchTask task;
+    int chunk_count = plan_search_chunks(view.count, &num_threads, &task.chunk_size);
+    if (chunk_count <= 1) {
+        return regex_scan_items(&view, 0, view.count, regex, options->cancel);
+    }
+
+    task.set = &view;
+    task.regex = regex;
+    task.cancel = options->cancel;
+    task.chunk_results = (SearchResult**)calloc(chunk_count, sizeof(SearchResult*));
+    search_pool_run(num_threads, regex_search_chunk, &task, chunk_count);
+
+    // 各块结果已是全局索引，按块顺序拼接即为升序
+    SearchResult* result = init_search_result();
+    for (int c = 0; c < chunk_count; c++) {
+        SearchResult* chunk = task.chunk_results[c];
+        for (int i = 0; i < chunk->count; i++) {
+            add_to_result(result, chunk->indices[i]);
+        }
+        free_search_result(chunk);
+    }
+    free(task.chunk_results);
+    return result;
+}
+
+// 只在 candidates 列出的项（升序索引，调用方保证有效）中按正则表达式搜索，返回 set 中的索引
+SearchResult* regex_search_item_subset(const ItemSet* set, const int* candidates, int candidate_count, const SearchRegex* regex, const SearchOptions* options) {
+    ItemSet view = *set;
+    view.basename_only = set->basename_only || options->basename_only;
+    const char** items = (const char**)malloc(sizeof(const char*) * (candidate_count > 0 ? candidate_count : 1));
+    size_t item_len;
+    for (int i = 0; i < candidate_count; i++) {
+        items[i] = item_set_get(&view, candidates[i], &item_len);
+    }
+    ItemSet subset = {items, NULL, NULL, candidate_count, NULL, false, NULL};
+    SearchOptions subset_options = *options;
+    subset_options.basename_only = false;
+    SearchResult* result = regex_search_item_set(&subset, regex, &subset_options);
+    free(items);
+    for (int i = 0; i < result->count; i++) {
+        result->indices[i] = candidates[result->indices[i]];
+    }
+    return result;
+}
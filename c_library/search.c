@@ -2,13 +2,7 @@
 #include <stdlib.h>
 #include <string.h>
 #include <stdbool.h>
-
-// 搜索结果结构体
-typedef struct {
-    int* indices;
-    int count;
-    int capacity;
-} SearchResult;
+#include "search.h"
 
 // 初始化搜索结果
 SearchResult* init_search_result() {
@@ -16,6 +10,9 @@ SearchResult* init_search_result() {
     result->capacity = 10;
     result->count = 0;
     result->indices = (int*)malloc(sizeof(int) * result->capacity);
+    result->scores = NULL;
+    result->matches = NULL;
+    result->match_count = 0;
     return result;
 }
 
@@ -31,9 +28,74 @@ void add_to_result(SearchResult* result, int index) {
 // 释放搜索结果
 void free_search_result(SearchResult* result) {
     free(result->indices);
+    free(result->scores);
+    free(result->matches);
     free(result);
 }
 
+// 合并两个升序索引数组：difference 为假时求并集，为真时求差集（a 中不在 b 中的项），结果仍为升序
+// a 为 NULL 时表示 0 到 a_count - 1 的全部项（查询取反条件没有候选集时使用）；b 为 NULL 时 b_count 须为 0
+SearchResult* merge_sorted_indices(const int* a, int a_count, const int* b, int b_count, bool difference) {
+    if (a_count < 0 || b_count < 0 || (b == NULL && b_count > 0)) return NULL;
+    SearchResult* result = init_search_result();
+    int capacity = difference ? a_count : a_count + b_count;
+    if (capacity > result->capacity) {
+        free(result->indices);
+        result->indices = (int*)malloc(sizeof(int) * (size_t)capacity);
+        result->capacity = capacity;
+    }
+    int* out = result->indices;
+    int count = 0;
+    int i = 0, j = 0;
+    while (i < a_count) {
+        int value = a != NULL ? a[i] : i;
+        if (j < b_count && b[j] < value) {
+            if (!difference) out[count++] = b[j];
+            j++;
+            continue;
+        }
+        if (j < b_count && b[j] == value) {
+            if (!difference) out[count++] = value;
+            i++;
+            j++;
+            continue;
+        }
+        out[count++] = value;
+        i++;
+    }
+    if (!difference) {
+        while (j < b_count) out[count++] = b[j++];
+    }
+    result->count = count;
+    return result;
+}
+
+// 派生列（拼音、折叠文本等）的候选行：owners 为各行所属的项索引（非降序），candidates 为升序的项索引，
+// 返回所属项在 candidates 中的全部行号（升序）；两个数组同时顺序推进，一趟完成
+SearchResult* select_owner_rows(const int* owners, int owner_count, const int* candidates, int candidate_count) {
+    if (owner_count < 0 || candidate_count < 0 || (owners == NULL && owner_count > 0) ||
+        (candidates == NULL && candidate_count > 0)) {
+        return NULL;
+    }
+    SearchResult* result = init_search_result();
+    int row = 0, k = 0;
+    while (row < owner_count && k < candidate_count) {
+        if (owners[row] < candidates[k]) {
+            row++;
+        } else if (owners[row] > candidates[k]) {
+            k++;
+        } else {
+            add_to_result(result, row++);
+        }
+    }
+    return result;
+}
+
+// 释放由C分配的序列化缓冲区（索引导出使用）
+void free_search_buffer(char* buffer) {
+    free(buffer);
+}
+
 // 辅助函数：检查字符是否为UTF-8多字节字符的首字节
 bool is_utf8_first_byte(unsigned char c);
 
@@ -128,111 +190,137 @@ int strcasecmp_custom(const char* s1, const char* s2) {
     return (unsigned char)*p1 - (unsigned char)*p2;
 }
 
-// 辅助函数：大小写不敏感的子字符串搜索（支持UTF-8）
-const char* strcasestr_custom(const char* haystack, const char* needle) {
-    if (!*needle) return haystack;
-    
+// 大小写不敏感子串查找的SIMD加速（x86/x64上SSE2总是可用，其他平台使用标量实现）
+#if defined(__SSE2__) || defined(_M_X64) || (defined(_M_IX86_FP) && _M_IX86_FP >= 2)
+#define SEARCH_USE_SSE2 1
+#include <emmintrin.h>
+#ifdef _MSC_VER
+#include <intrin.h>
+static int lowest_bit(unsigned int mask) {
+    unsigned long index;
+    _BitScanForward(&index, mask);
+    return (int)index;
+}
+#else
+static int lowest_bit(unsigned int mask) {
+    return __builtin_ctz(mask);
+}
+#endif
+#endif
+
+// 字节是否为小写ASCII字母（needle已折叠，只需判断小写）
+static int is_folded_letter(unsigned char c) {
+    return c >= 'a' && c <= 'z';
+}
+
+// 比较 text 与已折叠的 needle 的前 n 个字节（ASCII大小写不敏感，其他字节精确匹配）
+static bool folded_equal(const unsigned char* text, const unsigned char* needle, size_t n) {
+    for (size_t i = 0; i < n; i++) {
+        if (to_lower(text[i]) != needle[i]) {
+            return false;
+        }
+    }
+    return true;
+}
+
+// 将关键词中的ASCII字母转换为小写，返回新分配的字符串（中文等多字节字符保持不变）
+char* fold_keyword(const char* keyword) {
+    size_t len = strlen(keyword);
+    char* folded = (char*)malloc(len + 1);
+    for (size_t i = 0; i <= len; i++) {
+        folded[i] = (char)to_lower((unsigned char)keyword[i]);
+    }
+    return folded;
+}
+
+// 在 haystack 中查找已折叠为小写的 needle，返回匹配位置或NULL
+// 先按 needle 的首尾字节筛选候选位置（SSE2一次比较16个位置），再逐字节校验。
+// 字母字节与0x20按位或后只有同一字母的大小写两种形式会等于小写字母，筛选不会产生误判。
+const char* find_folded(const char* haystack, size_t haystack_len, const char* needle, size_t needle_len) {
+    if (needle_len == 0) return haystack;
+    if (needle_len > haystack_len) return NULL;
+
     const unsigned char* h = (const unsigned char*)haystack;
     const unsigned char* n = (const unsigned char*)needle;
-    
-    // 计算needle的UTF-8字符长度
-    int needle_len = utf8_strlen((const char*)n);
-    
-    while (*h) {
-        const unsigned char* h_pos = h;
-        const unsigned char* n_pos = n;
-        int matched_chars = 0;
-        
-        // 逐字符比较
-        while (*h_pos && *n_pos) {
-            if (is_utf8_first_byte(*h_pos) && is_utf8_first_byte(*n_pos)) {
-                if (*h_pos >= 0x80 && *n_pos >= 0x80) {
-                    // 都是中文字符，需要比较完整的字符序列
-                    const unsigned char* h_temp = h_pos;
-                    const unsigned char* n_temp = n_pos;
-                    bool match = true;
-                    
-                    // 比较当前中文字符的所有字节
-                    while (1) {
-                        if (*h_temp != *n_temp) {
-                            match = false;
-                            break;
-                        }
-                        
-                        // 移动到下一个字节
-                        h_temp++;
-                        n_temp++;
-                        
-                        // 检查是否到达字符边界
-                        if ((*h_temp & 0xC0) != 0x80 || (*n_temp & 0xC0) != 0x80) {
-                            break;
-                        }
-                    }
-                    
-                    if (!match) {
-                        break;
-                    }
-                    
-                    // 移动指针到下一个字符的开始
-                    h_pos = h_temp;
-                    n_pos = n_temp;
-                } else if (*h_pos >= 0x80 || *n_pos >= 0x80) {
-                    // 一个是中文，一个是ASCII，不匹配
-                    break;
-                } else {
-                    // 都是ASCII字符，大小写不敏感比较
-                    if (to_lower(*h_pos) != to_lower(*n_pos)) {
-                        break;
-                    }
-                    h_pos++;
-                    n_pos++;
-                }
-                
-                matched_chars++;
-                
-                // 如果已经匹配了所有字符，返回结果
-                if (matched_chars == needle_len) {
-                    return (const char*)h;
-                }
-            } else {
-                // 处理单字节字符或多字节字符的后续字节
-                h_pos++;
-                n_pos++;
+    unsigned char first = n[0];
+    unsigned char last = n[needle_len - 1];
+    unsigned char first_mask = is_folded_letter(first) ? 0x20 : 0;
+    unsigned char last_mask = is_folded_letter(last) ? 0x20 : 0;
+    size_t end = haystack_len - needle_len + 1;  // 候选起始位置的上界（不含）
+    size_t i = 0;
+
+#ifdef SEARCH_USE_SSE2
+    const __m128i first_vec = _mm_set1_epi8((char)first);
+    const __m128i last_vec = _mm_set1_epi8((char)last);
+    const __m128i first_or = _mm_set1_epi8((char)first_mask);
+    const __m128i last_or = _mm_set1_epi8((char)last_mask);
+    for (; i + 16 <= end; i += 16) {
+        __m128i block_first = _mm_or_si128(_mm_loadu_si128((const __m128i*)(h + i)), first_or);
+        __m128i block_last = _mm_or_si128(_mm_loadu_si128((const __m128i*)(h + i + needle_len - 1)), last_or);
+        unsigned int mask = (unsigned int)_mm_movemask_epi8(
+            _mm_and_si128(_mm_cmpeq_epi8(block_first, first_vec), _mm_cmpeq_epi8(block_last, last_vec)));
+        while (mask) {
+            size_t pos = i + lowest_bit(mask);
+            if (needle_len <= 2 || folded_equal(h + pos + 1, n + 1, needle_len - 2)) {
+                return (const char*)(h + pos);
             }
+            mask &= mask - 1;
         }
-        
-        // 移动到haystack的下一个UTF-8字符
-        if (is_utf8_first_byte(*h)) {
-            h++;
-            // 跳过后续字节
-            while ((*h & 0xC0) == 0x80) {
-                h++;
+    }
+#else
+    // 标量实现：needle 中存在非字母字节时，用 memchr 跳到该字节的下一次出现
+    size_t anchor = 0;
+    while (anchor < needle_len && is_folded_letter(n[anchor])) anchor++;
+    if (anchor < needle_len) {
+        while (i < end) {
+            const unsigned char* hit = (const unsigned char*)memchr(h + i + anchor, n[anchor], end - i);
+            if (hit == NULL) return NULL;
+            size_t pos = (size_t)(hit - h) - anchor;
+            if (folded_equal(h + pos, n, needle_len)) {
+                return (const char*)(h + pos);
             }
-        } else {
-            h++;
+            i = pos + 1;
         }
+        return NULL;
     }
-    
-    return NULL; // 未找到
-}
+#endif
 
-// 线性搜索 - 在字符串数组中查找包含关键词的项（支持大小写不敏感）
-SearchResult* linear_search(const char** items, int items_count, const char* keyword) {
-    SearchResult* result = init_search_result();
-    int keyword_len = strlen(keyword);
-    
-    for (int i = 0; i < items_count; i++) {
-        const char* item = items[i];
-        if (item == NULL) continue;
-        
-        // 区分大小写的子字符串搜索（与Python实现保持一致）
-        const char* found = strstr(item, keyword);
-        if (found != NULL) {
-            add_to_result(result, i);
+    for (; i < end; i++) {
+        if ((h[i] | first_mask) == first && (h[i + needle_len - 1] | last_mask) == last &&
+            folded_equal(h + i + 1, n + 1, needle_len > 2 ? needle_len - 2 : 0)) {
+            return (const char*)(h + i);
         }
     }
-    
-    return result;
+    return NULL;
+}
+
+// 辅助函数：大小写不敏感的子字符串搜索（ASCII大小写不敏感，中文等多字节字符精确匹配）
+const char* strcasestr_custom(const char* haystack, const char* needle) {
+    char* folded = fold_keyword(needle);
+    const char* found = find_folded(haystack, strlen(haystack), folded, strlen(folded));
+    free(folded);
+    return found;
+}
+
+// 逐项扫描的搜索方式
+typedef enum {
+    SEARCH_MODE_LINEAR,
+    SEARCH_MODE_IGNORE_CASE,
+    SEARCH_MODE_FUZZY
+} SearchMode;
+
+static SearchResult* scan_items(const ItemSet* set, int start, int end, const char* keyword, SearchMode mode, int max_distance, const volatile int* cancel);
+
+// 大小写不敏感的线性搜索，关键词只折叠一次
+SearchResult* case_insensitive_search(const char** items, int items_count, const char* keyword) {
+    ItemSet set = {items, NULL, NULL, items_count, NULL, false, NULL};
+    return scan_items(&set, 0, items_count, keyword, SEARCH_MODE_IGNORE_CASE, 0, NULL);
+}
+
+// 线性搜索 - 在字符串数组中查找包含关键词的项（区分大小写，忽略大小写见 case_insensitive_search）
+SearchResult* linear_search(const char** items, int items_count, const char* keyword) {
+    ItemSet set = {items, NULL, NULL, items_count, NULL, false, NULL};
+    return scan_items(&set, 0, items_count, keyword, SEARCH_MODE_LINEAR, 0, NULL);
 }
 
 
@@ -293,7 +381,7 @@ bool utf8_char_equal(const unsigned char* c1, const unsigned char* c2) {
 }
 
 // 简化版：直接按字节比较计算编辑距离（支持UTF-8）
-// 注意：这不是真正的字符级编辑距离，但对于中文搜索来说足够使用
+// 注意：这不是真正的字符级编辑距离，搜索已改用 bounded_edit_distance，此函数保留用于基准对比
 int levenshtein_distance(const char* s1, const char* s2) {
     int len1 = strlen(s1);
     int len2 = strlen(s2);
@@ -352,42 +440,338 @@ int levenshtein_distance(const char* s1, const char* s2) {
     return distance;
 }
 
+// 解码 *p 处的一个UTF-8字符（ASCII字母转小写）并前移 *p；非法序列按单字节处理，保证不会越过字符串结尾
+static unsigned int next_folded_codepoint(const unsigned char** p) {
+    const unsigned char* s = *p;
+    unsigned char c = *s;
+    if (c < 0x80) {
+        *p = s + 1;
+        return to_lower(c);
+    }
+    int len = get_utf8_char_length(c);
+    unsigned int cp = (len == 2) ? (c & 0x1F) : (len == 3) ? (c & 0x0F) : (len == 4) ? (c & 0x07) : c;
+    int i = 1;
+    for (; i < len && (s[i] & 0xC0) == 0x80; i++) {
+        cp = (cp << 6) | (s[i] & 0x3F);
+    }
+    if (i < len) {
+        cp = 0x110000u + c;
+        i = 1;
+    }
+    *p = s + i;
+    return cp;
+}
+
+// 将UTF-8字符串解码为码点数组（ASCII字母转小写），超出容量时返回 -1
+static int decode_folded_codepoints(const char* s, unsigned int* out, int capacity) {
+    const unsigned char* p = (const unsigned char*)s;
+    int count = 0;
+    while (*p) {
+        if (count >= capacity) return -1;
+        out[count++] = next_folded_codepoint(&p);
+    }
+    return count;
+}
+
+// q-gram 预过滤（q = 2）：编辑距离不超过 d 时，关键词的 m - 1 个二元组（按码点）中
+// 至少有 m - 1 - 2d 个原样出现在项中（每次编辑最多破坏 q 个二元组）。
+// 各项的二元组散列到64位的位集（签名）中，关键词二元组对应的位在签名中出现的个数
+// 不小于实际共有的个数（散列冲突只会使其偏大），少于下限的项不可能匹配，无需计算编辑距离。
+#define QGRAM_Q 2
+
+static inline unsigned long long qgram_bit(unsigned int a, unsigned int b) {
+    unsigned int h = a * 2654435761u ^ (b + 0x9E3779B9u) * 2246822519u;
+    h ^= h >> 15;
+    h *= 2654435761u;
+    return 1ULL << (h >> 26);
+}
+
+// 计算 text（长度 len）的q-gram签名：path 为整个文本，basename 为 basename_offset 开始的部分
+void qgram_signature(const char* text, size_t len, size_t basename_offset, QgramSignature* signature) {
+    const unsigned char* p = (const unsigned char*)text;
+    const unsigned char* end = p + len;
+    const unsigned char* base = p + basename_offset;
+    unsigned long long path = 0, basename = 0;
+    unsigned int prev = 0;
+    bool prev_in_basename = false;
+    bool has_prev = false;
+    while (p < end) {
+        bool in_basename = p >= base;
+        unsigned int cp = next_folded_codepoint(&p);
+        if (has_prev) {
+            unsigned long long bit = qgram_bit(prev, cp);
+            path |= bit;
+            if (prev_in_basename) basename |= bit;
+        }
+        prev = cp;
+        prev_in_basename = in_basename;
+        has_prev = true;
+    }
+    signature->path = path;
+    signature->basename = basename;
+}
+
+// 查找模式串中码点对应的位掩码（ASCII查表，其余字符在小表中线性查找）
+static unsigned long long peq_lookup(const EditScratch* scratch, unsigned int c) {
+    if (c < 128) return scratch->peq_ascii[c];
+    for (int i = 0; i < scratch->peq_count; i++) {
+        if (scratch->peq_chars[i] == c) return scratch->peq_masks[i];
+    }
+    return 0;
+}
+
+// Myers/Hyyrö 位并行编辑距离，要求模式串长度 1..64；超过 k 时提前返回 k + 1
+static int myers_distance(const unsigned int* p, int m, const unsigned int* t, int n, int k, EditScratch* scratch) {
+    scratch->peq_count = 0;
+    for (int i = 0; i < m; i++) {
+        unsigned int c = p[i];
+        if (c < 128) {
+            scratch->peq_ascii[c] |= 1ULL << i;
+            continue;
+        }
+        int slot = 0;
+        while (slot < scratch->peq_count && scratch->peq_chars[slot] != c) slot++;
+        if (slot == scratch->peq_count) {
+            scratch->peq_chars[slot] = c;
+            scratch->peq_masks[slot] = 0;
+            scratch->peq_count++;
+        }
+        scratch->peq_masks[slot] |= 1ULL << i;
+    }
+
+    unsigned long long pv = (m == 64) ? ~0ULL : ((1ULL << m) - 1);
+    unsigned long long mv = 0;
+    unsigned long long last = 1ULL << (m - 1);
+    int score = m;
+
+    for (int j = 0; j < n; j++) {
+        unsigned long long eq = peq_lookup(scratch, t[j]);
+        unsigned long long xv = eq | mv;
+        unsigned long long xh = (((eq & pv) + pv) ^ pv) | eq;
+        unsigned long long ph = mv | ~(xh | pv);
+        unsigned long long mh = pv & xh;
+        if (ph & last) {
+            score++;
+        } else if (mh & last) {
+            score--;
+        }
+        // 第0行 D[0][j] = j，水平差值恒为 +1
+        ph = (ph << 1) | 1ULL;
+        mh <<= 1;
+        pv = mh | ~(xv | ph);
+        mv = ph & xv;
+
+        // 剩余每个字符最多让距离减1，已无法回到 k 以内时提前结束
+        if (score - (n - 1 - j) > k) {
+            score = k + 1;
+            break;
+        }
+    }
+
+    // 清理查表，供下次调用复用
+    for (int i = 0; i < m; i++) {
+        if (p[i] < 128) scratch->peq_ascii[p[i]] = 0;
+    }
+    return score <= k ? score : k + 1;
+}
+
+// 带状动态规划（模式串超过64个字符时使用），只计算 |i - j| <= k 的单元格
+static int banded_distance(const unsigned int* a, int m, const unsigned int* b, int n, int k, EditScratch* scratch) {
+    int limit = k + 1;
+    int* prev = scratch->row_prev;
+    int* curr = scratch->row_curr;
+
+    for (int j = 0; j <= n; j++) {
+        prev[j] = j <= k ? j : limit;
+    }
+
+    for (int i = 1; i <= m; i++) {
+        int lo = i - k > 1 ? i - k : 1;
+        int hi = i + k < n ? i + k : n;
+        int row_min = limit;
+
+        curr[0] = i <= k ? i : limit;
+        if (lo > 1) {
+            curr[lo - 1] = limit;
+        } else {
+            row_min = curr[0];
+        }
+
+        for (int j = lo; j <= hi; j++) {
+            int value = prev[j - 1] + (a[i - 1] == b[j - 1] ? 0 : 1);
+            if (prev[j] + 1 < value) value = prev[j] + 1;
+            if (curr[j - 1] + 1 < value) value = curr[j - 1] + 1;
+            if (value > limit) value = limit;
+            curr[j] = value;
+            if (value < row_min) row_min = value;
+        }
+        if (hi < n) {
+            curr[hi + 1] = limit;
+        }
+        if (row_min > k) {
+            return limit;
+        }
+
+        int* temp = prev;
+        prev = curr;
+        curr = temp;
+    }
+    return prev[n] <= k ? prev[n] : limit;
+}
+
+// 按UTF-8码点计算编辑距离（ASCII大小写不敏感），超过 max_distance 时返回 max_distance + 1
+// scratch 由调用方提供并可在多次调用间复用，函数内部不分配内存
+int bounded_edit_distance(const char* s1, const char* s2, int max_distance, EditScratch* scratch) {
+    int m = decode_folded_codepoints(s1, scratch->a, EDIT_SCRATCH_CHARS);
+    int n = decode_folded_codepoints(s2, scratch->b, EDIT_SCRATCH_CHARS);
+    if (m < 0 || n < 0) {
+        // 超长字符串极少出现，退回到字节级实现
+        int distance = levenshtein_distance(s1, s2);
+        return distance <= max_distance ? distance : max_distance + 1;
+    }
+
+    // 以较短的一方作为模式串
+    const unsigned int* p = scratch->a;
+    const unsigned int* t = scratch->b;
+    if (m > n) {
+        int temp = m; m = n; n = temp;
+        p = scratch->b;
+        t = scratch->a;
+    }
+
+    if (n - m > max_distance) return max_distance + 1;
+    if (m == 0) return n;
+    if (m <= 64) return myers_distance(p, m, t, n, max_distance, scratch);
+    return banded_distance(p, m, t, n, max_distance, scratch);
+}
+
+// 分配编辑距离计算所需的临时缓冲区
+EditScratch* create_edit_scratch() {
+    return (EditScratch*)calloc(1, sizeof(EditScratch));
+}
+
+void free_edit_scratch(EditScratch* scratch) {
+    free(scratch);
+}
+
+// 关键词的q-gram过滤条件：各二元组对应的位（去重）及其在关键词中出现的次数，以及需要命中的最少个数
+typedef struct {
+    unsigned long long bits[64];
+    int weights[64];
+    int count;
+    int threshold;
+} QgramFilter;
+
+// 为关键词与最大编辑距离准备过滤条件，下限不大于0（关键词过短或距离过大）时返回 false，表示不过滤
+static bool qgram_filter_init(QgramFilter* filter, const char* keyword, int max_distance, EditScratch* scratch) {
+    filter->count = 0;
+    filter->threshold = 0;
+    // 超长的项按字节计算编辑距离（见 bounded_edit_distance），不使用按码点的过滤
+    if (strlen(keyword) + 4 * (size_t)max_distance >= EDIT_SCRATCH_CHARS) return false;
+    int m = decode_folded_codepoints(keyword, scratch->a, EDIT_SCRATCH_CHARS);
+    if (m < 0) return false;
+    filter->threshold = (m - QGRAM_Q + 1) - QGRAM_Q * max_distance;
+    if (filter->threshold <= 0) return false;
+    for (int i = 0; i + 1 < m; i++) {
+        unsigned long long bit = qgram_bit(scratch->a[i], scratch->a[i + 1]);
+        int slot = 0;
+        while (slot < filter->count && filter->bits[slot] != bit) slot++;
+        if (slot == filter->count) {
+            filter->bits[slot] = bit;
+            filter->weights[slot] = 0;
+            filter->count++;
+        }
+        filter->weights[slot]++;
+    }
+    return true;
+}
+
+// 签名中命中的关键词二元组个数是否达到下限
+static inline bool qgram_filter_pass(const QgramFilter* filter, unsigned long long signature) {
+    int hits = 0;
+    for (int i = 0; i < filter->count; i++) {
+        if (signature & filter->bits[i]) {
+            hits += filter->weights[i];
+            if (hits >= filter->threshold) return true;
+        }
+    }
+    return false;
+}
+
 // 模糊搜索 - 优化版，更适合中文搜索
 SearchResult* fuzzy_search(const char** items, int items_count, const char* keyword, int max_distance) {
+    ItemSet set = {items, NULL, NULL, items_count, NULL, false, NULL};
+    return scan_items(&set, 0, items_count, keyword, SEARCH_MODE_FUZZY, max_distance, NULL);
+}
+
+// 扫描 [start, end) 范围内的项，返回匹配项的索引（相对于整个集合，升序）
+// 扫描 [start, end) 中的项；cancel 被设置后停止扫描，返回已找到的部分结果
+static SearchResult* scan_items(const ItemSet* set, int start, int end, const char* keyword, SearchMode mode, int max_distance, const volatile int* cancel) {
     SearchResult* result = init_search_result();
-    int keyword_len = strlen(keyword);
-    
-    // 如果关键词是单个中文字符（UTF-8占3字节），使用子字符串匹配
-    if (keyword_len == 3 && (unsigned char)keyword[0] >= 0xE0) {
-        for (int i = 0; i < items_count; i++) {
-            const char* item = items[i];
+    size_t keyword_len = strlen(keyword);
+    size_t item_len = 0;
+
+    if (mode == SEARCH_MODE_LINEAR) {
+        for (int i = start; i < end; i++) {
+            if (((i - start) & (SEARCH_CANCEL_CHECK_INTERVAL - 1)) == 0 && search_cancelled(cancel)) break;
+            const char* item = item_set_get(set, i, &item_len);
             if (item == NULL) continue;
             
-            // 检查item是否包含keyword作为子字符串
+            // 区分大小写的子字符串搜索（与Python实现保持一致）
             if (strstr(item, keyword) != NULL) {
                 add_to_result(result, i);
             }
         }
-        return result;
-    }
-    
-    // 对于其他情况，使用编辑距离
-    for (int i = 0; i < items_count; i++) {
-        const char* item = items[i];
-        if (item == NULL) continue;
-        
-        int item_len = strlen(item);
-        
-        // 对于长关键词，使用更宽松的长度差异检查
-        int max_len_diff = (keyword_len > 5) ? keyword_len / 2 : max_distance;
-        if (abs(item_len - keyword_len) > max_len_diff) {
-            continue;
+    } else if (mode == SEARCH_MODE_IGNORE_CASE) {
+        char* folded = fold_keyword(keyword);
+        for (int i = start; i < end; i++) {
+            if (((i - start) & (SEARCH_CANCEL_CHECK_INTERVAL - 1)) == 0 && search_cancelled(cancel)) break;
+            const char* item = item_set_get(set, i, &item_len);
+            if (item == NULL) continue;
+
+            if (find_folded(item, item_len, folded, keyword_len) != NULL) {
+                add_to_result(result, i);
+            }
         }
-        
-        int distance = levenshtein_distance(item, keyword);
-        if (distance <= max_distance) {
-            add_to_result(result, i);
+        free(folded);
+    } else if (keyword_len == 3 && (unsigned char)keyword[0] >= 0xE0) {
+        // 如果关键词是单个中文字符（UTF-8占3字节），使用子字符串匹配
+        for (int i = start; i < end; i++) {
+            if (((i - start) & (SEARCH_CANCEL_CHECK_INTERVAL - 1)) == 0 && search_cancelled(cancel)) break;
+            const char* item = item_set_get(set, i, &item_len);
+            if (item == NULL) continue;
+            
+            // 检查item是否包含keyword作为子字符串
+            if (strstr(item, keyword) != NULL) {
+                add_to_result(result, i);
+            }
         }
+    } else {
+        // 对于其他情况，使用编辑距离（按码点计算，循环内不分配内存）
+        EditScratch* scratch = create_edit_scratch();
+        QgramFilter filter;
+        bool use_filter = qgram_filter_init(&filter, keyword, max_distance, scratch) && set->signatures != NULL;
+        for (int i = start; i < end; i++) {
+            if (((i - start) & (SEARCH_CANCEL_CHECK_INTERVAL - 1)) == 0 && search_cancelled(cancel)) break;
+            const char* item = item_set_get(set, i, &item_len);
+            if (item == NULL) continue;
+            
+            // 每个码点最多4个字节，字节长度差超过 4 * max_distance 时不可能匹配
+            long long diff = (long long)item_len - (long long)keyword_len;
+            if (diff > 4LL * max_distance || -diff > 4LL * max_distance) {
+                continue;
+            }
+            if (use_filter && !qgram_filter_pass(&filter, set->basename_only ? set->signatures[i].basename
+                                                                              : set->signatures[i].path)) {
+                continue;
+            }
+            
+            int distance = bounded_edit_distance(item, keyword, max_distance, scratch);
+            if (distance <= max_distance) {
+                add_to_result(result, i);
+            }
+        }
+        free_edit_scratch(scratch);
     }
     
     return result;
@@ -414,17 +798,307 @@ int binary_search(const char** sorted_items, int items_count, const char* keywor
     return -1;  // 未找到
 }
 
+// 模糊搜索时，如果关键词较长，自动调整最大距离
+int adjust_fuzzy_distance(const char* keyword, int max_distance) {
+    int keyword_len = strlen(keyword);
+    if (keyword_len > 10) {
+        return keyword_len / 3;  // 更长的关键词允许更大的编辑距离
+    }
+    return max_distance;
+}
+
+// 并行搜索：项数组按块切分，每个块由线程池中的一个线程搜索，结果按块顺序合并
+#define PARALLEL_MIN_CHUNK_ITEMS 16384  // 每块的最少项数，项数较少时线程调度开销大于收益
+#define PARALLEL_CHUNKS_PER_THREAD 4    // 每个线程平均分到的块数，用于平衡各块耗时差异
+
+typedef struct {
+    const ItemSet* set;
+    const char* keyword;
+    int max_distance;
+    SearchMode mode;
+    int chunk_size;
+    SearchResult** chunk_results;  // 每块的结果
+    const volatile int* cancel;
+} ParallelSearchTask;
+
+static void parallel_search_chunk(void* context, int task_index) {
+    ParallelSearchTask* task = (ParallelSearchTask*)context;
+    int start = task_index * task->chunk_size;
+    int end = start + task->chunk_size;
+    if (end > task->set->count) end = task->set->count;
+    task->chunk_results[task_index] = scan_items(task->set, start, end, task->keyword, task->mode, task->max_distance, task->cancel);
+}
+
+// 计算并行扫描的分块：返回块数（1表示不值得并行），*chunk_size 为每块项数
+// *num_threads 为0时替换为自动选择的线程数
+int plan_search_chunks(int items_count, int* num_threads, int* chunk_size) {
+    if (*num_threads <= 0) *num_threads = search_pool_default_threads();
+    int chunk_count = *num_threads * PARALLEL_CHUNKS_PER_THREAD;
+    int max_chunks = items_count / PARALLEL_MIN_CHUNK_ITEMS;
+    if (chunk_count > max_chunks) chunk_count = max_chunks;
+    if (*num_threads <= 1 || chunk_count <= 1) {
+        *chunk_size = items_count;
+        return 1;
+    }
+    *chunk_size = (items_count + chunk_count - 1) / chunk_count;
+    return (items_count + *chunk_size - 1) / *chunk_size;
+}
+
+// 按 num_threads（0表示自动）并行执行搜索，结果按索引升序
+static SearchResult* parallel_search(const ItemSet* set, const char* keyword, SearchMode mode, int max_distance, int num_threads, const volatile int* cancel) {
+    ParallelSearchTask task;
+    int chunk_count = plan_search_chunks(set->count, &num_threads, &task.chunk_size);
+    if (chunk_count <= 1) {
+        return scan_items(set, 0, set->count, keyword, mode, max_distance, cancel);
+    }
+
+    task.set = set;
+    task.keyword = keyword;
+    task.max_distance = max_distance;
+    task.mode = mode;
+    task.cancel = cancel;
+    task.chunk_results = (SearchResult**)calloc(chunk_count, sizeof(SearchResult*));
+
+    search_pool_run(num_threads, parallel_search_chunk, &task, chunk_count);
+
+    // 各块结果已是全局索引，按块顺序拼接即为升序
+    int total = 0;
+    for (int c = 0; c < chunk_count; c++) {
+        total += task.chunk_results[c]->count;
+    }
+    SearchResult* result = (SearchResult*)malloc(sizeof(SearchResult));
+    result->capacity = total > 0 ? total : 1;
+    result->count = 0;
+    result->indices = (int*)malloc(sizeof(int) * result->capacity);
+    result->scores = NULL;
+    result->matches = NULL;
+    result->match_count = 0;
+    for (int c = 0; c < chunk_count; c++) {
+        SearchResult* chunk = task.chunk_results[c];
+        memcpy(result->indices + result->count, chunk->indices, sizeof(int) * chunk->count);
+        result->count += chunk->count;
+        free_search_result(chunk);
+    }
+    free(task.chunk_results);
+    return result;
+}
+
+// 按选项在项集合中逐项搜索（子串、忽略大小写或模糊），结果按索引升序；ranked 时按得分降序
+SearchResult* search_item_set(const ItemSet* set, const char* keyword, const SearchOptions* options) {
+    if (options->basename_only && !set->basename_only) {
+        ItemSet view = *set;
+        view.basename_only = true;
+        return search_item_set(&view, keyword, options);
+    }
+    if (options->ranked) {
+        return ranked_search(set, keyword, options);
+    }
+    if (options->use_fuzzy) {
+        return parallel_search(set, keyword, SEARCH_MODE_FUZZY, adjust_fuzzy_distance(keyword, options->max_distance), options->num_threads, options->cancel);
+    }
+    SearchMode mode = options->ignore_case ? SEARCH_MODE_IGNORE_CASE : SEARCH_MODE_LINEAR;
+    return parallel_search(set, keyword, mode, options->max_distance, options->num_threads, options->cancel);
+}
+
+// 只在 candidates 列出的项（升序索引，调用方保证有效）中搜索，返回的索引仍是 set 中的索引
+SearchResult* search_item_subset(const ItemSet* set, const int* candidates, int candidate_count, const char* keyword, const SearchOptions* options) {
+    ItemSet view = *set;
+    view.basename_only = set->basename_only || options->basename_only;
+    const char** items = (const char**)malloc(sizeof(const char*) * (candidate_count > 0 ? candidate_count : 1));
+    size_t item_len;
+    for (int i = 0; i < candidate_count; i++) {
+        items[i] = item_set_get(&view, candidates[i], &item_len);
+    }
+    // 模糊搜索的q-gram签名同样按子集内的位置重新排列（子集中的项已是文件名部分时取文件名的签名）
+    QgramSignature* signatures = NULL;
+    if (options->use_fuzzy && !options->ranked && set->signatures != NULL) {
+        signatures = (QgramSignature*)malloc(sizeof(QgramSignature) * (candidate_count > 0 ? candidate_count : 1));
+        for (int i = 0; i < candidate_count; i++) {
+            const QgramSignature* signature = &set->signatures[candidates[i]];
+            signatures[i].path = view.basename_only ? signature->basename : signature->path;
+            signatures[i].basename = signature->basename;
+        }
+    }
+
+    // 在候选项组成的子集上搜索，再把子集内的位置映射回原索引（候选升序，映射后仍保持顺序）
+    // 只搜索文件名时子集中已是文件名部分，不再重复查找
+    ItemSet subset = {items, NULL, NULL, candidate_count, NULL, false, signatures};
+    SearchOptions subset_options = *options;
+    subset_options.basename_only = false;
+    // 附加得分同样按子集内的位置重新排列
+    int* boosts = NULL;
+    if (options->ranked && options->boosts != NULL && options->boost_count > 0) {
+        boosts = (int*)malloc(sizeof(int) * (candidate_count > 0 ? candidate_count : 1));
+        for (int i = 0; i < candidate_count; i++) {
+            boosts[i] = candidates[i] < options->boost_count ? options->boosts[candidates[i]] : 0;
+        }
+        subset_options.boosts = boosts;
+        subset_options.boost_count = candidate_count;
+    }
+    SearchResult* result = search_item_set(&subset, keyword, &subset_options);
+    free(items);
+    free(signatures);
+    free(boosts);
+    for (int i = 0; i < result->count; i++) {
+        result->indices[i] = candidates[result->indices[i]];
+    }
+    for (int i = 0; i < result->match_count; i++) {
+        result->matches[i] = candidates[result->matches[i]];
+    }
+    return result;
+}
+
+#define STREAM_FIRST_BLOCK_ITEMS 16384   // 流式搜索第一块的项数，尽快交付首批结果
+#define STREAM_MAX_BLOCK_ITEMS 262144    // 之后每块项数加倍，直到此上限
+
+// 流式搜索的待交付缓冲
+typedef struct {
+    int* pending;
+    int pending_count;
+    int batch_size;
+    int delivered;          // 已交付（含待交付）的项数
+    int max_deliver;        // 最多交付的项数
+    SearchBatchCallback callback;
+    void* context;
+    bool stopped;           // 回调要求停止
+} SearchStream;
+
+static void stream_flush(SearchStream* stream) {
+    if (stream->pending_count > 0 && !stream->stopped) {
+        if (!stream->callback(stream->context, stream->pending, stream->pending_count)) {
+            stream->stopped = true;
+        }
+    }
+    stream->pending_count = 0;
+}
+
+// 把块内位置 indices 加上块起点 base 后加入待交付缓冲，每满 batch_size 项交付一次
+static void stream_push(SearchStream* stream, const int* indices, int count, int base) {
+    for (int i = 0; i < count && !stream->stopped && stream->delivered < stream->max_deliver; i++) {
+        stream->pending[stream->pending_count++] = indices[i] + base;
+        stream->delivered++;
+        if (stream->pending_count == stream->batch_size) {
+            stream_flush(stream);
+        }
+    }
+}
+
+static int compare_int_values(const void* a, const void* b) {
+    int x = *(const int*)a;
+    int y = *(const int*)b;
+    return (x > y) - (x < y);
+}
+
+// 流式搜索：按索引顺序分块扫描，匹配项（升序）每满 batch_size 项通过 callback 交付一次，
+// 回调返回 false 时停止。非排序模式下 limit 大于0时交付 limit 项后即停止扫描，返回空结果；
+// 排序模式下先交付最多 limit 个匹配项作为初步结果，扫描结束后返回得分最高的 limit 项（附得分），
+// 由各块的前 limit 项合并后重新计算，与 ranked_search 的结果一致
+SearchResult* search_item_set_stream(const ItemSet* set, const char* keyword, const SearchOptions* options, int batch_size, SearchBatchCallback callback, void* context) {
+    SearchStream stream;
+    stream.batch_size = batch_size > 0 ? batch_size : 256;
+    stream.pending = (int*)malloc(sizeof(int) * stream.batch_size);
+    stream.pending_count = 0;
+    stream.delivered = 0;
+    stream.max_deliver = options->limit > 0 ? options->limit : set->count;
+    stream.callback = callback;
+    stream.context = context;
+    stream.stopped = false;
+
+    SearchOptions block_options = *options;
+    if (options->ranked) {
+        block_options.collect_matches = true;  // 各块的全部匹配项用于交付初步结果
+    }
+    SearchResult* tops = init_search_result();         // 排序模式：各块前 limit 项
+    SearchResult* all_matches = init_search_result();  // 排序模式且 collect_matches：全部匹配项
+
+    int block_items = STREAM_FIRST_BLOCK_ITEMS;
+    for (int start = 0; start < set->count && !stream.stopped && !search_cancelled(options->cancel);
+         start += block_items, block_items *= 2) {
+        if (block_items > STREAM_MAX_BLOCK_ITEMS) block_items = STREAM_MAX_BLOCK_ITEMS;
+        int count = set->count - start < block_items ? set->count - start : block_items;
+        ItemSet block = {set->items ? set->items + start : NULL, set->blob,
+                         set->offsets ? set->offsets + start : NULL, count,
+                         set->basename_offsets ? set->basename_offsets + start : NULL, set->basename_only,
+                         set->signatures ? set->signatures + start : NULL};
+        if (options->boosts != NULL) {
+            // 块内索引从0开始，附加得分数组随之偏移
+            bool covered = start < options->boost_count;
+            block_options.boosts = covered ? options->boosts + start : NULL;
+            block_options.boost_count = covered ? options->boost_count - start : 0;
+        }
+        SearchResult* result = search_item_set(&block, keyword, &block_options);
+        if (options->ranked) {
+            stream_push(&stream, result->matches, result->match_count, start);
+            for (int i = 0; i < result->count; i++) {
+                add_to_result(tops, result->indices[i] + start);
+            }
+            for (int i = 0; options->collect_matches && i < result->match_count; i++) {
+                add_to_result(all_matches, result->matches[i] + start);
+            }
+        } else {
+            stream_push(&stream, result->indices, result->count, start);
+            if (stream.delivered >= stream.max_deliver) {
+                free_search_result(result);
+                break;
+            }
+        }
+        free_search_result(result);
+    }
+    stream_flush(&stream);
+    free(stream.pending);
+
+    SearchResult* final_result;
+    if (options->ranked) {
+        // 全局前 limit 项一定在某一块的前 limit 项中，只需对这些项重新排序
+        qsort(tops->indices, tops->count, sizeof(int), compare_int_values);
+        SearchOptions final_options = *options;
+        final_options.collect_matches = false;
+        final_result = search_item_subset(set, tops->indices, tops->count, keyword, &final_options);
+        if (options->collect_matches) {
+            final_result->matches = all_matches->indices;
+            final_result->match_count = all_matches->count;
+            all_matches->indices = NULL;
+        }
+    } else {
+        final_result = init_search_result();
+    }
+    free_search_result(tops);
+    free_search_result(all_matches);
+    return final_result;
+}
+
+// 在连续存储区中搜索（子串、忽略大小写或模糊），参数含义与 perform_search 相同
+// blob 为各项以'\0'结尾依次拼接的UTF-8文本，offsets 共 items_count + 1 项；数据不一致时返回 NULL
+SearchResult* search_arena(const char* blob, long long blob_len, const long long* offsets, int items_count, const char* keyword, bool use_fuzzy, int max_distance, bool ignore_case, int num_threads, const volatile int* cancel) {
+    if (blob == NULL || offsets == NULL || keyword == NULL || items_count < 0 ||
+        offsets[0] != 0 || offsets[items_count] != blob_len) {
+        return NULL;
+    }
+    ItemSet set = {NULL, blob, offsets, items_count, NULL, false, NULL};
+    SearchOptions options = {use_fuzzy, ignore_case, max_distance, num_threads, false, 0, false, cancel, false, NULL, 0, 0};
+    return search_item_set(&set, keyword, &options);
+}
+
 // 搜索算法接口 - 根据选项执行不同的搜索策略
-extern SearchResult* perform_search(const char** items, int items_count, const char* keyword, bool is_sorted, bool use_fuzzy, int max_distance) {
-    if (use_fuzzy) {
-        // 模糊搜索时，如果关键词较长，自动调整最大距离
-        int keyword_len = strlen(keyword);
-        int adjusted_distance = max_distance;
-        if (keyword_len > 10) {
-            adjusted_distance = keyword_len / 3;  // 更长的关键词允许更大的编辑距离
-        }
-        return fuzzy_search(items, items_count, keyword, adjusted_distance);
-    } else if (is_sorted) {
+// ignore_case 为真时子串和精确匹配都忽略ASCII大小写（模糊搜索本身已忽略大小写）
+// num_threads 为线性扫描使用的线程数（0表示按CPU核数自动选择，1表示单线程）
+// cancel 为取消标记（可为 NULL），被其他线程置为非0后尽快返回部分结果
+extern SearchResult* perform_search(const char** items, int items_count, const char* keyword, bool is_sorted, bool use_fuzzy, int max_distance, bool ignore_case, int num_threads, const volatile int* cancel) {
+    if (!is_sorted || use_fuzzy) {
+        ItemSet set = {items, NULL, NULL, items_count, NULL, false, NULL};
+        SearchOptions options = {use_fuzzy, ignore_case, max_distance, num_threads, false, 0, false, cancel, false, NULL, 0, 0};
+        return search_item_set(&set, keyword, &options);
+    } else if (ignore_case) {
+        // 排序按区分大小写进行，忽略大小写相等的项不一定相邻，逐项比较
+        SearchResult* result = init_search_result();
+        for (int i = 0; i < items_count; i++) {
+            if ((i & (SEARCH_CANCEL_CHECK_INTERVAL - 1)) == 0 && search_cancelled(cancel)) break;
+            if (items[i] != NULL && strcasecmp_custom(items[i], keyword) == 0) {
+                add_to_result(result, i);
+            }
+        }
+        return result;
+    } else {
         // 对于排序数据，使用精确匹配（与Python实现保持一致）
         SearchResult* result = init_search_result();
         
@@ -463,8 +1137,6 @@ extern SearchResult* perform_search(const char** items, int items_count, const c
         }
         
         return result;
-    } else {
-        return linear_search(items, items_count, keyword);
     }
 }
 
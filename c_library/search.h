@@ -1,21 +1,212 @@
 #ifndef SEARCH_H
 #define SEARCH_H
 
+#include <stdbool.h>
+#include <stddef.h>
+#include <string.h>
+
 // 搜索结果结构体
 typedef struct {
     int* indices;
     int count;
     int capacity;
+    int* scores;    // 与 indices 对应的得分，仅排序搜索时非 NULL
+    int* matches;   // 全部匹配项的索引（升序），仅排序搜索且 collect_matches 时非 NULL
+    int match_count;
 } SearchResult;
 
+// 编辑距离计算的临时缓冲区，由调用方分配并在多次调用间复用
+#define EDIT_SCRATCH_CHARS 4096
+typedef struct {
+    unsigned int a[EDIT_SCRATCH_CHARS];            // 第一个字符串的码点
+    unsigned int b[EDIT_SCRATCH_CHARS];            // 第二个字符串的码点
+    int row_prev[EDIT_SCRATCH_CHARS + 1];          // 带状DP的上一行
+    int row_curr[EDIT_SCRATCH_CHARS + 1];          // 带状DP的当前行
+    unsigned long long peq_ascii[128];             // 位并行算法中ASCII字符的匹配掩码
+    unsigned int peq_chars[64];                    // 模式串中的非ASCII字符
+    unsigned long long peq_masks[64];              // 非ASCII字符对应的匹配掩码
+    int peq_count;
+} EditScratch;
+
+// 待搜索的项集合，支持两种存储形式：
+// 1. 指针数组 items（元素可为 NULL，表示跳过该项）
+// 2. 连续存储区 blob：各项UTF-8编码后以'\0'结尾依次存放，offsets 共 count + 1 项，
+//    第 i 项位于 [offsets[i], offsets[i + 1] - 1)，长度无需再调用 strlen
+// basename_only 为真时各项只取文件名部分（最后一个路径分隔符之后）参与搜索，
+// basename_offsets 记录文件名相对项起始的字节偏移，为 NULL 时逐项查找
+// signatures 为各项预先计算的q-gram签名（可为 NULL），模糊搜索据此在计算编辑距离前排除大部分项
+typedef struct {
+    unsigned long long path;        // 整个路径的q-gram位集
+    unsigned long long basename;    // 文件名部分的q-gram位集
+} QgramSignature;
+
+typedef struct {
+    const char** items;
+    const char* blob;
+    const long long* offsets;
+    int count;
+    const int* basename_offsets;
+    bool basename_only;
+    const QgramSignature* signatures;
+} ItemSet;
+
+// 路径中文件名部分的起始字节偏移（最后一个'/'或'\\'之后）
+static inline size_t path_basename_offset(const char* path, size_t len) {
+    size_t i = len;
+    while (i > 0 && path[i - 1] != '/' && path[i - 1] != '\\') i--;
+    return i;
+}
+
+// 取第 i 项及其字节长度，项为 NULL 时返回 NULL；basename_only 时只返回文件名部分
+static inline const char* item_set_get(const ItemSet* set, int i, size_t* len) {
+    const char* item;
+    if (set->items == NULL) {
+        *len = (size_t)(set->offsets[i + 1] - set->offsets[i] - 1);
+        item = set->blob + set->offsets[i];
+    } else {
+        item = set->items[i];
+        if (item == NULL) return NULL;
+        *len = strlen(item);
+    }
+    if (set->basename_only) {
+        size_t base = set->basename_offsets != NULL ? (size_t)set->basename_offsets[i]
+                                                    : path_basename_offset(item, *len);
+        item += base;
+        *len -= base;
+    }
+    return item;
+}
+
+// 逐项扫描搜索的选项（Python 端 SearchOptions 结构体与之对应，字段顺序需保持一致）
+typedef struct {
+    bool use_fuzzy;     // 模糊搜索（编辑距离）
+    bool ignore_case;   // 忽略ASCII大小写
+    int max_distance;   // 模糊搜索的最大编辑距离
+    int num_threads;    // 线程数，0表示按CPU核数自动选择
+    bool ranked;        // 按相关度打分排序（子序列匹配，见 ranked_search.c），忽略上面的匹配方式
+    int limit;          // 排序搜索只保留得分最高的前 limit 项，0表示不限
+    bool collect_matches; // 排序搜索同时返回全部匹配项（不受 limit 限制），供后续的扩展关键词缩小范围
+    const volatile int* cancel; // 取消标记（可为 NULL），由其他线程置为非0后搜索尽快返回部分结果
+    bool basename_only; // 只在各项的文件名部分中匹配（不含目录）
+    const int* boosts;  // 排序搜索时各项的附加得分（按项索引，可为 NULL），如经常打开的文件的加分
+    int boost_count;    // boosts 的项数，索引不小于此值的项不加分
+    int max_boost;      // boosts 中的最大值，用于估计文件名之外的匹配的得分上界
+} SearchOptions;
+
+// 扫描循环每隔多少项检查一次取消标记（须为2的幂）
+#define SEARCH_CANCEL_CHECK_INTERVAL 4096
+
+// 取消标记是否已被设置
+static inline bool search_cancelled(const volatile int* cancel) {
+    return cancel != NULL && *cancel != 0;
+}
+
+// 流式搜索回调：indices 为本批 count 个匹配项的索引（升序），返回 false 时停止搜索
+typedef bool (*SearchBatchCallback)(void* context, const int* indices, int count);
+
+// 常驻内存的路径语料库（不透明类型，见 corpus.c）
+typedef struct SearchCorpus SearchCorpus;
+
+// 线程池任务函数：task_index 为 [0, task_count) 中的任务编号
+typedef void (*SearchTaskFunc)(void* context, int task_index);
+
+// 三元组倒排索引（不透明类型，见 trigram_index.c）
+typedef struct TrigramIndex TrigramIndex;
+
+// 后缀数组索引（不透明类型，见 suffix_array.c）
+typedef struct SuffixArray SuffixArray;
+
+// 模糊搜索BK树索引（不透明类型，见 fuzzy_index.c）
+typedef struct FuzzyIndex FuzzyIndex;
+
+// 编译为DFA的正则表达式或通配符模式（不透明类型，见 regex_search.c）
+typedef struct SearchRegex SearchRegex;
+
 // 搜索算法接口函数声明
 SearchResult* init_search_result();
 void add_to_result(SearchResult* result, int index);
 void free_search_result(SearchResult* result);
+SearchResult* merge_sorted_indices(const int* a, int a_count, const int* b, int b_count, bool difference);
+SearchResult* select_owner_rows(const int* owners, int owner_count, const int* candidates, int candidate_count);
+unsigned char to_lower(unsigned char c);
+int get_utf8_char_length(unsigned char c);
 SearchResult* linear_search(const char** items, int items_count, const char* keyword);
+SearchResult* case_insensitive_search(const char** items, int items_count, const char* keyword);
+char* fold_keyword(const char* keyword);
+const char* find_folded(const char* haystack, size_t haystack_len, const char* needle, size_t needle_len);
 int binary_search(const char** sorted_items, int items_count, const char* keyword);
 int levenshtein_distance(const char* s1, const char* s2);
+int bounded_edit_distance(const char* s1, const char* s2, int max_distance, EditScratch* scratch);
+EditScratch* create_edit_scratch();
+void free_edit_scratch(EditScratch* scratch);
+void qgram_signature(const char* text, size_t len, size_t basename_offset, QgramSignature* signature);
 SearchResult* fuzzy_search(const char** items, int items_count, const char* keyword, int max_distance);
-SearchResult* perform_search(const char** items, int items_count, const char* keyword, bool is_sorted, bool use_fuzzy, int max_distance);
+int adjust_fuzzy_distance(const char* keyword, int max_distance);
+const char* path_basename(const char* path);
+int plan_search_chunks(int items_count, int* num_threads, int* chunk_size);
+SearchResult* ranked_search(const ItemSet* set, const char* keyword, const SearchOptions* options);
+int match_score(const char* item, size_t item_len, const char* folded_keyword, size_t keyword_len);
+SearchResult* search_item_set(const ItemSet* set, const char* keyword, const SearchOptions* options);
+SearchResult* search_item_subset(const ItemSet* set, const int* candidates, int candidate_count, const char* keyword, const SearchOptions* options);
+SearchResult* search_item_set_stream(const ItemSet* set, const char* keyword, const SearchOptions* options, int batch_size, SearchBatchCallback callback, void* context);
+SearchResult* search_arena(const char* blob, long long blob_len, const long long* offsets, int items_count, const char* keyword, bool use_fuzzy, int max_distance, bool ignore_case, int num_threads, const volatile int* cancel);
+SearchResult* perform_search(const char** items, int items_count, const char* keyword, bool is_sorted, bool use_fuzzy, int max_distance, bool ignore_case, int num_threads, const volatile int* cancel);
+
+// 搜索线程池接口（见 thread_pool.c）
+int search_pool_default_threads();
+void search_pool_run(int thread_count, SearchTaskFunc func, void* context, int task_count);
+
+// 路径语料库接口
+SearchCorpus* corpus_create();
+int corpus_append(SearchCorpus* corpus, const char* data, long long data_len, int item_count);
+int corpus_count(SearchCorpus* corpus);
+const char** corpus_items_acquire(SearchCorpus* corpus, int* count);
+void corpus_items_release(SearchCorpus* corpus);
+SearchResult* corpus_search(SearchCorpus* corpus, const char* keyword, const SearchOptions* options);
+SearchResult* corpus_search_subset(SearchCorpus* corpus, const char* keyword, const SearchOptions* options, const int* candidates, int candidate_count);
+SearchResult* corpus_search_stream(SearchCorpus* corpus, const char* keyword, const SearchOptions* options, int batch_size, SearchBatchCallback callback, void* context);
+int corpus_build_path_order(SearchCorpus* corpus);
+SearchResult* corpus_prefix_range(SearchCorpus* corpus, const char* prefix, bool basename_only, bool distinct, int limit);
+int corpus_path_order_count(SearchCorpus* corpus);
+SearchResult* corpus_filter(SearchCorpus* corpus, const char* prefix, const char** extensions, int extension_count, const int* candidates, int candidate_count);
+SearchResult* corpus_regex_search(SearchCorpus* corpus, const SearchRegex* regex, const SearchOptions* options, const int* candidates, int candidate_count);
+void corpus_free(SearchCorpus* corpus);
+
+// 序列化缓冲区释放（索引导出的内存由C分配）
+void free_search_buffer(char* buffer);
+
+// 三元组倒排索引接口
+TrigramIndex* trigram_index_build(const char** items, int items_count);
+SearchResult* trigram_index_search(const TrigramIndex* index, const char** items, int items_count, const char* keyword, bool ignore_case);
+int trigram_index_item_count(const TrigramIndex* index);
+char* trigram_index_dump(const TrigramIndex* index, long long* size);
+TrigramIndex* trigram_index_restore(const char* data, long long size);
+void trigram_index_free(TrigramIndex* index);
+
+// 后缀数组索引接口
+SuffixArray* suffix_array_build(const char** items, int items_count);
+SearchResult* suffix_array_search(const SuffixArray* sa, const char* keyword);
+int suffix_array_item_count(const SuffixArray* sa);
+char* suffix_array_dump(const SuffixArray* sa, long long* size);
+SuffixArray* suffix_array_restore(const char* data, long long size);
+void suffix_array_free(SuffixArray* sa);
+
+// 模糊搜索BK树索引接口
+FuzzyIndex* fuzzy_index_build(const char** items, int items_count);
+SearchResult* fuzzy_index_search(const FuzzyIndex* index, const char* keyword, int max_distance);
+int fuzzy_index_item_count(const FuzzyIndex* index);
+char* fuzzy_index_dump(const FuzzyIndex* index, long long* size);
+FuzzyIndex* fuzzy_index_restore(const char* data, long long size);
+void fuzzy_index_free(FuzzyIndex* index);
+
+// 正则表达式搜索接口
+SearchRegex* regex_compile(const char* pattern, bool ignore_case, char* error, int error_size);
+SearchRegex* glob_compile(const char* pattern, bool ignore_case, char* error, int error_size);
+const char* regex_literal(const SearchRegex* regex);
+int regex_state_count(const SearchRegex* regex);
+bool regex_match(const SearchRegex* regex, const char* text, size_t len);
+SearchResult* regex_search_item_set(const ItemSet* set, const SearchRegex* regex, const SearchOptions* options);
+SearchResult* regex_search_item_subset(const ItemSet* set, const int* candidates, int candidate_count, const SearchRegex* regex, const SearchOptions* options);
+void regex_free(SearchRegex* regex);
 
 #endif // SEARCH_H
@@ -0,0 +1,257 @@
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+#include <limits.h>
+#include <stdbool.h>
+#include "search.h"
+
+// 后缀数组索引
+// 将所有项以'\0'分隔拼接成一段文本，对每个非分隔符位置的后缀排序。
+// 后缀比较在遇到'\0'时终止，因此不会跨越项的边界。
+// 子串查询通过两次二分查找得到以关键词为前缀的后缀区间，复杂度 O(|keyword| log n)。
+
+#define SUFFIX_ARRAY_MAGIC "SUFA"
+#define SUFFIX_ARRAY_VERSION 1
+#define SUFFIX_INSERTION_THRESHOLD 16
+
+struct SuffixArray {
+    int item_count;
+    int text_len;       // 拼接文本长度（包含每项末尾的'\0'）
+    int suffix_count;   // 后缀数量（不含分隔符位置）
+    char* text;
+    int* item_offsets;  // 每项在文本中的起始位置，升序
+    int* suffixes;      // 排序后的后缀起始位置
+};
+
+// 短区间使用插入排序，从 depth 处开始比较
+static void insertion_sort_suffixes(int* a, int n, int depth, const unsigned char* text) {
+    for (int i = 1; i < n; i++) {
+        int value = a[i];
+        const char* s = (const char*)text + value + depth;
+        int j = i - 1;
+        while (j >= 0 && strcmp((const char*)text + a[j] + depth, s) > 0) {
+            a[j + 1] = a[j];
+            j--;
+        }
+        a[j + 1] = value;
+    }
+}
+
+static unsigned char median_of_three(unsigned char a, unsigned char b, unsigned char c) {
+    if (a < b) {
+        if (b < c) return b;
+        return a < c ? c : a;
+    }
+    if (a < c) return a;
+    return b < c ? c : b;
+}
+
+// 多关键字快速排序（Bentley-Sedgewick），适合存在大量公共前缀的路径文本
+static void sort_suffixes(int* a, int n, int depth, const unsigned char* text) {
+    while (n > SUFFIX_INSERTION_THRESHOLD) {
+        unsigned char pivot = median_of_three(text[a[0] + depth], text[a[n / 2] + depth], text[a[n - 1] + depth]);
+
+        // 三路划分：[0, lt) 小于，[lt, gt] 等于，(gt, n) 大于
+        int lt = 0, i = 0, gt = n - 1;
+        while (i <= gt) {
+            unsigned char c = text[a[i] + depth];
+            if (c < pivot) {
+                int t = a[lt]; a[lt] = a[i]; a[i] = t;
+                lt++;
+                i++;
+            } else if (c > pivot) {
+                int t = a[gt]; a[gt] = a[i]; a[i] = t;
+                gt--;
+            } else {
+                i++;
+            }
+        }
+
+        sort_suffixes(a, lt, depth, text);
+        sort_suffixes(a + gt + 1, n - gt - 1, depth, text);
+
+        // 相等区间继续比较下一个字节；遇到'\0'说明后缀已完全相同
+        if (pivot == 0) return;
+        a += lt;
+        n = gt - lt + 1;
+        depth++;
+    }
+    insertion_sort_suffixes(a, n, depth, text);
+}
+
+SuffixArray* suffix_array_build(const char** items, int items_count) {
+    long long total = 0;
+    for (int i = 0; i < items_count; i++) {
+        total += (items[i] ? (long long)strlen(items[i]) : 0) + 1;
+    }
+    if (total > INT_MAX) {
+        return NULL;  // 文本超过2GB时不支持
+    }
+
+    SuffixArray* sa = (SuffixArray*)malloc(sizeof(SuffixArray));
+    sa->item_count = items_count;
+    sa->text_len = (int)total;
+    sa->suffix_count = (int)total - items_count;
+    sa->text = (char*)malloc(total > 0 ? total : 1);
+    sa->item_offsets = (int*)malloc(sizeof(int) * (items_count > 0 ? items_count : 1));
+    sa->suffixes = (int*)malloc(sizeof(int) * (sa->suffix_count > 0 ? sa->suffix_count : 1));
+
+    int pos = 0;
+    int k = 0;
+    for (int i = 0; i < items_count; i++) {
+        int len = items[i] ? (int)strlen(items[i]) : 0;
+        sa->item_offsets[i] = pos;
+        if (len > 0) memcpy(sa->text + pos, items[i], len);
+        for (int j = 0; j < len; j++) {
+            sa->suffixes[k++] = pos + j;
+        }
+        pos += len;
+        sa->text[pos++] = '\0';
+    }
+
+    sort_suffixes(sa->suffixes, sa->suffix_count, 0, (const unsigned char*)sa->text);
+    return sa;
+}
+
+// 根据文本位置找到所属项（item_offsets 中最后一个不大于 pos 的位置）
+static int item_of_position(const SuffixArray* sa, int pos) {
+    int left = 0;
+    int right = sa->item_count - 1;
+    while (left < right) {
+        int mid = left + (right - left + 1) / 2;
+        if (sa->item_offsets[mid] <= pos) {
+            left = mid;
+        } else {
+            right = mid - 1;
+        }
+    }
+    return left;
+}
+
+static int compare_ints(const void* a, const void* b) {
+    int x = *(const int*)a;
+    int y = *(const int*)b;
+    return (x > y) - (x < y);
+}
+
+// 查找包含关键词的项（区分大小写），结果按索引升序且不重复
+SearchResult* suffix_array_search(const SuffixArray* sa, const char* keyword) {
+    SearchResult* result = init_search_result();
+    size_t keyword_len = strlen(keyword);
+    if (sa == NULL || keyword_len == 0 || sa->suffix_count == 0) {
+        return result;
+    }
+
+    // 下界：第一个前缀不小于关键词的后缀
+    int left = 0, right = sa->suffix_count;
+    while (left < right) {
+        int mid = left + (right - left) / 2;
+        if (strncmp(sa->text + sa->suffixes[mid], keyword, keyword_len) < 0) {
+            left = mid + 1;
+        } else {
+            right = mid;
+        }
+    }
+    int lower = left;
+
+    // 上界：第一个前缀大于关键词的后缀
+    right = sa->suffix_count;
+    while (left < right) {
+        int mid = left + (right - left) / 2;
+        if (strncmp(sa->text + sa->suffixes[mid], keyword, keyword_len) <= 0) {
+            left = mid + 1;
+        } else {
+            right = mid;
+        }
+    }
+    int upper = left;
+
+    int hits = upper - lower;
+    if (hits == 0) {
+        return result;
+    }
+
+    // 同一项可能命中多次，映射到项后排序去重
+    int* items = (int*)malloc(sizeof(int) * hits);
+    for (int i = 0; i < hits; i++) {
+        items[i] = item_of_position(sa, sa->suffixes[lower + i]);
+    }
+    qsort(items, hits, sizeof(int), compare_ints);
+    for (int i = 0; i < hits; i++) {
+        if (i == 0 || items[i] != items[i - 1]) {
+            add_to_result(result, items[i]);
+        }
+    }
+    free(items);
+    return result;
+}
+
+int suffix_array_item_count(const SuffixArray* sa) {
+    return sa ? sa->item_count : 0;
+}
+
+// 序列化格式：magic(4) | version | item_count | text_len | suffix_count | item_offsets | text | suffixes
+char* suffix_array_dump(const SuffixArray* sa, long long* size) {
+    long long header = 4 + sizeof(int) * 4;
+    long long offsets_size = sizeof(int) * (long long)sa->item_count;
+    long long suffixes_size = sizeof(int) * (long long)sa->suffix_count;
+
+    *size = header + offsets_size + sa->text_len + suffixes_size;
+    char* buffer = (char*)malloc(*size);
+    char* p = buffer;
+    int version = SUFFIX_ARRAY_VERSION;
+
+    memcpy(p, SUFFIX_ARRAY_MAGIC, 4); p += 4;
+    memcpy(p, &version, sizeof(int)); p += sizeof(int);
+    memcpy(p, &sa->item_count, sizeof(int)); p += sizeof(int);
+    memcpy(p, &sa->text_len, sizeof(int)); p += sizeof(int);
+    memcpy(p, &sa->suffix_count, sizeof(int)); p += sizeof(int);
+    memcpy(p, sa->item_offsets, offsets_size); p += offsets_size;
+    memcpy(p, sa->text, sa->text_len); p += sa->text_len;
+    memcpy(p, sa->suffixes, suffixes_size);
+    return buffer;
+}
+
+SuffixArray* suffix_array_restore(const char* data, long long size) {
+    long long header = 4 + sizeof(int) * 4;
+    if (data == NULL || size < header || memcmp(data, SUFFIX_ARRAY_MAGIC, 4) != 0) {
+        return NULL;
+    }
+
+    int version, item_count, text_len, suffix_count;
+    const char* p = data + 4;
+    memcpy(&version, p, sizeof(int)); p += sizeof(int);
+    memcpy(&item_count, p, sizeof(int)); p += sizeof(int);
+    memcpy(&text_len, p, sizeof(int)); p += sizeof(int);
+    memcpy(&suffix_count, p, sizeof(int)); p += sizeof(int);
+    if (version != SUFFIX_ARRAY_VERSION || item_count < 0 || text_len < item_count ||
+        suffix_count != text_len - item_count) {
+        return NULL;
+    }
+
+    long long offsets_size = sizeof(int) * (long long)item_count;
+    long long suffixes_size = sizeof(int) * (long long)suffix_count;
+    if (size != header + offsets_size + text_len + suffixes_size) {
+        return NULL;
+    }
+
+    SuffixArray* sa = (SuffixArray*)malloc(sizeof(SuffixArray));
+    sa->item_count = item_count;
+    sa->text_len = text_len;
+    sa->suffix_count = suffix_count;
+    sa->item_offsets = (int*)malloc(offsets_size > 0 ? offsets_size : 1);
+    sa->text = (char*)malloc(text_len > 0 ? text_len : 1);
+    sa->suffixes = (int*)malloc(suffixes_size > 0 ? suffixes_size : 1);
+    memcpy(sa->item_offsets, p, offsets_size); p += offsets_size;
+    memcpy(sa->text, p, text_len); p += text_len;
+    memcpy(sa->suffixes, p, suffixes_size);
+    return sa;
+}
+
+void suffix_array_free(SuffixArray* sa) {
+    if (sa == NULL) return;
+    free(sa->text);
+    free(sa->item_offsets);
+    free(sa->suffixes);
+    free(sa);
+}
@@ -0,0 +1,158 @@
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+#include <stdbool.h>
+#include "search.h"
+#include "platform_sync.h"
+
+// 搜索线程池
+// 工作线程在首次需要时创建并在进程生命周期内复用，避免每次查询创建线程的开销。
+// 一次 search_pool_run 把 task_count 个任务分发给工作线程，调用线程同样参与执行，
+// 所有任务完成后才返回。同一时刻只有一个调用方使用线程池，其他调用方直接在本线程串行执行。
+
+#define SEARCH_POOL_MAX_THREADS 64
+
+typedef struct {
+    pool_mutex_t lock;          // 保护以下所有字段
+    pool_cond_t work_ready;     // 有新任务批次
+    pool_cond_t work_done;      // 当前批次全部完成
+    pool_mutex_t caller_lock;   // 保证同一时刻只有一个调用方
+    pool_thread_t threads[SEARCH_POOL_MAX_THREADS];
+    int thread_count;           // 已创建的工作线程数
+    int active_limit;           // 本批次允许参与的工作线程数
+    unsigned long long generation;  // 批次编号，工作线程据此判断是否有新批次
+    SearchTaskFunc func;
+    void* context;
+    int task_count;
+    int next_task;              // 下一个待领取的任务
+    int pending_tasks;          // 尚未完成的任务数
+} SearchPool;
+
+static SearchPool pool;
+
+#ifdef _WIN32
+static INIT_ONCE pool_once = INIT_ONCE_STATIC_INIT;
+static BOOL CALLBACK pool_init_once(PINIT_ONCE once, PVOID param, PVOID* ctx) {
+#else
+static pthread_once_t pool_once = PTHREAD_ONCE_INIT;
+static void pool_init_once(void) {
+#endif
+    pool_mutex_init(&pool.lock);
+    pool_mutex_init(&pool.caller_lock);
+    pool_cond_init(&pool.work_ready);
+    pool_cond_init(&pool.work_done);
+#ifdef _WIN32
+    return TRUE;
+#endif
+}
+
+static void pool_ensure_initialized(void) {
+#ifdef _WIN32
+    InitOnceExecuteOnce(&pool_once, pool_init_once, NULL, NULL);
+#else
+    pthread_once(&pool_once, pool_init_once);
+#endif
+}
+
+// 领取并执行任务，直到当前批次没有剩余任务（调用时持有 pool.lock，返回时仍持有）
+static void pool_drain_tasks(void) {
+    while (pool.next_task < pool.task_count) {
+        int task = pool.next_task++;
+        SearchTaskFunc func = pool.func;
+        void* context = pool.context;
+        pool_mutex_unlock(&pool.lock);
+        func(context, task);
+        pool_mutex_lock(&pool.lock);
+        if (--pool.pending_tasks == 0) {
+            pool_cond_broadcast(&pool.work_done);
+        }
+    }
+}
+
+#ifdef _WIN32
+static DWORD WINAPI pool_worker(LPVOID arg) {
+#else
+static void* pool_worker(void* arg) {
+#endif
+    int worker_index = (int)(size_t)arg;
+    unsigned long long seen = 0;
+    pool_mutex_lock(&pool.lock);
+    while (1) {
+        while (pool.generation == seen) {
+            pool_cond_wait(&pool.work_ready, &pool.lock);
+        }
+        seen = pool.generation;
+        if (worker_index < pool.active_limit) {
+            pool_drain_tasks();
+        }
+    }
+    pool_mutex_unlock(&pool.lock);
+    return 0;
+}
+
+// 确保至少有 count 个工作线程（调用时持有 pool.lock）
+static void pool_grow(int count) {
+    if (count > SEARCH_POOL_MAX_THREADS) count = SEARCH_POOL_MAX_THREADS;
+    while (pool.thread_count < count) {
+        void* arg = (void*)(size_t)pool.thread_count;
+#ifdef _WIN32
+        HANDLE handle = CreateThread(NULL, 0, pool_worker, arg, 0, NULL);
+        if (handle == NULL) break;
+        pool.threads[pool.thread_count] = handle;
+#else
+        if (pthread_create(&pool.threads[pool.thread_count], NULL, pool_worker, arg) != 0) break;
+        pthread_detach(pool.threads[pool.thread_count]);
+#endif
+        pool.thread_count++;
+    }
+}
+
+// 默认线程数：可用CPU核数（至少1，至多 SEARCH_POOL_MAX_THREADS）
+int search_pool_default_threads() {
+    int count;
+#ifdef _WIN32
+    SYSTEM_INFO info;
+    GetSystemInfo(&info);
+    count = (int)info.dwNumberOfProcessors;
+#else
+    count = (int)sysconf(_SC_NPROCESSORS_ONLN);
+#endif
+    if (count < 1) count = 1;
+    if (count > SEARCH_POOL_MAX_THREADS) count = SEARCH_POOL_MAX_THREADS;
+    return count;
+}
+
+// 使用最多 thread_count 个线程（含调用线程，0表示自动）执行 task_count 个任务
+void search_pool_run(int thread_count, SearchTaskFunc func, void* context, int task_count) {
+    if (thread_count <= 0) thread_count = search_pool_default_threads();
+    if (thread_count > task_count) thread_count = task_count;
+
+    pool_ensure_initialized();
+    if (thread_count <= 1 || !pool_mutex_trylock(&pool.caller_lock)) {
+        // 单线程或线程池正被其他调用方使用时，直接在本线程执行
+        for (int i = 0; i < task_count; i++) {
+            func(context, i);
+        }
+        return;
+    }
+
+    pool_mutex_lock(&pool.lock);
+    pool_grow(thread_count - 1);
+    pool.func = func;
+    pool.context = context;
+    pool.task_count = task_count;
+    pool.next_task = 0;
+    pool.pending_tasks = task_count;
+    pool.active_limit = thread_count - 1;
+    pool.generation++;
+    pool_cond_broadcast(&pool.work_ready);
+
+    pool_drain_tasks();
+    while (pool.pending_tasks > 0) {
+        pool_cond_wait(&pool.work_done, &pool.lock);
+    }
+    pool.func = NULL;
+    pool.context = NULL;
+    pool_mutex_unlock(&pool.lock);
+    pool_mutex_unlock(&pool.caller_lock);
+}
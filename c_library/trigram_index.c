@@ -0,0 +1,247 @@
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+#include <stdbool.h>
+#include "search.h"
+
+// 三元组倒排索引
+// 每个路径按字节切分为三元组（ASCII字母统一转小写），三元组哈希到固定数量的桶中，
+// 每个桶保存包含该三元组的项索引（升序）。哈希冲突只会增加候选项，最终由子串校验消除。
+
+#define TRIGRAM_INDEX_MAGIC "TRGI"
+#define TRIGRAM_INDEX_VERSION 1
+#define TRIGRAM_BUCKET_BITS 18
+#define TRIGRAM_BUCKET_COUNT (1 << TRIGRAM_BUCKET_BITS)
+
+struct TrigramIndex {
+    int item_count;
+    int bucket_count;
+    long long* bucket_offsets;  // bucket_count + 1 项，postings 中每个桶的起止位置
+    int* postings;              // 所有桶的项索引拼接
+};
+
+// 计算三元组所在的桶（ASCII大小写不敏感）
+static unsigned int trigram_bucket(const unsigned char* p) {
+    unsigned int t = ((unsigned int)to_lower(p[0]) << 16) |
+                     ((unsigned int)to_lower(p[1]) << 8) |
+                     (unsigned int)to_lower(p[2]);
+    return (t * 2654435761u) >> (32 - TRIGRAM_BUCKET_BITS);
+}
+
+static int compare_ints(const void* a, const void* b) {
+    int x = *(const int*)a;
+    int y = *(const int*)b;
+    return (x > y) - (x < y);
+}
+
+// 收集字符串中所有去重后的三元组桶，返回数量；buckets 按需扩容
+static int collect_buckets(const char* text, int** buckets, int* capacity) {
+    int len = (int)strlen(text);
+    if (len < 3) return 0;
+
+    int n = len - 2;
+    if (n > *capacity) {
+        *capacity = n * 2;
+        *buckets = (int*)realloc(*buckets, sizeof(int) * (*capacity));
+    }
+
+    const unsigned char* p = (const unsigned char*)text;
+    for (int i = 0; i < n; i++) {
+        (*buckets)[i] = (int)trigram_bucket(p + i);
+    }
+
+    // 排序去重，保证同一项在一个桶里只出现一次
+    qsort(*buckets, n, sizeof(int), compare_ints);
+    int unique = 1;
+    for (int i = 1; i < n; i++) {
+        if ((*buckets)[i] != (*buckets)[unique - 1]) {
+            (*buckets)[unique++] = (*buckets)[i];
+        }
+    }
+    return unique;
+}
+
+// 构建索引：两遍扫描，第一遍统计每个桶的长度，第二遍按项顺序填充（桶内天然有序）
+TrigramIndex* trigram_index_build(const char** items, int items_count) {
+    TrigramIndex* index = (TrigramIndex*)malloc(sizeof(TrigramIndex));
+    index->item_count = items_count;
+    index->bucket_count = TRIGRAM_BUCKET_COUNT;
+    index->bucket_offsets = (long long*)calloc(TRIGRAM_BUCKET_COUNT + 1, sizeof(long long));
+
+    int capacity = 256;
+    int* buckets = (int*)malloc(sizeof(int) * capacity);
+
+    for (int i = 0; i < items_count; i++) {
+        if (items[i] == NULL) continue;
+        int n = collect_buckets(items[i], &buckets, &capacity);
+        for (int k = 0; k < n; k++) {
+            index->bucket_offsets[buckets[k] + 1]++;
+        }
+    }
+
+    for (int b = 0; b < TRIGRAM_BUCKET_COUNT; b++) {
+        index->bucket_offsets[b + 1] += index->bucket_offsets[b];
+    }
+
+    long long total = index->bucket_offsets[TRIGRAM_BUCKET_COUNT];
+    index->postings = (int*)malloc(sizeof(int) * (total > 0 ? total : 1));
+    long long* cursor = (long long*)malloc(sizeof(long long) * TRIGRAM_BUCKET_COUNT);
+    memcpy(cursor, index->bucket_offsets, sizeof(long long) * TRIGRAM_BUCKET_COUNT);
+
+    for (int i = 0; i < items_count; i++) {
+        if (items[i] == NULL) continue;
+        int n = collect_buckets(items[i], &buckets, &capacity);
+        for (int k = 0; k < n; k++) {
+            index->postings[cursor[buckets[k]]++] = i;
+        }
+    }
+
+    free(cursor);
+    free(buckets);
+    return index;
+}
+
+// 两个有序列表求交集，结果写回 a，返回新长度
+static int intersect_sorted(int* a, int a_len, const int* b, long long b_len) {
+    int out = 0;
+    int i = 0;
+    long long j = 0;
+    while (i < a_len && j < b_len) {
+        if (a[i] < b[j]) {
+            i++;
+        } else if (a[i] > b[j]) {
+            j++;
+        } else {
+            a[out++] = a[i];
+            i++;
+            j++;
+        }
+    }
+    return out;
+}
+
+// 使用索引查找包含关键词的项（与 linear_search / case_insensitive_search 语义一致）
+// 三元组已按ASCII小写折叠，ignore_case 只影响候选校验
+// 关键词不足3个字节或索引与数据不匹配时返回 NULL，由调用方回退到线性搜索
+SearchResult* trigram_index_search(const TrigramIndex* index, const char** items, int items_count, const char* keyword, bool ignore_case) {
+    if (index == NULL || keyword == NULL || items_count != index->item_count) {
+        return NULL;
+    }
+
+    int capacity = 64;
+    int* buckets = (int*)malloc(sizeof(int) * capacity);
+    int n = collect_buckets(keyword, &buckets, &capacity);
+    if (n == 0) {
+        free(buckets);
+        return NULL;
+    }
+
+    // 从最短的倒排列表开始求交集，尽早缩小候选集
+    int shortest = 0;
+    for (int k = 1; k < n; k++) {
+        long long len_k = index->bucket_offsets[buckets[k] + 1] - index->bucket_offsets[buckets[k]];
+        long long len_s = index->bucket_offsets[buckets[shortest] + 1] - index->bucket_offsets[buckets[shortest]];
+        if (len_k < len_s) shortest = k;
+    }
+
+    long long start = index->bucket_offsets[buckets[shortest]];
+    int candidate_count = (int)(index->bucket_offsets[buckets[shortest] + 1] - start);
+    int* candidates = (int*)malloc(sizeof(int) * (candidate_count > 0 ? candidate_count : 1));
+    memcpy(candidates, index->postings + start, sizeof(int) * candidate_count);
+
+    for (int k = 0; k < n && candidate_count > 0; k++) {
+        if (k == shortest) continue;
+        long long b_start = index->bucket_offsets[buckets[k]];
+        long long b_len = index->bucket_offsets[buckets[k] + 1] - b_start;
+        candidate_count = intersect_sorted(candidates, candidate_count, index->postings + b_start, b_len);
+    }
+
+    // 校验候选项，排除哈希冲突和三元组顺序不符的误报
+    SearchResult* result = init_search_result();
+    char* folded = ignore_case ? fold_keyword(keyword) : NULL;
+    size_t keyword_len = strlen(keyword);
+    for (int k = 0; k < candidate_count; k++) {
+        const char* item = items[candidates[k]];
+        if (item == NULL) continue;
+        const char* found = folded ? find_folded(item, strlen(item), folded, keyword_len) : strstr(item, keyword);
+        if (found != NULL) {
+            add_to_result(result, candidates[k]);
+        }
+    }
+
+    free(folded);
+    free(candidates);
+    free(buckets);
+    return result;
+}
+
+int trigram_index_item_count(const TrigramIndex* index) {
+    return index ? index->item_count : 0;
+}
+
+// 序列化格式：magic(4) | version(int) | item_count(int) | bucket_count(int) | bucket_offsets | postings
+char* trigram_index_dump(const TrigramIndex* index, long long* size) {
+    long long total = index->bucket_offsets[index->bucket_count];
+    long long header = 4 + sizeof(int) * 3;
+    long long offsets_size = sizeof(long long) * ((long long)index->bucket_count + 1);
+    long long postings_size = sizeof(int) * total;
+
+    *size = header + offsets_size + postings_size;
+    char* buffer = (char*)malloc(*size);
+    char* p = buffer;
+    int version = TRIGRAM_INDEX_VERSION;
+
+    memcpy(p, TRIGRAM_INDEX_MAGIC, 4); p += 4;
+    memcpy(p, &version, sizeof(int)); p += sizeof(int);
+    memcpy(p, &index->item_count, sizeof(int)); p += sizeof(int);
+    memcpy(p, &index->bucket_count, sizeof(int)); p += sizeof(int);
+    memcpy(p, index->bucket_offsets, offsets_size); p += offsets_size;
+    memcpy(p, index->postings, postings_size);
+    return buffer;
+}
+
+// 从序列化数据恢复索引，格式不符时返回 NULL
+TrigramIndex* trigram_index_restore(const char* data, long long size) {
+    long long header = 4 + sizeof(int) * 3;
+    if (data == NULL || size < header || memcmp(data, TRIGRAM_INDEX_MAGIC, 4) != 0) {
+        return NULL;
+    }
+
+    int version, item_count, bucket_count;
+    const char* p = data + 4;
+    memcpy(&version, p, sizeof(int)); p += sizeof(int);
+    memcpy(&item_count, p, sizeof(int)); p += sizeof(int);
+    memcpy(&bucket_count, p, sizeof(int)); p += sizeof(int);
+    if (version != TRIGRAM_INDEX_VERSION || bucket_count != TRIGRAM_BUCKET_COUNT || item_count < 0) {
+        return NULL;
+    }
+
+    long long offsets_size = sizeof(long long) * ((long long)bucket_count + 1);
+    if (size < header + offsets_size) {
+        return NULL;
+    }
+
+    TrigramIndex* index = (TrigramIndex*)malloc(sizeof(TrigramIndex));
+    index->item_count = item_count;
+    index->bucket_count = bucket_count;
+    index->bucket_offsets = (long long*)malloc(offsets_size);
+    memcpy(index->bucket_offsets, p, offsets_size); p += offsets_size;
+
+    long long total = index->bucket_offsets[bucket_count];
+    if (total < 0 || size != header + offsets_size + (long long)sizeof(int) * total) {
+        free(index->bucket_offsets);
+        free(index);
+        return NULL;
+    }
+
+    index->postings = (int*)malloc(sizeof(int) * (total > 0 ? total : 1));
+    memcpy(index->postings, p, sizeof(int) * total);
+    return index;
+}
+
+void trigram_index_free(TrigramIndex* index) {
+    if (index == NULL) return;
+    free(index->bucket_offsets);
+    free(index->postings);
+    free(index);
+}
@@ -0,0 +1,111 @@
+"""
+文件打开记录（frecency：打开频率与最近程度）
+
+每次打开文件记录一次，每条记录只保存打开次数与一个“衰减时间戳”：
+把按半衰期衰减的打开次数之和 S 表示为时间 E = now + half_life * log2(S)，
+打开一次时 E 与当前时间做对数相加，之后无需随时间更新；当前的 frecency 为 2 ** ((E - now) / half_life)。
+相关度排序时按 frecency 给经常、最近打开的文件加分（见 SearchWrapper._frecency_boosts）。
+"""
+import math
+import os
+import pickle
+import threading
+import time
+
+# frecency 的半衰期（秒）：一周前打开一次的分量是刚打开的一半
+FRECENCY_HALF_LIFE = 7 * 24 * 3600
+# 加分 = FRECENCY_BOOST_SCALE * log2(1 + frecency)，不超过 FRECENCY_MAX_BOOST（与排序得分同一单位，
+# 一个匹配字符约得 16 分，文件名内匹配另加 48 分）
+FRECENCY_BOOST_SCALE = 12
+FRECENCY_MAX_BOOST = 48
+# 最多保留的记录数，超出时丢弃 frecency 最低的记录
+FRECENCY_MAX_ENTRIES = 2000
+
+class FrecencyStore:
+    """
+    文件打开记录：路径 -> (打开次数, 衰减时间戳)
+
+    记录保存在一个小的pickle文件中，每次打开后整体重写（先写临时文件，再原子替换）；
+    version 在每次记录后递增并随文件保存，按相关度排序的查询结果缓存以此区分
+    """
+
+    def __init__(self, path, half_life=FRECENCY_HALF_LIFE, max_entries=FRECENCY_MAX_ENTRIES):
+        self.path = path
+        self.half_life = half_life
+        self.max_entries = max_entries
+        self.entries = {}  # 路径 -> (打开次数, 衰减时间戳)
+        self.version = 0
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        try:
+            if os.path.exists(self.path):
+                with open(self.path, 'rb') as f:
+                    data = pickle.load(f)
+                self.entries = dict(data.get('entries', {}))
+                self.version = data.get('version', 0)
+        except Exception as e:
+            print(f"加载文件打开记录失败: {e}")
+            self.entries = {}
+
+    def _save(self, data):
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'wb') as f:
+            pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, self.path)
+
+    def record(self, path, now=None):
+        """
+        记录一次打开
+
+        Args:
+            path: 文件路径（与文件缓存中的路径一致）
+            now: 打开时间（秒），None表示当前时间
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            count, decayed = self.entries.get(path, (0, None))
+            if decayed is None:
+                decayed = now
+            else:
+                # 对数相加：2^(E'/h) = 2^(E/h) + 2^(now/h)
+                high, low = max(decayed, now), min(decayed, now)
+                decayed = high + self.half_life * math.log2(1 + 2 ** ((low - high) / self.half_life))
+            self.entries[path] = (count + 1, decayed)
+            if len(self.entries) > self.max_entries:
+                # 衰减时间戳越小frecency越低
+                for stale in sorted(self.entries, key=lambda key: self.entries[key][1])[:len(self.entries) - self.max_entries]:
+                    del self.entries[stale]
+            self.version += 1
+            data = {'version': self.version, 'entries': dict(self.entries)}
+        try:
+            self._save(data)
+        except Exception as e:
+            print(f"保存文件打开记录失败: {e}")
+
+    def frecency(self, path, now=None):
+        """path当前的frecency（按半衰期衰减的打开次数之和），没有记录时为0"""
+        entry = self.entries.get(path)
+        if entry is None:
+            return 0.0
+        now = time.time() if now is None else now
+        return 2 ** ((entry[1] - now) / self.half_life)
+
+    def boosts(self, now=None):
+        """
+        各路径当前的排序加分
+
+        Returns:
+            {路径: 加分}，只含加分大于0的路径
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            entries = list(self.entries.items())
+        result = {}
+        for path, (count, decayed) in entries:
+            frecency = 2 ** ((decayed - now) / self.half_life)
+            boost = min(FRECENCY_MAX_BOOST, round(FRECENCY_BOOST_SCALE * math.log2(1 + frecency)))
+            if boost > 0:
+                result[path] = boost
+        return result
@@ -0,0 +1,158 @@
+"""
+搜索历史日志
+
+查询结果以追加方式写入日志文件，每条记录为4字节小端长度加pickle数据，
+写入由后台线程完成，不占用查询路径。记录数明显多于有效条目时，
+后台线程用当前有效条目的快照重写日志（压缩）。
+"""
+import os
+import pickle
+import queue
+import struct
+import threading
+import atexit
+
+class HistoryJournal:
+    """
+    追加写入的搜索历史日志
+
+    记录格式为 (cache_timestamp, key, indices)：cache_timestamp 是结果对应的文件缓存的保存时间，
+    加载时只采用与当前文件缓存一致的记录，同一键的后一条记录覆盖前一条
+    """
+
+    RECORD_HEADER = struct.Struct('<I')
+    _COMPACT = object()  # 队列中的压缩请求
+    _STOP = object()  # 队列中的停止请求
+
+    def __init__(self, path, snapshot, compact_min_records=256):
+        """
+        Args:
+            path: 日志文件路径
+            snapshot: 返回当前全部有效记录 [(cache_timestamp, key, indices)...] 的函数，压缩时在写入线程中调用
+            compact_min_records: 记录数不超过该值时不压缩
+        """
+        self.path = path
+        self.snapshot = snapshot
+        self.compact_min_records = compact_min_records
+        self.record_count = 0  # 日志中的记录数
+        self.live_count = 0  # 上次压缩后的有效记录数
+        self._queue = queue.Queue()
+        self._file_lock = threading.Lock()
+        self._writer = None
+        self._writer_lock = threading.Lock()
+
+    def replay(self):
+        """
+        读取日志中的全部记录，末尾不完整的记录（写入中断）会被截掉
+
+        Returns:
+            [(cache_timestamp, key, indices)...]，按写入顺序排列
+        """
+        records = []
+        with self._file_lock:
+            if not os.path.exists(self.path):
+                return records
+            with open(self.path, 'rb') as f:
+                data = f.read()
+            position = 0
+            while position + self.RECORD_HEADER.size <= len(data):
+                (length,) = self.RECORD_HEADER.unpack_from(data, position)
+                end = position + self.RECORD_HEADER.size + length
+                if end > len(data):
+                    break
+                try:
+                    records.append(pickle.loads(data[position + self.RECORD_HEADER.size:end]))
+                except Exception:
+                    break
+                position = end
+            if position < len(data):
+                with open(self.path, 'r+b') as f:
+                    f.truncate(position)
+            self.record_count = len(records)
+            self.live_count = len(records)
+        return records
+
+    def append(self, cache_timestamp, key, indices):
+        """把一条记录交给写入线程（立即返回）"""
+        self._ensure_writer()
+        self._queue.put((cache_timestamp, key, indices))
+
+    def request_compaction(self):
+        """请求写入线程用当前快照重写日志"""
+        self._ensure_writer()
+        self._queue.put(self._COMPACT)
+
+    def flush(self):
+        """等待已提交的记录全部写入"""
+        if self._writer is not None:
+            self._queue.join()
+
+    def close(self):
+        """写完已提交的记录后停止写入线程"""
+        with self._writer_lock:
+            writer = self._writer
+            self._writer = None
+        if writer is not None:
+            self._queue.put(self._STOP)
+            writer.join()
+
+    def _ensure_writer(self):
+        with self._writer_lock:
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._run, name="HistoryJournalWriter", daemon=True)
+                self._writer.start()
+                atexit.register(self.close)
+
+    def _run(self):
+        """写入线程：批量追加队列中的记录，必要时压缩"""
+        while True:
+            item = self._queue.get()
+            items = [item]
+            # 一次取出已排队的全部请求，合并为一次写入
+            while True:
+                try:
+                    items.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                compact = any(entry is self._COMPACT for entry in items)
+                records = [entry for entry in items if entry is not self._COMPACT and entry is not self._STOP]
+                if records:
+                    self._write_records(records)
+                if compact or self._needs_compaction():
+                    self._compact()
+            except Exception as e:
+                print(f"写入搜索历史失败: {e}")
+            finally:
+                for _ in items:
+                    self._queue.task_done()
+            if any(entry is self._STOP for entry in items):
+                return
+
+    def _write_records(self, records):
+        chunks = []
+        for record in records:
+            payload = pickle.dumps(record, protocol=pickle.HIGHEST_PROTOCOL)
+            chunks.append(self.RECORD_HEADER.pack(len(payload)))
+            chunks.append(payload)
+        with self._file_lock:
+            with open(self.path, 'ab') as f:
+                f.write(b''.join(chunks))
+            self.record_count += len(records)
+
+    def _needs_compaction(self):
+        return self.record_count > max(self.compact_min_records, 2 * self.live_count)
+
+    def _compact(self):
+        """用有效记录的快照重写日志：先写临时文件，再原子替换"""
+        records = self.snapshot()
+        temp_path = self.path + '.tmp'
+        with self._file_lock:
+            with open(temp_path, 'wb') as f:
+                for record in records:
+                    payload = pickle.dumps(record, protocol=pickle.HIGHEST_PROTOCOL)
+                    f.write(self.RECORD_HEADER.pack(len(payload)))
+                    f.write(payload)
+            os.replace(temp_path, self.path)
+            self.record_count = len(records)
+            self.live_count = len(records)
@@ -0,0 +1,39 @@
+"""
+中文文件名的拼音转写
+
+建立文件缓存时把含汉字的文件名转写为全拼与首字母（如“报告.docx”转写为“baogao.docx”与“bg.docx”），
+作为额外的可搜索列，输入拼音即可找到中文文件名；查询时不再逐项转写。
+需要安装pypinyin，未安装时不建立拼音列。
+"""
+import re
+
+try:
+    from pypinyin import lazy_pinyin, Style
+    PINYIN_AVAILABLE = True
+except ImportError:
+    print("警告: 未安装pypinyin库，无法按拼音搜索中文文件名")
+    PINYIN_AVAILABLE = False
+
+# CJK统一汉字（含扩展A）与兼容汉字
+_HAN = re.compile(r'[\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]')
+
+def transliterate(name):
+    """
+    把文件名转写为拼音，非汉字部分原样保留（多音字取最常用的读音）
+
+    Args:
+        name: 文件名
+
+    Returns:
+        [全拼, 首字母]（小写，两者相同时只有一项）；不含汉字或pypinyin不可用时为空列表
+    """
+    if not PINYIN_AVAILABLE or not _HAN.search(name):
+        return []
+    full = ''.join(lazy_pinyin(name)).lower()
+    initials = ''.join(lazy_pinyin(name, style=Style.FIRST_LETTER)).lower()
+    return [full] if full == initials else [full, initials]
+
+def is_pinyin_keyword(keyword):
+    """关键词是否可能是拼音（只含ASCII字母、数字与文件名中常见的符号，不含路径分隔符）"""
+    return (bool(keyword) and keyword.isascii() and any(char.isalpha() for char in keyword) and
+            '/' not in keyword and '\\' not in keyword)
@@ -0,0 +1,456 @@
+"""
+搜索查询语言
+
+把搜索框中的文本解析为条件树，并由规划器按代价重新排列：
+扩展名、目录等列过滤最先执行，其次是可用索引的关键词，再次是逐项校验的子串与模糊匹配，
+需要读取文件属性（大小、修改时间）的条件最后只在剩余的候选项上检查。
+
+语法：
+    foo bar          同时包含foo与bar（AND可省略）
+    foo OR bar       包含foo或bar（也可写作 foo | bar）
+    -foo / NOT foo   不包含foo
+    (foo OR bar) baz 括号分组
+    "foo bar"        含空格的关键词，引号内的文本不作为运算符或过滤条件
+    ~foo             模糊匹配foo
+    regex:^a.*\.py$  正则表达式（编译为DFA，可含括号，含空格时加引号）
+    *.py / a?c.txt   含*或?的关键词（未加引号）为通配符模式，需匹配整个文件名（含路径分隔符时匹配整个路径）
+    ext:py,txt       扩展名过滤（忽略大小写）
+    path:/home/user  绝对路径：限定在该目录下；其他文本：路径中包含该文本
+    size:>10mb       文件大小：>、>=、<、<=、=或范围 1mb..10mb（单位b/kb/mb/gb/tb，按1024换算）
+    modified:7d      修改时间：today、yesterday、YYYY-MM-DD、时长（h/d/w，表示最近多久以内）或范围
+"""
+import datetime
+import os
+import re
+import time
+
+class QuerySyntaxError(ValueError):
+    """查询文本不符合语法"""
+
+# 各类条件的估算代价，规划器在AND中按代价从低到高执行
+COST_COLUMN = 0  # 扩展名、目录前缀：在语料库的列上过滤
+COST_INDEXED_TERM = 1  # 可用三元组索引的关键词（长度至少为3）
+COST_TERM = 2  # 逐项校验的子串匹配
+COST_REGEX = 3  # 正则表达式与通配符模式（先按必需字面量预筛选，再运行DFA）
+COST_FUZZY = 4  # 模糊匹配
+COST_NEGATION = 5  # 取反只在其他条件缩小的范围内排除项
+COST_STAT = 10  # 需要读取文件属性
+
+# 可用索引的最短关键词长度（与三元组索引一致）
+INDEXED_TERM_MIN_LENGTH = 3
+
+_SIZE_UNITS = {'': 1, 'b': 1, 'k': 1024, 'kb': 1024, 'm': 1024 ** 2, 'mb': 1024 ** 2,
+               'g': 1024 ** 3, 'gb': 1024 ** 3, 't': 1024 ** 4, 'tb': 1024 ** 4}
+_DURATION_UNITS = {'h': 3600, 'd': 86400, 'w': 7 * 86400}
+_COMPARISON = re.compile(r'^(>=|<=|>|<|=)?(.+)$')
+_SIZE_VALUE = re.compile(r'^(\d+(?:\.\d+)?)([a-z]*)$')
+_DURATION_VALUE = re.compile(r'^(\d+)([hdw])$')
+
+class Term:
+    """
+    关键词条件
+
+    Attributes:
+        text: 关键词
+        fuzzy: 是否模糊匹配
+        whole_path: 是否匹配整个路径（path:的非绝对路径值，或关键词含路径分隔符）
+    """
+
+    def __init__(self, text, fuzzy=False, whole_path=False):
+        self.text = text
+        self.fuzzy = fuzzy
+        self.whole_path = whole_path or '/' in text or '\\' in text
+
+    def cost(self):
+        if self.fuzzy:
+            return COST_FUZZY
+        # 同类关键词中越长越有选择性，先执行
+        base = COST_INDEXED_TERM if len(self.text) >= INDEXED_TERM_MIN_LENGTH else COST_TERM
+        return base + (1 - min(len(self.text), 16) / 16) / 2
+
+    def __str__(self):
+        text = _quote(self.text)
+        if self.fuzzy:
+            return '~' + text
+        return f'path:{text}' if self.whole_path and '/' not in self.text and '\\' not in self.text else text
+
+class RegexTerm:
+    """正则表达式条件，pattern含'/'时匹配整个路径"""
+
+    def __init__(self, pattern):
+        self.pattern = pattern
+        self.whole_path = '/' in pattern
+
+    def cost(self):
+        return COST_REGEX
+
+    def __str__(self):
+        return 'regex:' + _quote(self.pattern)
+
+class GlobTerm:
+    """通配符模式条件（* ? [...]），需匹配整项；pattern含路径分隔符或来自path:时匹配整个路径"""
+
+    def __init__(self, pattern, whole_path=False):
+        self.pattern = pattern
+        self.whole_path = whole_path or '/' in pattern or '\\' in pattern
+
+    def cost(self):
+        return COST_REGEX
+
+    def __str__(self):
+        # 通配符模式来自未加引号的记号，原样输出即可重新解析
+        if self.whole_path and '/' not in self.pattern and '\\' not in self.pattern:
+            return 'path:' + self.pattern
+        return self.pattern
+
+class ExtensionFilter:
+    """扩展名过滤，extensions为不带点的小写扩展名元组"""
+
+    def __init__(self, extensions):
+        self.extensions = extensions
+
+    def cost(self):
+        return COST_COLUMN
+
+    def __str__(self):
+        return 'ext:' + ','.join(self.extensions)
+
+class DirectoryFilter:
+    """限定在directory（绝对路径）下"""
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def cost(self):
+        return COST_COLUMN
+
+    def __str__(self):
+        return 'path:' + _quote(self.directory)
+
+class StatFilter:
+    """
+    文件属性过滤，需要读取文件属性
+
+    Attributes:
+        field: 'size'（字节）或 'modified'（修改时间戳）
+        low: 下限（含），None表示不限
+        high: 上限（含），None表示不限
+    """
+
+    def __init__(self, field, low, high):
+        self.field = field
+        self.low = low
+        self.high = high
+
+    def cost(self):
+        return COST_STAT
+
+    def accepts(self, stat_result):
+        """判断os.stat的结果是否满足条件"""
+        value = stat_result.st_size if self.field == 'size' else stat_result.st_mtime
+        return (self.low is None or value >= self.low) and (self.high is None or value <= self.high)
+
+    def __str__(self):
+        low = '' if self.low is None else repr(self.low)
+        high = '' if self.high is None else repr(self.high)
+        return f'{self.field}:{low}..{high}'
+
+class Not:
+    """取反：在当前候选项中排除满足child的项"""
+
+    def __init__(self, child):
+        self.child = child
+
+    def cost(self):
+        return COST_NEGATION + self.child.cost()
+
+    def __str__(self):
+        return f'NOT {_group(self.child)}'
+
+class And:
+    """所有子条件都满足，规划后children按代价从低到高排列"""
+
+    def __init__(self, children):
+        self.children = children
+
+    def cost(self):
+        # 第一个条件决定了后续条件需要校验的范围
+        return min(child.cost() for child in self.children)
+
+    def __str__(self):
+        return ' '.join(_group(child) for child in self.children)
+
+class Or:
+    """任一子条件满足"""
+
+    def __init__(self, children):
+        self.children = children
+
+    def cost(self):
+        return max(child.cost() for child in self.children)
+
+    def __str__(self):
+        return ' OR '.join(_group(child) for child in self.children)
+
+def _quote(text):
+    """需要时给文本加引号，使str(条件树)重新解析后得到相同的条件"""
+    if (not text or text in ('AND', 'OR', 'NOT', '|') or text[0] in '-~' or
+            any(char.isspace() or char in '()":*?' for char in text)):
+        return f'"{text}"'
+    return text
+
+def _group(node):
+    return f'({node})' if isinstance(node, (And, Or)) else str(node)
+
+def _tokenize(text):
+    """
+    拆分查询文本，返回 [(文本, 是否整体加引号)...]；括号单独成为记号
+
+    Raises:
+        QuerySyntaxError: 引号不成对
+    """
+    tokens = []
+    position = 0
+    length = len(text)
+    while position < length:
+        char = text[position]
+        if char.isspace():
+            position += 1
+            continue
+        if char in '()':
+            tokens.append((char, False))
+            position += 1
+            continue
+        quoted = char == '"'
+        parts = []
+        while position < length and not text[position].isspace() and (text[position] not in '()' or _is_regex_token(parts)):
+            if text[position] == '"':
+                end = text.find('"', position + 1)
+                if end < 0:
+                    raise QuerySyntaxError("引号不成对")
+                parts.append(text[position + 1:end])
+                position = end + 1
+            else:
+                parts.append(text[position])
+                position += 1
+        tokens.append((''.join(parts), quoted))
+    return tokens
+
+def _is_glob(text):
+    """未加引号的关键词是否为通配符模式"""
+    return '*' in text or '?' in text
+
+def _is_regex_token(parts):
+    """正在读取的记号是否为regex:条件（其中的括号属于正则表达式）"""
+    return ''.join(parts[:7]).lstrip('-').lower().startswith('regex:')
+
+class _Parser:
+    def __init__(self, tokens, now):
+        self.tokens = tokens
+        self.position = 0
+        self.now = now
+
+    def peek(self):
+        return self.tokens[self.position] if self.position < len(self.tokens) else None
+
+    def next(self):
+        token = self.tokens[self.position]
+        self.position += 1
+        return token
+
+    def at_operator(self, *names):
+        token = self.peek()
+        return token is not None and not token[1] and token[0] in names
+
+    def parse(self):
+        node = self.parse_or()
+        if self.peek() is not None:
+            raise QuerySyntaxError("多余的')'")
+        return node
+
+    def parse_or(self):
+        children = [self.parse_and()]
+        while self.at_operator('OR', '|'):
+            self.next()
+            children.append(self.parse_and())
+        return children[0] if len(children) == 1 else Or(children)
+
+    def parse_and(self):
+        children = []
+        while self.peek() is not None and not self.at_operator(')', 'OR', '|'):
+            if self.at_operator('AND'):
+                self.next()
+                continue
+            children.append(self.parse_unary())
+        if not children:
+            raise QuerySyntaxError("缺少搜索条件")
+        return children[0] if len(children) == 1 else And(children)
+
+    def parse_unary(self):
+        if self.at_operator('NOT', '-'):
+            self.next()
+            if self.peek() is None:
+                raise QuerySyntaxError("NOT之后缺少搜索条件")
+            return Not(self.parse_unary())
+        if self.at_operator('('):
+            self.next()
+            node = self.parse_or()
+            if not self.at_operator(')'):
+                raise QuerySyntaxError("缺少')'")
+            self.next()
+            return node
+        text, quoted = self.next()
+        if not quoted and text.startswith('-') and len(text) > 1:
+            return Not(self.parse_atom(text[1:], False))
+        return self.parse_atom(text, quoted)
+
+    def parse_atom(self, text, quoted):
+        if not quoted:
+            name, colon, value = text.partition(':')
+            name = name.lower()
+            if colon and name in ('ext', 'path', 'size', 'modified', 'regex'):
+                if not value:
+                    raise QuerySyntaxError(f"{name}: 缺少值")
+                return getattr(self, 'parse_' + name)(value)
+            if text.startswith('~') and len(text) > 1:
+                return Term(text[1:], fuzzy=True)
+            if _is_glob(text):
+                return GlobTerm(text)
+        return Term(text)
+
+    def parse_ext(self, value):
+        extensions = tuple(sorted({ext.strip().lstrip('.').lower() for ext in value.split(',') if ext.strip().lstrip('.')}))
+        if not extensions:
+            raise QuerySyntaxError("ext: 缺少扩展名")
+        return ExtensionFilter(extensions)
+
+    def parse_regex(self, value):
+        return RegexTerm(value)
+
+    def parse_path(self, value):
+        if _is_glob(value):
+            return GlobTerm(value, whole_path=True)
+        if os.path.isabs(value):
+            return DirectoryFilter(value)
+        return Term(value, whole_path=True)
+
+    def parse_size(self, value):
+        return self.parse_range('size', value, self.size_bounds)
+
+    def parse_modified(self, value):
+        return self.parse_range('modified', value, self.modified_bounds)
+
+    def parse_range(self, field, value, bounds):
+        """解析比较或范围（a..b），bounds把单个值转换为(下限, 上限)"""
+        value = value.lower()
+        if '..' in value:
+            low_text, _, high_text = value.partition('..')
+            low = bounds(low_text)[0] if low_text else None
+            high = bounds(high_text)[1] if high_text else None
+            return StatFilter(field, low, high)
+        operator, operand = _COMPARISON.match(value).groups()
+        low, high = bounds(operand)
+        if operator == '>':
+            return StatFilter(field, high + 1 if field == 'size' else high, None)
+        if operator == '>=':
+            return StatFilter(field, low, None)
+        if operator == '<':
+            return StatFilter(field, None, low - 1 if field == 'size' else low)
+        if operator == '<=':
+            return StatFilter(field, None, high)
+        return StatFilter(field, low, high)
+
+    @staticmethod
+    def size_bounds(text):
+        match = _SIZE_VALUE.match(text)
+        if not match or match.group(2) not in _SIZE_UNITS:
+            raise QuerySyntaxError(f"无效的大小: {text}")
+        size = int(float(match.group(1)) * _SIZE_UNITS[match.group(2)])
+        return size, size
+
+    def modified_bounds(self, text):
+        """把日期或时长转换为修改时间戳的(下限, 上限)；时长N表示最近N以内，即[now-N, now]"""
+        match = _DURATION_VALUE.match(text)
+        if match:
+            return self.now - int(match.group(1)) * _DURATION_UNITS[match.group(2)], self.now
+        today = datetime.date.fromtimestamp(self.now)
+        if text == 'today':
+            day = today
+        elif text == 'yesterday':
+            day = today - datetime.timedelta(days=1)
+        else:
+            try:
+                day = datetime.date.fromisoformat(text)
+            except ValueError:
+                raise QuerySyntaxError(f"无效的日期: {text}") from None
+        start = time.mktime(day.timetuple())
+        end = time.mktime((day + datetime.timedelta(days=1)).timetuple())
+        return start, end - 1e-6
+
+def parse_query(text, now=None):
+    """
+    解析查询文本
+
+    Args:
+        text: 查询文本
+        now: 解析相对时间（today、7d等）时使用的当前时间戳，None表示time.time()
+
+    Returns:
+        条件树（Term、RegexTerm、GlobTerm、ExtensionFilter、DirectoryFilter、StatFilter、Not、And、Or）
+
+    Raises:
+        QuerySyntaxError: 查询文本不符合语法
+    """
+    tokens = _tokenize(text)
+    if not tokens:
+        raise QuerySyntaxError("查询为空")
+    return _Parser(tokens, time.time() if now is None else now).parse()
+
+def plan_query(node):
+    """
+    生成执行计划：展开嵌套的AND/OR，AND的子条件按代价从低到高排列
+
+    执行时AND的每个子条件只在前面条件留下的候选项中求值，
+    因此列过滤与索引查找先把范围缩小，逐项校验与读取文件属性的条件只处理剩余的项
+
+    Returns:
+        重新排列后的条件树
+    """
+    if isinstance(node, Not):
+        return Not(plan_query(node.child))
+    if isinstance(node, (And, Or)):
+        children = []
+        for child in node.children:
+            child = plan_query(child)
+            if type(child) is type(node):
+                children.extend(child.children)
+            else:
+                children.append(child)
+        if isinstance(node, And):
+            children.sort(key=lambda child: child.cost())
+        return type(node)(children)
+    return node
+
+def plain_keyword(node):
+    """查询只是一个普通关键词（无运算符、过滤条件与模糊匹配）时返回该关键词，否则返回None"""
+    if isinstance(node, Term) and not node.fuzzy and str(node) == node.text:
+        return node.text
+    return None
+
+def positive_terms(node):
+    """条件树中不在取反之下的非模糊关键词，用于对最终结果按相关度排序"""
+    if isinstance(node, Term):
+        return [node] if not node.fuzzy else []
+    if isinstance(node, (And, Or)):
+        return [term for child in node.children for term in positive_terms(child)]
+    return []
+
+def needs_stat(node):
+    """条件树是否包含需要读取文件属性的条件（结果依赖磁盘状态，不宜缓存）"""
+    if isinstance(node, StatFilter):
+        return True
+    if isinstance(node, Not):
+        return needs_stat(node.child)
+    if isinstance(node, (And, Or)):
+        return any(needs_stat(child) for child in node.children)
+    return False
@@ -0,0 +1,114 @@
+"""
+查询结果缓存
+
+按查询参数缓存匹配项在文件缓存中的索引（array('i')），而不是文件路径列表。
+条目属于某个缓存代数，文件缓存被替换或追加后代数变化，之前的条目全部失效；
+条目总大小超过内存预算时按最近最少使用的顺序淘汰。
+"""
+import threading
+from array import array
+from collections import OrderedDict
+
+# 默认内存预算（字节）
+DEFAULT_MAX_BYTES = 32 * 1024 * 1024
+
+class ResultCache:
+    """
+    有内存预算的LRU查询结果缓存（线程安全）
+
+    get/put都需要传入当前的缓存代数：代数与已有条目不同时先清空全部条目，
+    因此缓存中的索引总是对应同一份文件缓存
+    """
+
+    ENTRY_OVERHEAD = 256  # 每个条目的键、数组对象等额外开销的估算值（字节）
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self._entries = OrderedDict()  # 键 -> array('i')，末尾为最近使用
+        self._lock = threading.Lock()
+        self._max_bytes = max_bytes
+        self.generation = None  # 当前条目所属的缓存代数
+        self.total_bytes = 0  # 当前条目的估算总大小
+
+    @property
+    def max_bytes(self):
+        return self._max_bytes
+
+    @max_bytes.setter
+    def max_bytes(self, value):
+        """调整内存预算，超出新预算的条目立即淘汰"""
+        with self._lock:
+            self._max_bytes = value
+            self._evict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @classmethod
+    def entry_size(cls, indices):
+        """条目的估算大小（字节）"""
+        return indices.itemsize * len(indices) + cls.ENTRY_OVERHEAD
+
+    def get(self, key, generation):
+        """
+        查找缓存的结果
+
+        Args:
+            key: 查询键（可哈希，需包含所有影响结果的参数）
+            generation: 当前的缓存代数
+
+        Returns:
+            匹配项索引的array('i')，未命中或代数已变化时返回None
+        """
+        with self._lock:
+            self._check_generation(generation)
+            indices = self._entries.get(key)
+            if indices is not None:
+                self._entries.move_to_end(key)
+            return indices
+
+    def put(self, key, generation, indices):
+        """
+        记录一次查询的结果，单个结果超过内存预算时不缓存
+
+        Args:
+            key: 查询键
+            generation: 结果对应的缓存代数
+            indices: 匹配项在文件缓存中的索引（可迭代的整数）
+        """
+        if not isinstance(indices, array) or indices.typecode != 'i':
+            indices = array('i', indices)
+        size = self.entry_size(indices)
+        with self._lock:
+            self._check_generation(generation)
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.total_bytes -= self.entry_size(old)
+            if size > self._max_bytes:
+                return
+            self._entries[key] = indices
+            self.total_bytes += size
+            self._evict()
+
+    def items(self):
+        """返回 (代数, [(键, 索引)...]) 快照，按最近最少使用到最近使用排列"""
+        with self._lock:
+            return self.generation, list(self._entries.items())
+
+    def clear(self):
+        """清空全部条目"""
+        with self._lock:
+            self._entries.clear()
+            self.total_bytes = 0
+
+    def _check_generation(self, generation):
+        """代数变化时清空条目（调用时持有锁）"""
+        if generation != self.generation:
+            self._entries.clear()
+            self.total_bytes = 0
+            self.generation = generation
+
+    def _evict(self):
+        """淘汰最近最少使用的条目直到不超过预算（调用时持有锁）"""
+        while self._entries and self.total_bytes > self._max_bytes:
+            _, indices = self._entries.popitem(last=False)
+            self.total_bytes -= self.entry_size(indices)
@@ -0,0 +1,66 @@
+"""
+搜索结果视图
+
+搜索结果以匹配项在文件缓存中的索引（array('i')）表示，ResultView 在索引之上提供只读的路径序列：
+支持 len()、下标、切片与迭代，访问时才从文件缓存取出路径，界面只显示前一屏时不必为全部结果建立路径列表。
+文件缓存只会被追加或整体替换，视图引用创建时的文件列表，之后缓存变化不影响已返回的结果。
+"""
+from array import array
+from collections.abc import Sequence
+
+class ResultView(Sequence):
+    """
+    按索引引用文件缓存的只读路径序列
+
+    切片返回新的视图（只复制切片范围内的索引）；需要普通列表时使用 list(view) 或 tolist()
+    """
+
+    __slots__ = ('_files', '_indices')
+
+    def __init__(self, files, indices):
+        """
+        Args:
+            files: 文件路径列表（文件缓存）
+            indices: 结果在files中的索引（可迭代的整数），不是array('i')时复制为array('i')
+        """
+        if not isinstance(indices, array) or indices.typecode != 'i':
+            indices = array('i', indices)
+        self._files = files
+        self._indices = indices
+
+    @property
+    def indices(self):
+        """结果在文件缓存中的索引（array('i')，不要修改）"""
+        return self._indices
+
+    def __len__(self):
+        return len(self._indices)
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return ResultView(self._files, self._indices[key])
+        return self._files[self._indices[key]]
+
+    def __iter__(self):
+        files = self._files
+        for i in self._indices:
+            yield files[i]
+
+    def __eq__(self, other):
+        if isinstance(other, ResultView) and self._files is other._files and self._indices == other._indices:
+            return True
+        if isinstance(other, (ResultView, list, tuple)):
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        return NotImplemented
+
+    __hash__ = None
+
+    def tolist(self):
+        """取出全部路径，返回普通列表"""
+        files = self._files
+        return [files[i] for i in self._indices]
+
+    def __repr__(self):
+        preview = ', '.join(repr(path) for path in self[:3])
+        more = ', ...' if len(self) > 3 else ''
+        return f"ResultView([{preview}{more}], count={len(self)})"
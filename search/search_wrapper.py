@@ -1,4 +1,6 @@
 import os
+import re
+import fnmatch
 import ctypes
 import sys
 import threading
@@ -6,17 +8,781 @@ import time
 import datetime
 import json
 import pickle
+import itertools
+import abc
+import contextlib
+import unicodedata
 import concurrent.futures
+from array import array
 from ctypes import c_char_p, POINTER, c_int, c_bool
+from .result_cache import ResultCache
+from .history_journal import HistoryJournal
+from .pinyin import transliterate, is_pinyin_keyword, PINYIN_AVAILABLE
+from .frecency import FrecencyStore
+from .result_view import ResultView
+from .query import (parse_query, plan_query, positive_terms, needs_stat, INDEXED_TERM_MIN_LENGTH,
+                    And, Or, Not, RegexTerm, GlobTerm, ExtensionFilter, DirectoryFilter, StatFilter)
+
+# 缓存子串搜索可选的引擎（None表示自动选择：有三元组索引时使用索引，否则线性搜索）
+SEARCH_ENGINES = (None, 'linear', 'trigram', 'suffix_array')
+
+# 文件搜索的匹配范围：'path'匹配整个路径，'basename'只匹配文件名
+SEARCH_SCOPES = ('path', 'basename')
+
+# 文件搜索的关键词语法：'substring'为子串（或模糊、相关度）匹配，'regex'为正则表达式，'glob'为通配符模式
+SEARCH_MODES = ('substring', 'regex', 'glob')
+
+# 按缓存索引的打开记录加分最多沿用的时间（秒），之后按当前时间重新计算衰减
+FRECENCY_REFRESH_SECONDS = 600
 
 # 定义搜索结果结构体
 class SearchResult(ctypes.Structure):
     _fields_ = [
         ("indices", POINTER(c_int)),
         ("count", c_int),
-        ("capacity", c_int)
+        ("capacity", c_int),
+        ("scores", POINTER(c_int)),  # 仅按相关度排序的结果带有得分
+        ("matches", POINTER(c_int)),  # 排序搜索收集的全部匹配项索引（升序）
+        ("match_count", c_int)
+    ]
+
+def _path_basename(path):
+    """路径中最后一个'/'或'\\'之后的文件名部分（与C端path_basename_offset一致）"""
+    return path[max(path.rfind('/'), path.rfind('\\')) + 1:]
+
+def _fold_ascii(text):
+    """只折叠ASCII字母的大小写，与C端fold_keyword一致（中文等字符保持原样）"""
+    return text.translate(_ASCII_LOWER)
+
+def _fold_unicode(text):
+    """
+    完整的Unicode折叠：兼容分解（全角转半角等）后折叠大小写、去掉组合附加符号（重音等），再按NFC组合，
+    macOS的NFD路径与NFC路径折叠为相同的文本；ASCII文本只折叠大小写
+    """
+    if text.isascii():
+        return _fold_ascii(text)
+    decomposed = unicodedata.normalize('NFKD', unicodedata.normalize('NFKD', text).casefold())
+    return unicodedata.normalize('NFC', ''.join(char for char in decomposed if not unicodedata.combining(char)))
+
+_ASCII_LOWER = str.maketrans('ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz')
+
+class SearchCancelled(Exception):
+    """搜索或扫描被CancelToken取消"""
+
+class CancelToken:
+    """
+    与C端共享的取消标记
+    
+    C端扫描循环每隔若干项（目录扫描为每个目录项）读取一次标记，其他线程调用cancel()后，
+    正在进行的搜索或扫描会尽快返回，传入该标记的接口随后抛出SearchCancelled
+    """
+    
+    def __init__(self):
+        self._flag = c_int(0)
+        self._pointer = ctypes.pointer(self._flag)
+    
+    def cancel(self):
+        """设置取消标记（可在任意线程调用）"""
+        self._flag.value = 1
+    
+    @property
+    def cancelled(self):
+        return self._flag.value != 0
+    
+    def c_pointer(self):
+        """返回传给C端的标记指针"""
+        return self._pointer
+    
+    def check(self):
+        """
+        已取消时抛出SearchCancelled
+        
+        Raises:
+            SearchCancelled: 标记已被设置
+        """
+        if self.cancelled:
+            raise SearchCancelled("搜索已取消")
+
+def _cancel_pointer(cancel_token):
+    """CancelToken对应的C指针，None表示不可取消"""
+    return cancel_token.c_pointer() if cancel_token is not None else None
+
+def _check_cancelled(cancel_token):
+    """cancel_token不为None且已取消时抛出SearchCancelled"""
+    if cancel_token is not None:
+        cancel_token.check()
+
+def _consume_search_result(lib, result_ptr):
+    """提取C搜索结果中的索引列表并释放C端内存"""
+    result = result_ptr.contents
+    indices = []
+    if result.count > 0 and result.indices:
+        indices = result.indices[:result.count]
+    lib.free_search_result(result_ptr)
+    return indices
+
+def _consume_search_indices(lib, result_ptr):
+    """提取C搜索结果中的索引（array('i')，适合再作为候选集传回C端）并释放C端内存"""
+    result = result_ptr.contents
+    indices = array('i')
+    if result.count > 0 and result.indices:
+        indices.frombytes(ctypes.string_at(result.indices, result.count * indices.itemsize))
+    lib.free_search_result(result_ptr)
+    return indices
+
+def _merge_sorted_indices(lib, a, b, difference=False, universe=0):
+    """
+    在C端合并两个升序索引数组（array('i')）：difference为False时求并集，为True时求a与b的差集
+    
+    Args:
+        a: 升序索引，None表示0到universe - 1的全部项
+        b: 升序索引
+        universe: a为None时的项数
+    
+    Returns:
+        升序的array('i')
+    """
+    a_count = universe if a is None else len(a)
+    a_c = (c_int * a_count).from_buffer(a) if a is not None and a_count else None
+    b_c = (c_int * len(b)).from_buffer(b) if len(b) else None
+    return _consume_search_indices(lib, lib.merge_sorted_indices(a_c, a_count, b_c, len(b), difference))
+
+class ItemArena:
+    """
+    字符串列表的连续UTF-8存储：各项编码后以'\\0'结尾依次拼接为一个bytes，
+    offsets 记录每项的起始位置（共 count + 1 项，最后一项为总长度）
+    
+    列表变化时构建一次，之后每次查询只需向C传递存储区指针与长度，不再逐项编码
+    """
+    
+    def __init__(self, items):
+        encoded = [item.encode('utf-8') for item in items]
+        self.count = len(encoded)
+        self.blob = b'\0'.join(encoded) + b'\0' if encoded else b''
+        self.offsets = array('q', [0])
+        self.offsets.extend(itertools.accumulate(len(item) + 1 for item in encoded))
+        self.c_offsets = (ctypes.c_longlong * len(self.offsets)).from_buffer(self.offsets)
+        self._c_pointers = None
+    
+    def c_items(self):
+        """
+        返回指向存储区内各项的C字符串指针数组（供需要 const char** 的索引接口使用）
+        
+        指针直接指向blob内部，不复制字符串；首次调用时生成并复用
+        """
+        if self._c_pointers is None:
+            base = ctypes.cast(c_char_p(self.blob), ctypes.c_void_p).value or 0
+            self._c_pointers = (ctypes.c_void_p * self.count)(*[base + offset for offset in self.offsets[:-1]])
+        return ctypes.cast(self._c_pointers, POINTER(c_char_p))
+
+class SearchOptions(ctypes.Structure):
+    """与C端SearchOptions对应的逐项搜索选项"""
+    _fields_ = [
+        ("use_fuzzy", c_bool),
+        ("ignore_case", c_bool),
+        ("max_distance", c_int),
+        ("num_threads", c_int),
+        ("ranked", c_bool),
+        ("limit", c_int),
+        ("collect_matches", c_bool),
+        ("cancel", POINTER(c_int)),  # 取消标记，见CancelToken
+        ("basename_only", c_bool),  # 只在文件名部分中匹配
+        ("boosts", POINTER(c_int)),  # 排序搜索时按项索引的附加得分，见_set_boosts
+        ("boost_count", c_int),
+        ("max_boost", c_int)
     ]
 
+def _set_boosts(options, boosts, max_boost):
+    """把按项索引的附加得分（array('i')，None表示不加分）填入SearchOptions（options保持对数组的引用）"""
+    if not boosts:
+        return
+    c_boosts = (c_int * len(boosts)).from_buffer(boosts)
+    options.boosts = ctypes.cast(c_boosts, POINTER(c_int))
+    options.boost_count = len(boosts)
+    options.max_boost = max_boost
+
+# 流式搜索的C回调类型：(context, indices, count) -> 是否继续
+SearchBatchCallback = ctypes.CFUNCTYPE(c_bool, ctypes.c_void_p, POINTER(c_int), c_int)
+
+class SearchCorpus:
+    """
+    C端常驻内存的路径语料库
+    
+    路径编码后分批追加到C内存中（连续存储），查询只传递句柄与关键词；
+    追加与查询可以在不同线程同时进行，查询只看到调用时已追加的项
+    """
+    
+    def __init__(self, lib):
+        self.lib = lib
+        self.handle = lib.corpus_create()
+    
+    @staticmethod
+    def encode(items):
+        """将路径列表编码为corpus_append所需的数据（各项以'\\0'结尾依次拼接）"""
+        if not items:
+            return b''
+        return b'\0'.join(item.encode('utf-8') for item in items) + b'\0'
+    
+    def append(self, items, data=None):
+        """
+        追加一批路径
+        
+        Args:
+            items: 路径列表
+            data: encode(items)的结果，None表示在此编码（可预先在锁外编码）
+        
+        Returns:
+            追加后的项数
+        """
+        if data is None:
+            data = self.encode(items)
+        count = self.lib.corpus_append(self.handle, data, len(data), len(items))
+        if count < 0:
+            raise ValueError("语料库追加的数据格式不正确")
+        return count
+    
+    def __len__(self):
+        return self.lib.corpus_count(self.handle)
+    
+    @contextlib.contextmanager
+    def items_snapshot(self):
+        """
+        取得指向语料库内各项的C字符串数组（供索引的构建与校验使用）
+        
+        with块内登记为语料库的读者并持有语料库本身：并发的追加与扩容不会释放数组引用的存储区，
+        缓存被替换时旧语料库也要等到块结束后才会释放
+        
+        Yields:
+            (C字符串数组, 项数)
+        """
+        count = c_int()
+        items = self.lib.corpus_items_acquire(self.handle, ctypes.byref(count))
+        try:
+            yield items, count.value
+        finally:
+            self.lib.corpus_items_release(self.handle)
+    
+    def _search_ptr(self, keyword, options, candidates):
+        """执行查询并返回C搜索结果指针；candidates不为None时只在这些项中搜索"""
+        if candidates is None:
+            result_ptr = self.lib.corpus_search(self.handle, keyword.encode('utf-8'), ctypes.byref(options))
+        else:
+            c_candidates = (c_int * len(candidates)).from_buffer(candidates) if len(candidates) else None
+            result_ptr = self.lib.corpus_search_subset(self.handle, keyword.encode('utf-8'), ctypes.byref(options),
+                                                       c_candidates, len(candidates))
+        if not result_ptr:
+            raise ValueError("候选索引无效（需升序且不超过语料库项数）")
+        return result_ptr
+    
+    def search(self, keyword, use_fuzzy=False, max_distance=2, ignore_case=False, num_threads=0, ranked=False, limit=0, candidates=None, cancel_token=None, basename_only=False):
+        """
+        在语料库中搜索，返回匹配项的索引列表
+        
+        ranked为True时按相关度（子序列模糊匹配得分）从高到低排序，只返回前limit项（0表示全部）；
+        否则按索引升序返回子串/模糊匹配结果。candidates为升序索引的array('i')时只在这些项中搜索；
+        basename_only为True时只匹配各项的文件名部分（使用追加时记录的文件名偏移）
+        
+        Raises:
+            SearchCancelled: cancel_token在搜索期间被取消
+        """
+        options = SearchOptions(use_fuzzy, ignore_case, max_distance, num_threads, ranked, limit, False,
+                                _cancel_pointer(cancel_token), basename_only)
+        indices = _consume_search_result(self.lib, self._search_ptr(keyword, options, candidates))
+        _check_cancelled(cancel_token)
+        return indices
+    
+    def ranked_search_with_matches(self, keyword, limit=0, num_threads=0, candidates=None, cancel_token=None, basename_only=False, boosts=None, max_boost=0):
+        """
+        按相关度搜索，同时返回全部匹配项
+        
+        boosts为按项索引的附加得分（array('i')，可短于语料库，其余项不加分），max_boost为其中的最大值
+        
+        Returns:
+            (indices, matches)：得分最高的limit项索引（按得分从高到低），
+            以及不受limit限制的全部匹配项索引（升序的array('i')）
+        """
+        options = SearchOptions(False, False, 0, num_threads, True, limit, True, _cancel_pointer(cancel_token), basename_only)
+        _set_boosts(options, boosts, max_boost)
+        result_ptr = self._search_ptr(keyword, options, candidates)
+        result = result_ptr.contents
+        matches = array('i')
+        if result.match_count > 0 and result.matches:
+            matches.frombytes(ctypes.string_at(result.matches, result.match_count * matches.itemsize))
+        indices = _consume_search_result(self.lib, result_ptr)
+        _check_cancelled(cancel_token)
+        return indices, matches
+    
+    def search_stream(self, keyword, callback, batch_size=256, use_fuzzy=False, max_distance=2, ignore_case=False, num_threads=0, ranked=False, limit=0, cancel_token=None, basename_only=False, boosts=None, max_boost=0):
+        """
+        流式搜索：匹配项按索引升序分批交付，不必等待整个语料库扫描完成
+        
+        Args:
+            keyword: 搜索关键词
+            callback: 回调函数，参数为一批匹配项的索引列表，返回False时停止搜索
+            batch_size: 每批的项数
+            limit: 非排序模式下交付limit项后停止；排序模式下最多交付limit项作为初步结果（0表示不限）
+            boosts: 排序模式下按项索引的附加得分（array('i')），max_boost为其中的最大值
+        
+        Returns:
+            排序模式下为得分最高的limit项的索引（按得分从高到低），其他模式为空列表
+        
+        Raises:
+            SearchCancelled: cancel_token在搜索期间被取消
+        """
+        error = []
+        
+        def on_batch(context, indices, count):
+            try:
+                return callback(indices[:count]) is not False
+            except Exception as e:
+                error.append(e)
+                return False
+        
+        c_callback = SearchBatchCallback(on_batch)
+        options = SearchOptions(use_fuzzy, ignore_case, max_distance, num_threads, ranked, limit, False,
+                                _cancel_pointer(cancel_token), basename_only)
+        _set_boosts(options, boosts, max_boost)
+        result_ptr = self.lib.corpus_search_stream(self.handle, keyword.encode('utf-8'), ctypes.byref(options),
+                                                   batch_size, c_callback, None)
+        indices = _consume_search_result(self.lib, result_ptr) if result_ptr else []
+        if error:
+            raise error[0]
+        _check_cancelled(cancel_token)
+        return indices
+    
+    def build_path_order(self):
+        """
+        按路径排序当前已有的项，目录前缀过滤据此二分查找；之后追加的项在下次排序前逐项检查
+        
+        Returns:
+            已排序的项数
+        """
+        return self.lib.corpus_build_path_order(self.handle)
+    
+    def path_order_count(self):
+        """排序索引覆盖的项数（之后追加的项在下次排序前逐项检查）"""
+        return self.lib.corpus_path_order_count(self.handle)
+    
+    def filter(self, prefix=None, extensions=None, candidates=None):
+        """
+        按路径前缀与扩展名过滤，不访问磁盘
+        
+        Args:
+            prefix: 路径前缀，None表示不限
+            extensions: 扩展名列表（忽略大小写，可带前导点），None或空列表表示不限
+            candidates: 升序索引的array('i')，只在这些项中过滤
+        
+        Returns:
+            满足条件的项的索引（升序的array('i')）
+        
+        Raises:
+            ValueError: candidates无效
+        """
+        extension_count = len(extensions) if extensions else 0
+        extensions_c = (c_char_p * extension_count)(*[ext.lstrip('.').encode('utf-8') for ext in extensions]) if extension_count else None
+        prefix_c = prefix.encode('utf-8') if prefix else None
+        if candidates is None:
+            result_ptr = self.lib.corpus_filter(self.handle, prefix_c, extensions_c, extension_count, None, 0)
+        elif not len(candidates):
+            return array('i')  # C端把NULL候选视为全部项
+        else:
+            c_candidates = (c_int * len(candidates)).from_buffer(candidates)
+            result_ptr = self.lib.corpus_filter(self.handle, prefix_c, extensions_c, extension_count,
+                                                c_candidates, len(candidates))
+        if not result_ptr:
+            raise ValueError("候选索引无效（需升序且不超过语料库项数）")
+        return _consume_search_indices(self.lib, result_ptr)
+    
+    def prefix_range(self, prefix, basename_only=False, distinct=False, limit=0):
+        """
+        前缀区间查询：在排序索引中二分查找以prefix开头的项，排序之后追加的项逐项检查（这里不会排序，
+        排序由build_path_order在后台更新）
+        
+        Args:
+            prefix: 前缀
+            basename_only: 为True时按文件名前缀匹配（忽略ASCII大小写），否则按路径前缀匹配（区分大小写）
+            distinct: 为True时每个不同的补全只返回一项（文件名模式下为相同的文件名，
+                      路径模式下为prefix之后相同的下一级路径）
+            limit: 最多返回的项数，0表示不限
+        
+        Returns:
+            (indices, total)：按排序顺序的项索引列表（排序之后追加的项接在末尾），以及匹配prefix的项总数
+        """
+        result_ptr = self.lib.corpus_prefix_range(self.handle, prefix.encode('utf-8'), basename_only, distinct, limit)
+        if not result_ptr:
+            raise ValueError("前缀区间查询的参数无效")
+        total = result_ptr.contents.match_count
+        return _consume_search_result(self.lib, result_ptr), total
+    
+    def regex_search(self, regex, num_threads=0, candidates=None, cancel_token=None, basename_only=False):
+        """
+        按CompiledRegex搜索，先排除不含其必需字面量的项，再运行DFA
+        
+        Args:
+            candidates: 升序索引的array('i')，只在这些项中搜索
+        
+        Returns:
+            匹配项的索引列表（升序）
+        
+        Raises:
+            SearchCancelled: cancel_token在搜索期间被取消
+        """
+        if candidates is not None and not len(candidates):
+            return []
+        options = SearchOptions(False, regex.ignore_case, 0, num_threads, False, 0, False,
+                                _cancel_pointer(cancel_token), basename_only)
+        c_candidates = (c_int * len(candidates)).from_buffer(candidates) if candidates is not None else None
+        result_ptr = self.lib.corpus_regex_search(self.handle, regex.handle, ctypes.byref(options), c_candidates,
+                                                  len(candidates) if candidates is not None else 0)
+        if not result_ptr:
+            raise ValueError("候选索引无效（需升序且不超过语料库项数）")
+        indices = _consume_search_result(self.lib, result_ptr)
+        _check_cancelled(cancel_token)
+        return indices
+    
+    def close(self):
+        """释放C端语料库内存"""
+        if self.handle:
+            self.lib.corpus_free(self.handle)
+            self.handle = None
+    
+    def __del__(self):
+        self.close()
+
+class DerivedColumn(abc.ABC):
+    """
+    文件缓存的派生列：由路径计算出的可搜索文本（拼音转写、Unicode折叠等），每个路径对应零到多行
+    
+    派生文本存放在单独的C端语料库中，由与文件缓存相同的C搜索函数匹配，
+    owners记录每行所属的缓存项索引，匹配的行据此映射回文件缓存；子类实现derive_text
+    """
+    
+    def __init__(self, lib):
+        self.corpus = SearchCorpus(lib)
+        self.owners = array('i')  # 每行所属的缓存项索引（非降序）
+        self.names = []  # 每行的派生文本，保存缓存时一并保存
+    
+    @staticmethod
+    @abc.abstractmethod
+    def derive_text(path):
+        """返回路径的派生文本列表（没有时为空列表）"""
+    
+    @classmethod
+    def derive(cls, paths):
+        """
+        计算一批路径的派生文本（可在锁外进行）
+        
+        Returns:
+            (rows, names)：rows为各行所属路径在这批中的位置，names为对应的派生文本
+        """
+        rows = []
+        names = []
+        for position, path in enumerate(paths):
+            for name in cls.derive_text(path):
+                rows.append(position)
+                names.append(name)
+        return rows, names
+    
+    def append(self, owners, names):
+        """追加派生文本，owners为各行所属的缓存项索引"""
+        if not names:
+            return
+        # 先记录归属再追加到语料库，并发的查询匹配到的行总能映射回缓存项
+        self.owners.extend(owners)
+        self.names.extend(names)
+        self.corpus.append(names)
+    
+    def candidate_rows(self, candidates):
+        """
+        把缓存项索引映射为它们的派生行，派生语料库据此只搜索候选项的行
+        
+        Args:
+            candidates: 升序的缓存项索引（array('i')），None表示不限
+        
+        Returns:
+            升序的行号（array('i')），candidates为None时返回None
+        """
+        if candidates is None:
+            return None
+        # 复制已追加到语料库的行的归属：并发追加会扩展owners，导出了缓冲区的数组不能扩展
+        owners = self.owners[:len(self.corpus)]
+        owners_c = (c_int * len(owners)).from_buffer(owners) if len(owners) else None
+        candidates_c = (c_int * len(candidates)).from_buffer(candidates) if len(candidates) else None
+        return _consume_search_indices(self.corpus.lib, self.corpus.lib.select_owner_rows(
+            owners_c, len(owners), candidates_c, len(candidates)))
+    
+    def __len__(self):
+        return len(self.owners)
+    
+    def close(self):
+        self.corpus.close()
+
+class PinyinColumn(DerivedColumn):
+    """拼音列：含汉字的文件名的全拼与首字母转写（见pinyin.transliterate）"""
+    
+    @staticmethod
+    def derive_text(path):
+        return transliterate(_path_basename(path))
+    
+    def search(self, keyword, num_threads=0, candidates=None, cancel_token=None):
+        """
+        在转写文本中按子串（忽略ASCII大小写）搜索
+        
+        Args:
+            candidates: 升序的缓存项索引，只返回其中的项；None表示不限
+        
+        Returns:
+            (matched, prefixed)：匹配的缓存项索引（升序的array('i')），
+            以及其中转写以关键词开头的项（集合，相关度排序时排在前面）
+        """
+        rows = self.corpus.search(keyword, ignore_case=True, num_threads=num_threads,
+                                  candidates=self.candidate_rows(candidates), cancel_token=cancel_token)
+        folded = _fold_ascii(keyword)
+        matched = array('i')
+        prefixed = set()
+        for row in rows:
+            # 行号升序时所属项非降序，同一项的全拼与首字母行相邻
+            owner = self.owners[row]
+            if not matched or matched[-1] != owner:
+                matched.append(owner)
+            if self.names[row].startswith(folded):
+                prefixed.add(owner)
+        return matched, prefixed
+
+class FoldedColumn(DerivedColumn):
+    """
+    折叠列：路径的完整Unicode折叠（见_fold_unicode）
+    
+    只保存折叠结果与ASCII折叠不同的路径（含重音、全角、NFD分解或非ASCII大小写字母的路径），
+    其他路径的折叠就是忽略ASCII大小写的原路径，直接在语料库上搜索即可
+    """
+    
+    @staticmethod
+    def derive_text(path):
+        if path.isascii():
+            return []
+        if (unicodedata.is_normalized('NFKD', path) and unicodedata.is_normalized('NFKC', path) and
+                path.casefold() == _fold_ascii(path)):
+            # 快速判断（中文路径多属此类）：没有可分解或组合的字符，大小写折叠也只涉及ASCII
+            return []
+        folded = _fold_unicode(path)
+        return [folded] if folded != _fold_ascii(path) else []
+    
+    def search(self, folded_keyword, num_threads=0, candidates=None, cancel_token=None, basename_only=False):
+        """
+        按子串搜索已折叠的关键词（折叠后的文本直接按字节比较）
+        
+        Args:
+            candidates: 升序的缓存项索引，只返回其中的项；None表示不限
+        
+        Returns:
+            匹配的缓存项索引（升序的array('i')）
+        """
+        rows = self.corpus.search(folded_keyword, num_threads=num_threads, candidates=self.candidate_rows(candidates),
+                                  cancel_token=cancel_token, basename_only=basename_only)
+        owners = self.owners
+        return array('i', [owners[row] for row in rows])
+
+class CompiledRegex:
+    """
+    编译为DFA的正则表达式或通配符模式（C实现）的封装
+    
+    正则表达式支持字符类、分组、|、量词（含{m,n}）、^、$ 与 \\d \\w \\s 等转义，不支持反向引用、环视与单词边界；
+    匹配与 re.search 相同（不要求覆盖整项）。通配符模式支持 * ? [abc] [!abc]，需匹配整项（与 fnmatch 相同）。
+    每项的匹配时间与其长度成线性关系
+    """
+    
+    def __init__(self, lib, pattern, ignore_case=False, glob=False):
+        """
+        Args:
+            glob: pattern是否为通配符模式
+        
+        Raises:
+            ValueError: 模式无效或过于复杂
+        """
+        self.lib = lib
+        self.pattern = pattern
+        self.ignore_case = ignore_case
+        self.glob = glob
+        error = ctypes.create_string_buffer(256)
+        compile_pattern = lib.glob_compile if glob else lib.regex_compile
+        self.handle = compile_pattern(pattern.encode('utf-8'), ignore_case, error, len(error))
+        if not self.handle:
+            kind = "通配符模式" if glob else "正则表达式"
+            raise ValueError(f"无效的{kind}: {error.value.decode('utf-8', errors='replace')}")
+    
+    @property
+    def literal(self):
+        """每个匹配都必须包含的最长字面量（ignore_case时为小写），没有时为空串"""
+        return self.lib.regex_literal(self.handle).decode('utf-8', errors='ignore')
+    
+    def match(self, text):
+        """text中是否存在匹配"""
+        data = text.encode('utf-8')
+        return self.lib.regex_match(self.handle, data, len(data))
+    
+    def close(self):
+        """释放C端内存"""
+        if self.handle:
+            self.lib.regex_free(self.handle)
+            self.handle = None
+    
+    def __del__(self):
+        self.close()
+
+class _NativeIndex:
+    """
+    C端索引句柄的通用封装：负责序列化、加载与释放
+    
+    子类通过 _prefix 指定C函数名前缀（如 trigram_index_dump / trigram_index_restore）。
+    索引文件以 _STAMP_MAGIC、标记长度（4字节小端）与标记（所对应cache_file的保存时间）开头，
+    加载时标记与已加载的文件缓存不一致的索引视为过期（项数相同但内容不同的缓存也能识别）
+    """
+    _prefix = None
+    _STAMP_MAGIC = b'FSIDXv1\0'
+    
+    def __init__(self, lib, handle):
+        self.lib = lib
+        self.handle = handle
+    
+    def _func(self, name):
+        return getattr(self.lib, f"{self._prefix}_{name}")
+    
+    @classmethod
+    def load(cls, lib, path, stamp):
+        """
+        从磁盘加载索引
+        
+        Args:
+            lib: 搜索库
+            path: 索引文件路径
+            stamp: 已加载的cache_file的保存时间
+        
+        Returns:
+            索引；文件格式不符、没有标记（旧版本的索引文件）或标记与stamp不一致时返回None
+        """
+        with open(path, 'rb') as f:
+            data = f.read()
+        magic = cls._STAMP_MAGIC
+        header_len = len(magic) + 4
+        if stamp is None or not data.startswith(magic) or len(data) < header_len:
+            return None
+        stamp_len = int.from_bytes(data[len(magic):header_len], 'little')
+        if data[header_len:header_len + stamp_len] != stamp.encode('utf-8'):
+            return None
+        data = data[header_len + stamp_len:]
+        handle = getattr(lib, f"{cls._prefix}_restore")(data, len(data))
+        if not handle:
+            return None
+        return cls(lib, handle)
+    
+    def save(self, path, stamp):
+        """将索引序列化保存到磁盘，stamp为索引所对应cache_file的保存时间"""
+        size = ctypes.c_longlong()
+        buffer = self._func('dump')(self.handle, ctypes.byref(size))
+        try:
+            data = ctypes.string_at(buffer, size.value)
+        finally:
+            self.lib.free_search_buffer(buffer)
+        stamp = stamp.encode('utf-8')
+        with open(path, 'wb') as f:
+            f.write(self._STAMP_MAGIC + len(stamp).to_bytes(4, 'little') + stamp)
+            f.write(data)
+    
+    @property
+    def item_count(self):
+        """构建索引时的项数量"""
+        return self._func('item_count')(self.handle)
+    
+    def close(self):
+        """释放C端索引内存"""
+        if self.handle:
+            self._func('free')(self.handle)
+            self.handle = None
+    
+    def __del__(self):
+        self.close()
+
+class TrigramIndex(_NativeIndex):
+    """
+    三元组倒排索引（C实现）的封装
+    
+    索引只保存项的下标，查询时从构建索引的语料库取得C字符串数组用于候选校验
+    """
+    _prefix = 'trigram_index'
+    
+    @classmethod
+    def build(cls, lib, c_items, count):
+        """根据C字符串数组构建索引"""
+        return cls(lib, lib.trigram_index_build(c_items, count))
+    
+    def search(self, corpus, count, keyword, ignore_case=False):
+        """
+        使用索引执行子串搜索（ignore_case为True时忽略ASCII大小写）
+        
+        Args:
+            corpus: 构建索引时的SearchCorpus（之后追加的项不参与校验）
+            count: 索引对应的项数
+            keyword: 关键词
+            ignore_case: 是否忽略ASCII大小写
+        
+        Returns:
+            匹配项的索引列表；关键词不足3个字节或索引不匹配时返回None
+        """
+        with corpus.items_snapshot() as (c_items, available):
+            if available < count:
+                return None
+            result_ptr = self.lib.trigram_index_search(self.handle, c_items, count, keyword.encode('utf-8'), ignore_case)
+        if not result_ptr:
+            return None
+        return _consume_search_result(self.lib, result_ptr)
+
+class SuffixArrayIndex(_NativeIndex):
+    """
+    后缀数组索引（C实现）的封装
+    
+    索引内保存了所有项的拼接文本，查询时不需要再传入项列表
+    """
+    _prefix = 'suffix_array'
+    
+    @classmethod
+    def build(cls, lib, c_items, count):
+        """根据C字符串数组构建索引，文本超过2GB时返回None"""
+        handle = lib.suffix_array_build(c_items, count)
+        if not handle:
+            return None
+        return cls(lib, handle)
+    
+    def search(self, keyword):
+        """使用后缀数组执行子串搜索，返回匹配项的索引列表"""
+        result_ptr = self.lib.suffix_array_search(self.handle, keyword.encode('utf-8'))
+        return _consume_search_result(self.lib, result_ptr)
+
+class FuzzyIndex(_NativeIndex):
+    """
+    模糊搜索BK树索引（C实现）的封装
+    
+    以文件名为键，查询时按编辑距离剪枝，只计算少量节点的距离
+    """
+    _prefix = 'fuzzy_index'
+    
+    @classmethod
+    def build(cls, lib, c_items, count):
+        """根据C字符串数组构建索引"""
+        return cls(lib, lib.fuzzy_index_build(c_items, count))
+    
+    def search(self, keyword, max_distance):
+        """
+        查找文件名与关键词编辑距离不超过max_distance的项
+        
+        Returns:
+            匹配项的索引列表；关键词无法由索引处理时返回None
+        """
+        result_ptr = self.lib.fuzzy_index_search(self.handle, keyword.encode('utf-8'), max_distance)
+        if not result_ptr:
+            return None
+        return _consume_search_result(self.lib, result_ptr)
+
 class SearchWrapper:
     def __init__(self):
         self.dll_path = None
@@ -33,46 +799,74 @@ class SearchWrapper:
             os.makedirs(cache_dir)
         
         self.cache_file = os.path.join(cache_dir, 'file_cache.bin')  # 缓存文件路径（二进制格式）
-        self.search_history = {}  # 搜索历史记录
-        self.history_file = os.path.join(cache_dir, 'search_history.bin')  # 搜索历史文件路径（二进制格式）
+        self.cache_timestamp = None  # cache_file的保存时间，用于校验持久化的查询结果
+        self.saved_cache_generation = None  # 与cache_file内容一致的缓存代数
+        self.result_cache = ResultCache()  # 查询结果缓存（匹配项索引，缓存代数变化时失效）
+        self.history_file = os.path.join(cache_dir, 'search_history.journal')  # 搜索历史日志路径（追加写入）
+        self.history_journal = HistoryJournal(self.history_file, self._history_snapshot)
+        self._history_loaded = False  # 搜索历史日志是否已回放（首次查询时进行）
+        self._history_load_lock = threading.Lock()
+        self.frecency_file = os.path.join(cache_dir, 'frecency.bin')  # 文件打开记录路径
+        self.frecency = FrecencyStore(self.frecency_file)  # 文件打开记录，相关度排序据此给常用文件加分
+        self._frecency_state = None  # 与某个file_cache对应的按索引加分数组，见_frecency_boosts
+        self._frecency_lock = threading.Lock()
+        self.trigram_index_enabled = True  # 是否为缓存构建三元组索引
+        self.trigram_index = None  # 与file_cache对应的三元组索引
+        self.trigram_index_file = os.path.join(cache_dir, 'trigram_index.bin')  # 三元组索引文件路径
+        self.fuzzy_index_enabled = True  # 是否为缓存构建模糊搜索索引
+        self.fuzzy_index = None  # 与file_cache对应的模糊搜索BK树索引（按文件名）
+        self.fuzzy_index_file = os.path.join(cache_dir, 'fuzzy_index.bin')  # 模糊搜索索引文件路径
+        self.suffix_array = None  # 与file_cache对应的后缀数组（首次使用时加载或构建）
+        self.suffix_array_file = os.path.join(cache_dir, 'suffix_array.bin')  # 后缀数组文件路径
+        self.corpus = None  # 与file_cache对应的C端语料库（两者在scan_lock下同步追加）
+        self.pinyin_column = None  # 与file_cache对应的拼音列（与语料库同步追加），不可用时为None
+        self.folded_column = None  # 与file_cache对应的Unicode折叠列（与语料库同步追加），不可用时为None
+        self.cache_generation = 0  # 文件缓存的代数，缓存被替换或追加时递增
+        self.refine_stack = []  # 最近查询的 (代数, 模式, 关键词, 全部匹配项索引)，供扩展关键词缩小搜索范围
+        self.refine_stack_size = 8  # refine_stack保留的条目数
+        self.search_threads = 0  # C搜索使用的线程数，0表示按CPU核数自动选择，1表示单线程
+        self._corpus_order_thread = None  # 在后台构建语料库排序的线程，见_start_corpus_order_builder
         self._load_cache()  # 加载缓存
-        self._load_search_history()  # 加载搜索历史
         
         # 加载目录扫描库
         self._load_directory_scanner_library()
     
-    def scan_files(self, directory, max_depth=2, allowed_extensions=None):
+    def scan_files(self, directory, max_depth=2, allowed_extensions=None, cancel_token=None):
         """
         扫描指定目录下的文件
         
+        扫描完成后才替换缓存，扫描失败或被取消时原有缓存保持不变
+        
         Args:
             directory: 要扫描的目录路径
             max_depth: 最大扫描深度
             allowed_extensions: 允许的文件扩展名列表，None表示所有文件
+            cancel_token: CancelToken，None表示不可取消
             
         Returns:
             扫描到的文件路径列表
-        """
-        with self.scan_lock:
-            self.is_scanning = True
-            self.file_cache = []
         
+        Raises:
+            SearchCancelled: cancel_token在扫描期间被取消
+        """
         try:
             result_list = []
-            self._scan_directory(directory, 0, max_depth, allowed_extensions, result_list)
+            self._scan_directory(directory, 0, max_depth, allowed_extensions, result_list, cancel_token)
+            files, corpus = self._start_cache_scan()
+            self._append_to_cache(files, corpus, result_list)
             
             with self.scan_lock:
-                self.file_cache = result_list
-                result = result_list.copy()
                 self.is_scanning = False
-            return result
+            return result_list
+        except SearchCancelled:
+            raise
         except Exception as e:
             print(f"文件扫描失败: {e}")
             with self.scan_lock:
                 self.is_scanning = False
             return []
     
-    def _scan_directory(self, directory, current_depth, max_depth, allowed_extensions, result_list):
+    def _scan_directory(self, directory, current_depth, max_depth, allowed_extensions, result_list, cancel_token=None):
         """
         递归扫描目录的内部方法
         
@@ -82,9 +876,11 @@ class SearchWrapper:
             max_depth: 最大深度
             allowed_extensions: 允许的文件扩展名
             result_list: 用于存储结果的列表（线程本地）
+            cancel_token: CancelToken，C端每读取一个目录项检查一次
         
         Raises:
             Exception: 如果C语言实现不可用或出错
+            SearchCancelled: cancel_token在扫描期间被取消（不追加部分结果）
         """
         if current_depth > max_depth:
             return
@@ -112,9 +908,15 @@ class SearchWrapper:
         # 调用C函数
         file_count = c_int()
         file_paths = self.dir_scan_lib.scan_directory_c(
-            directory_c, depth_c, allowed_extensions_c, extension_count, ctypes.byref(file_count)
+            directory_c, depth_c, allowed_extensions_c, extension_count, ctypes.byref(file_count),
+            _cancel_pointer(cancel_token)
         )
         
+        if cancel_token is not None and cancel_token.cancelled:
+            if file_paths:
+                self.dir_scan_lib.free_scan_result(file_paths, file_count.value)
+            cancel_token.check()
+        
         # 处理结果
         if file_paths:
             for i in range(file_count.value):
@@ -133,17 +935,19 @@ class SearchWrapper:
             # 释放C函数分配的内存
             self.dir_scan_lib.free_scan_result(file_paths, file_count.value)
     
-    def pre_scan(self, depth=2, allowed_extensions=None):
+    def pre_scan(self, depth=2, allowed_extensions=None, cancel_token=None):
         """
         预扫描整个电脑的文件路径并保存到缓存
         
         Args:
             depth: 扫描深度
             allowed_extensions: 允许的文件扩展名列表，None表示所有文件
+            cancel_token: CancelToken，取消后停止扫描且不保存缓存
+        
+        Returns:
+            找到的文件数，失败或被取消时返回0
         """
-        with self.scan_lock:
-            self.is_scanning = True
-            self.file_cache = []
+        files, corpus = self._start_cache_scan()
         
         try:
             # 获取所有驱动器（仅Windows系统）
@@ -152,16 +956,16 @@ class SearchWrapper:
                 drives = [f"{d}:\\" for d in string.ascii_uppercase if os.path.exists(f"{d}:\\")]
                 print(f"开始预扫描所有驱动器: {drives}")
                 
-                # 使用线程池并行扫描所有驱动器
-                all_results = []
-                
+                # 使用线程池并行扫描所有驱动器，每个驱动器完成后立即追加到缓存
                 def scan_drive(drive):
                     """扫描单个驱动器"""
                     print(f"正在预扫描驱动器: {drive}")
                     drive_results = []
                     try:
-                        self._scan_directory(drive, 0, depth, allowed_extensions, drive_results)
+                        self._scan_directory(drive, 0, depth, allowed_extensions, drive_results, cancel_token)
                         print(f"驱动器 {drive} 预扫描完成")
+                    except SearchCancelled:
+                        pass
                     except Exception as e:
                         print(f"预扫描驱动器 {drive} 失败: {e}")
                     return drive_results
@@ -177,109 +981,428 @@ class SearchWrapper:
                         drive = future_to_drive[future]
                         try:
                             results = future.result()
-                            all_results.extend(results)
+                            self._append_to_cache(files, corpus, results)
                         except Exception as e:
                             print(f"处理驱动器 {drive} 的结果时出错: {e}")
-                
-                # 更新文件缓存
-                with self.scan_lock:
-                    self.file_cache = all_results
             else:
                 # 非Windows系统，搜索根目录
                 print("开始预扫描根目录")
                 root_results = []
-                self._scan_directory("/", 0, depth, allowed_extensions, root_results)
+                self._scan_directory("/", 0, depth, allowed_extensions, root_results, cancel_token)
                 print("根目录预扫描完成")
-                
-                with self.scan_lock:
-                    self.file_cache = root_results
+                self._append_to_cache(files, corpus, root_results)
+            
+            _check_cancelled(cancel_token)
             
-            # 保存缓存
+            # 保存缓存并重建索引
             self._save_cache()
-            print(f"预扫描完成，共找到 {len(self.file_cache)} 个文件")
+            self._build_cache_indexes()
+            print(f"预扫描完成，共找到 {len(files)} 个文件")
+            
+            with self.scan_lock:
+                self.is_scanning = False
+            return len(files)
+        except SearchCancelled:
+            print("预扫描已取消")
+            with self.scan_lock:
+                self.is_scanning = False
+            return 0
+        except Exception as e:
+            print(f"预扫描失败: {e}")
+            with self.scan_lock:
+                self.is_scanning = False
+            return 0
+    
+    def _save_cache(self):
+        """
+        将文件缓存保存为二进制文件
+        """
+        try:
+            with self.scan_lock:
+                files = self.file_cache
+                generation = self.cache_generation
+                file_count = len(files)
+                columns = [(key, getattr(self, attr)) for attr, _, key, _, _ in self._derived_column_specs()]
+                columns = [(key, column, len(column)) for key, column in columns if column is not None]
+            cache_data = {
+                'timestamp': datetime.datetime.now().isoformat(),
+                'file_count': file_count,
+                'files': files[:file_count]
+            }
+            for key, column, row_count in columns:
+                # 保存派生文本，加载缓存时不必重新计算
+                cache_data[key] = {'owners': column.owners[:row_count], 'names': column.names[:row_count]}
+            # 使用pickle保存为二进制文件
+            with open(self.cache_file, 'wb') as f:
+                pickle.dump(cache_data, f, protocol=pickle.HIGHEST_PROTOCOL)
+            with self.scan_lock:
+                if self.cache_generation == generation:
+                    self.cache_timestamp = cache_data['timestamp']
+                    self.saved_cache_generation = generation
+            print(f"缓存已保存到 {self.cache_file}")
+            # 缓存时间戳变化后日志中的记录全部失效，由写入线程压缩
+            self.history_journal.request_compaction()
+            # 后缀数组构建代价较高，缓存变化后删除旧文件，待下次使用时重新构建
+            self.suffix_array = None
+            if os.path.exists(self.suffix_array_file):
+                os.remove(self.suffix_array_file)
+        except Exception as e:
+            print(f"保存缓存失败: {e}")
+    
+    def _load_cache(self):
+        """
+        从二进制文件加载文件缓存
+        """
+        try:
+            if os.path.exists(self.cache_file):
+                # 使用pickle加载二进制文件
+                with open(self.cache_file, 'rb') as f:
+                    cache_data = pickle.load(f)
+                files = cache_data.get('files', [])
+                corpus = self._new_corpus()
+                if corpus is not None:
+                    corpus.append(files)
+                columns = {attr: self._load_derived_column(column_cls, enabled, label, files, cache_data.get(key))
+                           for attr, column_cls, key, enabled, label in self._derived_column_specs()}
+                with self.scan_lock:
+                    self.file_cache = files
+                    self.corpus = corpus
+                    for attr, column in columns.items():
+                        setattr(self, attr, column)
+                    self.cache_generation += 1
+                    self.cache_timestamp = cache_data.get('timestamp')
+                    self.saved_cache_generation = self.cache_generation
+                print(f"已从缓存加载 {len(self.file_cache)} 个文件")
+                # 打印缓存时间
+                timestamp = cache_data.get('timestamp', '')
+                if timestamp:
+                    print(f"缓存时间: {timestamp}")
+                self._load_cache_indexes()
+        except Exception as e:
+            print(f"加载缓存失败: {e}")
+            self.file_cache = []
+            self.corpus = None
+            self.pinyin_column = None
+            self.folded_column = None
+    
+    def _new_corpus(self):
+        """创建空的C端语料库，搜索库不可用时返回None"""
+        return SearchCorpus(self.lib) if self.is_available() else None
+    
+    @staticmethod
+    def _derived_column_specs():
+        """
+        文件缓存派生列的描述列表：(属性名, 列类, 缓存文件中的键, 是否可计算, 名称)
+        """
+        return [
+            ('pinyin_column', PinyinColumn, 'pinyin', PINYIN_AVAILABLE, "拼音列"),
+            ('folded_column', FoldedColumn, 'folded', True, "折叠列"),
+        ]
+    
+    def _load_derived_column(self, column_cls, enabled, label, files, saved):
+        """
+        建立与加载的文件缓存对应的派生列：优先使用缓存文件中保存的派生文本，
+        没有保存时（旧版本的缓存文件）为全部路径计算一次
+        """
+        if not self.is_available():
+            return None
+        owners = saved['owners'] if saved else None
+        if owners is not None and len(owners) == len(saved['names']) and (not owners or owners[-1] < len(files)):
+            column = column_cls(self.lib)
+            column.append(owners, saved['names'])
+            return column
+        if not enabled:
+            return None
+        start_time = time.time()
+        column = column_cls(self.lib)
+        column.append(*column_cls.derive(files))
+        print(f"{label}已建立，共 {len(column)} 行，耗时: {time.time() - start_time:.3f}秒")
+        return column
+    
+    def _start_cache_scan(self):
+        """
+        开始一次全新的扫描：以空列表和空语料库替换缓存，旧缓存的索引失效
+        
+        Returns:
+            (files, corpus)：新的文件列表与语料库，扫描结果通过_append_to_cache追加
+        """
+        files = []
+        corpus = self._new_corpus()
+        columns = {attr: column_cls(self.lib) if corpus is not None and enabled else None
+                   for attr, column_cls, _, enabled, _ in self._derived_column_specs()}
+        with self.scan_lock:
+            self.is_scanning = True
+            self.file_cache = files
+            self.corpus = corpus
+            for attr, column in columns.items():
+                setattr(self, attr, column)
+            self.cache_generation += 1
+            self._invalidate_cache_indexes()  # 缓存被替换，索引失效
+        return files, corpus
+    
+    def _append_to_cache(self, files, corpus, batch):
+        """
+        将一批扫描结果同步追加到文件列表与对应的语料库，派生文本追加到各派生列（编码与派生在锁外完成）
+        """
+        data = SearchCorpus.encode(batch) if corpus is not None else None
+        derived = [(attr, column_cls.derive(batch)) for attr, column_cls, _, enabled, _ in self._derived_column_specs()
+                   if corpus is not None and enabled]
+        with self.scan_lock:
+            base = len(files)
+            files.extend(batch)
+            if corpus is not None:
+                corpus.append(batch, data)
+            if files is self.file_cache:
+                for attr, (rows, names) in derived:
+                    column = getattr(self, attr)
+                    if names and column is not None:
+                        column.append([base + row for row in rows], names)
+                self.cache_generation += 1
+    
+    def _cache_index_specs(self):
+        """
+        缓存索引的描述列表：(属性名, 索引类, 索引文件路径, 是否启用, 名称)
+        """
+        return [
+            ('trigram_index', TrigramIndex, self.trigram_index_file, self.trigram_index_enabled, "三元组索引"),
+            ('fuzzy_index', FuzzyIndex, self.fuzzy_index_file, self.fuzzy_index_enabled, "模糊搜索索引"),
+        ]
+    
+    def _saved_cache_stamp(self):
+        """
+        与当前file_cache内容一致的cache_file的保存时间，缓存尚未保存时为None（调用方需持有scan_lock）
+        
+        磁盘上的索引以此标记所对应的缓存
+        """
+        return self.cache_timestamp if self.saved_cache_generation == self.cache_generation else None
+    
+    def _invalidate_cache_indexes(self):
+        """
+        file_cache被替换后丢弃与旧缓存对应的索引（调用方需持有scan_lock）
+        """
+        self.trigram_index = None
+        self.fuzzy_index = None
+        self.suffix_array = None
+    
+    def _build_cache_indexes(self, names=None):
+        """
+        为当前文件缓存构建索引并保存到磁盘
+        
+        Args:
+            names: 要构建的索引属性名列表，None表示所有已启用的索引
+        """
+        if not self.is_available():
+            return
+        with self.scan_lock:
+            if not self.file_cache or self.corpus is None:
+                return
+            files = self.file_cache
+            # 构建期间缓存可能被并发的扫描替换，直接持有语料库，在其快照上构建
+            corpus = self.corpus
+            stamp = self._saved_cache_stamp()
+        
+        for attr, index_cls, path, enabled, label in self._cache_index_specs():
+            if not enabled or (names is not None and attr not in names):
+                continue
+            try:
+                start_time = time.time()
+                with corpus.items_snapshot() as (c_items, count):
+                    index = index_cls.build(self.lib, c_items, count)
+                if stamp is not None:
+                    # 缓存尚未保存时不保存索引，以免与磁盘上的旧缓存对应
+                    index.save(path, stamp)
+                with self.scan_lock:
+                    if self.file_cache is files:
+                        setattr(self, attr, index)
+                print(f"{label}已构建，共 {count} 项，耗时: {time.time() - start_time:.3f}秒")
+            except Exception as e:
+                print(f"构建{label}失败: {e}")
+        
+        if names is None:
+            self._build_corpus_order(files)
+    
+    def _build_corpus_order(self, files):
+        """
+        为与files对应的语料库构建路径与文件名排序（目录前缀过滤与前缀补全据此二分查找）
+        """
+        with self.scan_lock:
+            corpus = self.corpus if self.file_cache is files else None
+        if corpus is not None:
+            start_time = time.time()
+            corpus.build_path_order()
+            print(f"路径与文件名排序已构建，共 {len(files)} 项，耗时: {time.time() - start_time:.3f}秒")
+    
+    def _start_corpus_order_builder(self, files):
+        """在后台线程中为与files对应的语料库构建排序，已有构建线程在运行时不再启动"""
+        thread = self._corpus_order_thread
+        if thread is not None and thread.is_alive():
+            return
+        thread = threading.Thread(target=self._build_corpus_order, args=(files,),
+                                  name="CorpusOrderBuilder", daemon=True)
+        self._corpus_order_thread = thread
+        thread.start()
+    
+    def _load_cache_indexes(self):
+        """
+        从磁盘加载缓存索引，索引缺失或与缓存不一致时重新构建
+        """
+        if not self.is_available() or not self.file_cache:
+            return
+        with self.scan_lock:
+            stamp = self._saved_cache_stamp()
+        stale = []
+        for attr, index_cls, path, enabled, label in self._cache_index_specs():
+            if not enabled:
+                continue
+            index = None
+            try:
+                if os.path.exists(path):
+                    index = index_cls.load(self.lib, path, stamp)
+            except Exception as e:
+                print(f"加载{label}失败: {e}")
             
-            with self.scan_lock:
-                self.is_scanning = False
-            return len(self.file_cache)
-        except Exception as e:
-            print(f"预扫描失败: {e}")
-            with self.scan_lock:
-                self.is_scanning = False
-            return 0
+            if index is not None and index.item_count == len(self.file_cache):
+                setattr(self, attr, index)
+                print(f"已从缓存加载{label}，共 {index.item_count} 项")
+            else:
+                print(f"{label}缺失或已过期，重新构建")
+                stale.append(attr)
+        if stale:
+            self._build_cache_indexes(stale)
+        # 排序不保存到磁盘，在后台构建，以免第一次补全时等待排序
+        self._start_corpus_order_builder(self.file_cache)
     
-    def _save_cache(self):
+    def _get_suffix_array(self):
         """
-        将文件缓存保存为二进制文件
+        返回当前文件缓存对应的后缀数组，首次使用时从磁盘加载，缺失或过期时构建并保存
         """
+        if not self.is_available():
+            return None
+        with self.scan_lock:
+            if self.suffix_array is not None or not self.file_cache or self.corpus is None:
+                return self.suffix_array
+            files = self.file_cache
+            corpus = self.corpus
+            stamp = self._saved_cache_stamp()
+        
+        sa = None
         try:
-            cache_data = {
-                'timestamp': datetime.now().isoformat(),
-                'file_count': len(self.file_cache),
-                'files': self.file_cache
-            }
-            # 使用pickle保存为二进制文件
-            with open(self.cache_file, 'wb') as f:
-                pickle.dump(cache_data, f, protocol=pickle.HIGHEST_PROTOCOL)
-            print(f"缓存已保存到 {self.cache_file}")
+            if os.path.exists(self.suffix_array_file):
+                sa = SuffixArrayIndex.load(self.lib, self.suffix_array_file, stamp)
+                if sa is not None and sa.item_count != len(files):
+                    sa = None
+            if sa is None:
+                start_time = time.time()
+                with corpus.items_snapshot() as (c_items, count):
+                    sa = SuffixArrayIndex.build(self.lib, c_items, count)
+                if sa is None:
+                    print("缓存文本过大，无法构建后缀数组")
+                    return None
+                if stamp is not None:
+                    sa.save(self.suffix_array_file, stamp)
+                print(f"后缀数组已构建，共 {count} 项，耗时: {time.time() - start_time:.3f}秒")
         except Exception as e:
-            print(f"保存缓存失败: {e}")
+            print(f"加载后缀数组失败: {e}")
+            return None
+        
+        with self.scan_lock:
+            if self.file_cache is files:
+                self.suffix_array = sa
+        return sa
     
-    def _load_cache(self):
+    def _history_snapshot(self):
         """
-        从二进制文件加载文件缓存
+        搜索历史日志压缩时使用的有效记录
+        
+        只有结果对应的文件缓存已保存到cache_file时才有有效记录，加载时据其时间戳判断索引是否仍然有效
+        
+        Returns:
+            [(cache_timestamp, key, indices)...]，按最近最少使用到最近使用排列
         """
-        try:
-            if os.path.exists(self.cache_file):
-                # 使用pickle加载二进制文件
-                with open(self.cache_file, 'rb') as f:
-                    cache_data = pickle.load(f)
-                self.file_cache = cache_data.get('files', [])
-                print(f"已从缓存加载 {len(self.file_cache)} 个文件")
-                # 打印缓存时间
-                timestamp = cache_data.get('timestamp', '')
-                if timestamp:
-                    print(f"缓存时间: {timestamp}")
-        except Exception as e:
-            print(f"加载缓存失败: {e}")
-            self.file_cache = []
+        self._ensure_history_loaded()
+        generation, entries = self.result_cache.items()
+        with self.scan_lock:
+            if generation is None or generation != self.saved_cache_generation:
+                return []
+            cache_timestamp = self.cache_timestamp
+        return [(cache_timestamp, key, indices) for key, indices in entries]
     
-    def _save_search_history(self):
+    def _ensure_history_loaded(self):
         """
-        将搜索历史保存为二进制文件
+        首次查询时回放搜索历史日志（与已加载的文件缓存不一致的记录被忽略）
         """
-        try:
-            history_data = {
-                'timestamp': datetime.datetime.now().isoformat(),
-                'history_count': len(self.search_history),
-                'history': self.search_history
-            }
-            # 使用pickle保存为二进制文件
-            with open(self.history_file, 'wb') as f:
-                pickle.dump(history_data, f, protocol=pickle.HIGHEST_PROTOCOL)
-            print(f"搜索历史已保存到 {self.history_file}")
-        except Exception as e:
-            print(f"保存搜索历史失败: {e}")
+        if self._history_loaded:
+            return
+        with self._history_load_lock:
+            if self._history_loaded:
+                return
+            self._history_loaded = True
+            try:
+                records = self.history_journal.replay()
+                with self.scan_lock:
+                    generation = self.saved_cache_generation
+                    cache_timestamp = self.cache_timestamp
+                    file_count = len(self.file_cache)
+                if generation is None:
+                    return
+                loaded = 0
+                for record_timestamp, key, indices in records:
+                    if record_timestamp != cache_timestamp:
+                        continue
+                    if not indices or (min(indices) >= 0 and max(indices) < file_count):
+                        self.result_cache.put(key, generation, indices)
+                        loaded += 1
+                print(f"已从日志回放 {loaded} 条搜索历史（共 {len(records)} 条记录）")
+            except Exception as e:
+                print(f"加载搜索历史失败: {e}")
+                self.result_cache.clear()
     
-    def _load_search_history(self):
+    def _cached_results(self, cache_key, lazy=False):
         """
-        从二进制文件加载搜索历史
+        在查询结果缓存中查找当前文件缓存下的结果
+        
+        Args:
+            cache_key: 查询键
+            lazy: 为True时返回ResultView（与缓存共享索引数组），否则返回路径列表
+        
+        Returns:
+            匹配的文件路径（见lazy），未命中时返回None
         """
-        try:
-            if os.path.exists(self.history_file):
-                # 使用pickle加载二进制文件
-                with open(self.history_file, 'rb') as f:
-                    history_data = pickle.load(f)
-                self.search_history = history_data.get('history', {})
-                print(f"已从缓存加载 {len(self.search_history)} 条搜索历史")
-                # 打印缓存时间
-                timestamp = history_data.get('timestamp', '')
-                if timestamp:
-                    print(f"历史缓存时间: {timestamp}")
-        except Exception as e:
-            print(f"加载搜索历史失败: {e}")
-            self.search_history = {}
+        self._ensure_history_loaded()
+        with self.scan_lock:
+            files = self.file_cache
+            generation = self.cache_generation
+        indices = self.result_cache.get(cache_key, generation)
+        if indices is None:
+            return None
+        print(f"使用查询结果缓存: {cache_key[0]}")
+        return self._result_paths(files, indices, lazy)
+    
+    @staticmethod
+    def _result_paths(files, indices, lazy):
+        """按索引取出结果路径：lazy为True时返回按需取出路径的ResultView，否则返回路径列表"""
+        view = ResultView(files, indices)
+        return view if lazy else view.tolist()
+    
+    def _store_results(self, cache_key, generation, indices):
+        """
+        记录查询结果，generation为None（结果不对应文件缓存）时不记录
+        
+        文件缓存已保存时把结果追加到搜索历史日志，由写入线程完成，不阻塞查询
+        """
+        if generation is None:
+            return
+        self._ensure_history_loaded()
+        if not isinstance(indices, array) or indices.typecode != 'i':
+            indices = array('i', indices)
+        self.result_cache.put(cache_key, generation, indices)
+        with self.scan_lock:
+            if generation != self.saved_cache_generation:
+                return
+            cache_timestamp = self.cache_timestamp
+        self.history_journal.append(cache_timestamp, cache_key, indices)
     
-    def search_files(self, directory=None, keyword=None, depth=2, max_distance=2, use_fuzzy=False, include_extensions=None):
+    def search_files(self, directory=None, keyword=None, depth=2, max_distance=2, use_fuzzy=False, include_extensions=None, engine=None, ignore_case=False, limit=None, ranked=False, scope='path', cancel_token=None, mode='substring', lazy=False):
         """
         搜索文件路径
         
@@ -290,65 +1413,866 @@ class SearchWrapper:
             max_distance: 模糊搜索的最大编辑距离
             use_fuzzy: 是否使用模糊搜索
             include_extensions: 允许的文件扩展名列表，None表示所有文件
+            engine: 缓存子串搜索引擎，'linear'、'trigram' 或 'suffix_array'，None表示自动选择
+            ignore_case: 是否忽略大小写（后缀数组区分大小写，此时回退到线性搜索）；折叠列可用时子串搜索按完整的
+                Unicode折叠匹配，同时忽略重音与全角/半角，macOS的NFD路径也能匹配
+            limit: 最多返回的结果数，None表示不限
+            ranked: 是否按相关度排序（关键词字符按顺序出现在路径中即匹配，忽略大小写，
+                文件名匹配、单词边界与连续匹配得分更高），此时忽略use_fuzzy、engine与ignore_case
+            scope: 匹配范围，'path'匹配整个路径，'basename'只匹配文件名（关键词含路径分隔符时按'path'处理）；
+                缓存模糊搜索总是按文件名匹配
+            cancel_token: CancelToken，取消后正在进行的C端搜索与扫描尽快返回
+            mode: 关键词语法，见SEARCH_MODES；'regex'与'glob'（见CompiledRegex）忽略use_fuzzy、engine与ranked
+            lazy: 为True时返回ResultView（按索引引用文件缓存，访问时才取出路径），否则返回路径列表
             
         Returns:
-            匹配的文件路径列表
+            匹配的文件路径列表或ResultView（ranked为True时按得分从高到低排列）
+        
+        Raises:
+            SearchCancelled: cancel_token被取消（部分结果不记入搜索历史）
+            ValueError: 正则表达式或通配符模式无效
         """
         # 如果没有指定关键词，返回空结果
         if not keyword:
-            return []
+            return self._result_paths([], (), lazy)
+        if engine not in SEARCH_ENGINES:
+            raise ValueError(f"未知的搜索引擎: {engine}")
+        if mode not in SEARCH_MODES:
+            raise ValueError(f"未知的搜索模式: {mode}")
+        pattern_mode = mode != 'substring'
+        if pattern_mode:
+            use_fuzzy = ranked = False
+            engine = None
+        # 正则表达式中的'\\'多为转义，不据此改变匹配范围
+        scope = self._effective_scope(scope, '' if mode == 'regex' else keyword)
+        # 模糊搜索总是按文件名计算编辑距离（与BK树索引一致），结果不取决于索引是否可用
+        basename_only = scope == 'basename' or use_fuzzy
         
-        # 检查搜索历史
-        history_key = f"{keyword}_{use_fuzzy}_{max_distance}"
-        if history_key in self.search_history:
-            print(f"使用搜索历史结果: {history_key}")
-            return self.search_history[history_key]
+        # 检查查询结果缓存
+        cache_key = self._result_cache_key(keyword, directory, depth, include_extensions, use_fuzzy, max_distance,
+                                           engine, ignore_case, ranked, limit, scope, mode, self.frecency.version)
+        cached = self._cached_results(cache_key, lazy)
+        if cached is not None:
+            return cached
         
         files = []
+        corpus = None
+        pinyin_column = None
+        folded_column = None
+        trigram_index = None
+        fuzzy_index = None
+        generation = None  # files对应的缓存代数，None表示files与缓存不一致（不使用增量搜索）
+        filter_candidates = None  # 缓存中满足目录与扩展名条件的项（升序），None表示不过滤
         
-        # 如果指定了目录，直接搜索该目录
-        if directory:
-            files = self.scan_files(directory, max_depth=depth, allowed_extensions=include_extensions)
+        # 优先使用缓存（文件列表只会被追加或整体替换，直接引用而不复制）
+        with self.scan_lock:
+            if self.file_cache:
+                files = self.file_cache
+                corpus = self.corpus
+                pinyin_column = self.pinyin_column
+                folded_column = self.folded_column
+                generation = self.cache_generation
+                trigram_index = self.trigram_index
+                fuzzy_index = self.fuzzy_index
+        if files and corpus is not None and (directory or include_extensions):
+            # 目录与扩展名条件直接在缓存上过滤，不访问磁盘
+            filter_candidates = self._cache_filter(corpus, directory, include_extensions)
+        from_cache = bool(files) and (not directory or bool(filter_candidates))
+        
+        if from_cache:
+            print(f"使用缓存文件，共 {len(files)} 个文件" +
+                  (f"，其中 {len(filter_candidates)} 个满足目录与扩展名条件" if filter_candidates is not None else ""))
+        elif directory:
+            # 缓存中没有该目录下的文件，扫描该目录
+            files = self.scan_files(directory, max_depth=depth, allowed_extensions=include_extensions, cancel_token=cancel_token)
+            corpus = pinyin_column = folded_column = None
+            trigram_index = fuzzy_index = generation = filter_candidates = None
+            with self.scan_lock:
+                # scan_files以本次扫描结果替换了缓存，语料库与files一致
+                if len(self.file_cache) == len(files):
+                    files = self.file_cache
+                    corpus = self.corpus
+                    pinyin_column = self.pinyin_column
+                    folded_column = self.folded_column
+                    generation = self.cache_generation
         else:
-            # 否则使用缓存
+            print("缓存为空，开始扫描")
+            self.scan_files("C:/" if os.name == 'nt' else "/", max_depth=depth, allowed_extensions=include_extensions,
+                            cancel_token=cancel_token)
             with self.scan_lock:
-                if not self.file_cache:
-                    print("缓存为空，开始扫描")
-                    files = self.scan_files("C:/" if os.name == 'nt' else "/", max_depth=depth, allowed_extensions=include_extensions)
-                else:
-                    print(f"使用缓存文件，共 {len(self.file_cache)} 个文件")
-                    files = self.file_cache.copy()
+                files = self.file_cache
+                corpus = self.corpus
+                pinyin_column = self.pinyin_column
+                folded_column = self.folded_column
+                generation = self.cache_generation
         
         if not files:
-            return []
+            return self._result_paths(files, (), lazy)
         
-        # 使用现有的搜索功能搜索文件路径
+        # 缓存搜索按引擎选择索引，关键词过短或索引不可用时回退到线性搜索
         start_time = time.time()
-        indices = self.search(files, keyword, use_fuzzy=use_fuzzy, max_distance=max_distance)
+        indices = None
+        # 关键词是最近某次查询关键词的扩展时，只需在那次的匹配项中搜索（指定引擎时不使用，便于对比性能）
+        # 忽略大小写的子串搜索按完整的Unicode折叠匹配：在语料库上搜索折叠后的关键词，再并入折叠列的匹配项
+        unicode_fold = ignore_case and folded_column is not None and not pattern_mode and not use_fuzzy and not ranked
+        match_keyword = _fold_unicode(keyword) if unicode_fold else keyword
+        refine_mode = (self._refine_mode(use_fuzzy, ignore_case, ranked, basename_only, unicode_fold)
+                       if corpus is not None and engine is None and not pattern_mode else None)
+        if refine_mode and filter_candidates is not None:
+            # 过滤条件（cache_key中的目录与扩展名）不同的查询匹配集不同，不能互为候选
+            refine_mode += f"@{cache_key[1]}|{cache_key[3]}"
+        candidates = self._find_refine_candidates(generation, refine_mode, keyword) if refine_mode else None
+        if pattern_mode:
+            # 目录与扩展名条件作为候选集传入，不再单独过滤
+            indices = self._pattern_search(files, corpus, keyword, mode, ignore_case, basename_only, cancel_token,
+                                           filter_candidates, trigram_index if from_cache else None)
+        elif ranked:
+            # 相关度排序只在语料库上进行，不经过索引
+            indices, matches = self._ranked_search(files, corpus, keyword, limit,
+                                                   candidates if candidates is not None else filter_candidates,
+                                                   cancel_token, basename_only)
+            if refine_mode and matches is not None:
+                self._push_refine_entry(generation, refine_mode, keyword, matches)
+        elif candidates is not None:
+            indices = corpus.search(match_keyword, ignore_case=ignore_case, num_threads=self.search_threads, candidates=candidates,
+                                    cancel_token=cancel_token, basename_only=basename_only)
+        elif from_cache and use_fuzzy:
+            # 缓存模糊搜索按文件名匹配，由BK树索引完成
+            if fuzzy_index is not None and fuzzy_index.item_count == len(files):
+                indices = fuzzy_index.search(keyword, max_distance)
+        elif from_cache:
+            if engine == 'suffix_array' and not ignore_case:
+                suffix_array = self._get_suffix_array()
+                if suffix_array is not None and suffix_array.item_count == len(files):
+                    indices = suffix_array.search(keyword)
+            elif engine in (None, 'trigram') and trigram_index is not None:
+                indices = trigram_index.search(corpus, len(files), match_keyword, ignore_case)
+            if indices is not None and basename_only:
+                # 索引按整个路径匹配，结果包含所有文件名匹配项，再只在这些项的文件名中校验
+                indices = corpus.search(match_keyword, ignore_case=ignore_case, num_threads=self.search_threads,
+                                        candidates=array('i', sorted(indices)), cancel_token=cancel_token,
+                                        basename_only=True)
+        if indices is not None and candidates is None and filter_candidates is not None and not ranked and not pattern_mode:
+            # 索引结果再按目录与扩展名条件过滤
+            indices = self._cache_filter(corpus, directory, include_extensions, array('i', sorted(indices)))
+        if indices is None:
+            indices = self._scan_search(files, corpus, match_keyword, use_fuzzy, max_distance, ignore_case, basename_only,
+                                        cancel_token, filter_candidates)
+        _check_cancelled(cancel_token)
+        if refine_mode and not ranked:
+            # 子串搜索的结果是升序的完整匹配集，在截取limit之前记录
+            self._push_refine_entry(generation, refine_mode, keyword, array('i', indices))
+        if unicode_fold and len(folded_column):
+            # 折叠后与原路径不同的项另在折叠列中匹配（目录与扩展名条件同样适用）
+            folded_matches = folded_column.search(match_keyword, num_threads=self.search_threads,
+                                                  candidates=filter_candidates, cancel_token=cancel_token,
+                                                  basename_only=basename_only)
+            indices = sorted(set(indices).union(folded_matches))
+        if not pattern_mode and not use_fuzzy:
+            # 关键词像拼音时并入拼音列的匹配项（拼音列与files一致，可直接映射）
+            pinyin_matches = self._pinyin_search(pinyin_column, keyword, filter_candidates, cancel_token)
+            if pinyin_matches is not None:
+                indices = self._merge_pinyin_matches(indices, pinyin_matches, ranked, limit, files, keyword)
         
-        # 返回匹配的文件路径
-        results = [files[i] for i in indices]
+        if limit and not ranked:
+            indices = indices[:limit]
         
         # 如果使用缓存搜索且没有找到结果，尝试扫描硬盘实时搜索
-        if not results and not directory:
+        if not indices and not directory:
             print("缓存中未找到结果，开始扫描硬盘实时搜索...")
-            realtime_files = self.scan_files("C:/" if os.name == 'nt' else "/", max_depth=depth, allowed_extensions=include_extensions)
-            realtime_indices = self.search(realtime_files, keyword, use_fuzzy=use_fuzzy, max_distance=max_distance)
-            results = [realtime_files[i] for i in realtime_indices]
-            
-            # 更新缓存
+            self.scan_files("C:/" if os.name == 'nt' else "/", max_depth=depth, allowed_extensions=include_extensions,
+                            cancel_token=cancel_token)
             with self.scan_lock:
-                self.file_cache = realtime_files
-                self._save_cache()
+                realtime_files = self.file_cache
+                realtime_corpus = self.corpus
+                generation = self.cache_generation
+            if pattern_mode:
+                realtime_indices = self._pattern_search(realtime_files, realtime_corpus, keyword, mode, ignore_case,
+                                                        basename_only, cancel_token)
+            elif ranked:
+                realtime_indices, _ = self._ranked_search(realtime_files, realtime_corpus, keyword, limit,
+                                                          cancel_token=cancel_token, basename_only=basename_only)
+            else:
+                realtime_indices = self._scan_search(realtime_files, realtime_corpus, keyword, use_fuzzy, max_distance,
+                                                     ignore_case, basename_only, cancel_token)
+            if limit and not ranked:
+                realtime_indices = realtime_indices[:limit]
+            files = realtime_files
+            indices = realtime_indices
+            
+            # scan_files已替换缓存，保存并重建索引
+            self._save_cache()
+            self._build_cache_indexes()
         
         search_time = time.time() - start_time
         
-        # 保存到搜索历史
-        self.search_history[history_key] = results
-        self._save_search_history()
+        # 记录到查询结果缓存（只保存索引，返回的ResultView与之共享同一个索引数组）
+        results = ResultView(files, indices)
+        self._store_results(cache_key, generation, results.indices)
         
         print(f"搜索完成，耗时: {search_time:.3f}秒，找到 {len(results)} 个文件")
-        return results
+        return results if lazy else results.tolist()
+    
+    def _scan_search(self, files, corpus, keyword, use_fuzzy, max_distance, ignore_case, basename_only, cancel_token, candidates=None):
+        """
+        逐项扫描搜索文件列表：语料库可用时在C端语料库上搜索（candidates不为None时只搜索这些项），
+        否则搜索文件列表
+        
+        Returns:
+            匹配项的索引列表（升序）
+        """
+        if corpus is not None:
+            return corpus.search(keyword, use_fuzzy=use_fuzzy, max_distance=max_distance, ignore_case=ignore_case,
+                                 num_threads=self.search_threads, candidates=candidates, cancel_token=cancel_token,
+                                 basename_only=basename_only)
+        items = [_path_basename(path) for path in files] if basename_only else files
+        return self.search(items, keyword, use_fuzzy=use_fuzzy, max_distance=max_distance, ignore_case=ignore_case,
+                           cancel_token=cancel_token)
+    
+    def _pattern_search(self, files, corpus, pattern, mode, ignore_case, basename_only, cancel_token, candidates=None, trigram_index=None):
+        """
+        按正则表达式（mode为'regex'）或通配符模式（mode为'glob'）搜索文件列表
+        
+        语料库可用时由C端DFA匹配，必需字面量（通配符模式中最长的字面片段）不少于3个字节且有三元组索引时
+        先用索引缩小候选范围；否则使用re模块逐项匹配
+        
+        Returns:
+            匹配项的索引列表（升序）
+        
+        Raises:
+            ValueError: 正则表达式或通配符模式无效
+        """
+        glob = mode == 'glob'
+        if corpus is None:
+            flags = re.IGNORECASE if ignore_case else 0
+            try:
+                matcher = (re.compile(fnmatch.translate(pattern), flags).match if glob
+                           else re.compile(pattern, flags).search)
+            except re.error as e:
+                raise ValueError(f"无效的正则表达式: {e}") from None
+            items = [_path_basename(path) for path in files] if basename_only else files
+            indices = range(len(items)) if candidates is None else candidates
+            return [i for i in indices if matcher(items[i])]
+        regex = CompiledRegex(self.lib, pattern, ignore_case, glob)
+        try:
+            literal = regex.literal
+            if trigram_index is not None and len(literal.encode('utf-8')) >= 3:
+                indexed = trigram_index.search(corpus, len(files), literal, ignore_case)
+                if indexed is not None:
+                    indexed = array('i', sorted(indexed))
+                    candidates = indexed if candidates is None else array('i', sorted(set(candidates).intersection(indexed)))
+            return corpus.regex_search(regex, num_threads=self.search_threads, candidates=candidates,
+                                       cancel_token=cancel_token, basename_only=basename_only)
+        finally:
+            regex.close()
+    
+    def _pinyin_search(self, pinyin_column, keyword, candidates=None, cancel_token=None):
+        """
+        在拼音列中搜索关键词
+        
+        Returns:
+            PinyinColumn.search的结果；没有拼音列或关键词不像拼音时返回None
+        """
+        if pinyin_column is None or not len(pinyin_column) or not is_pinyin_keyword(keyword):
+            return None
+        return pinyin_column.search(keyword, num_threads=self.search_threads, candidates=candidates,
+                                    cancel_token=cancel_token)
+    
+    @staticmethod
+    def _merge_pinyin_matches(indices, pinyin_matches, ranked, limit, files=None, keyword=None):
+        """
+        把拼音列的匹配项并入结果
+        
+        非排序结果取并集（升序）；排序结果（需提供files与keyword）依次为：文件名以关键词开头的原结果、
+        转写以关键词开头的拼音匹配项、其余原结果、其余拼音匹配项
+        """
+        matched, prefixed = pinyin_matches
+        if not ranked:
+            return sorted(set(indices).union(matched))
+        folded = _fold_ascii(keyword)
+        merged = [i for i in indices if _fold_ascii(_path_basename(files[i])).startswith(folded)]
+        seen = set(merged)
+        merged.extend(i for i in matched if i in prefixed and i not in seen)
+        seen.update(merged)
+        merged.extend(i for i in indices if i not in seen)
+        seen.update(indices)
+        merged.extend(i for i in matched if i not in seen)
+        return merged[:limit] if limit else merged
+    
+    @staticmethod
+    def _cache_filter(corpus, directory, include_extensions, candidates=None):
+        """
+        在语料库上按目录与扩展名过滤
+        
+        目录按路径前缀（目录加路径分隔符）匹配，Windows上'\\'与'/'两种分隔符都接受
+        
+        Returns:
+            满足条件的项的索引（升序的array('i')）
+        """
+        extensions = include_extensions or None
+        if not directory:
+            return corpus.filter(extensions=extensions, candidates=candidates)
+        base = os.path.abspath(directory).rstrip('/\\')
+        matched = None
+        for separator in (('\\', '/') if os.name == 'nt' else ('/',)):
+            indices = corpus.filter(prefix=base + separator, extensions=extensions, candidates=candidates)
+            matched = indices if matched is None else array('i', sorted(set(matched).union(indices)))
+        return matched
+    
+    @staticmethod
+    def _effective_scope(scope, keyword):
+        """
+        校验匹配范围；关键词含路径分隔符时文件名中不可能匹配，改为匹配整个路径
+        
+        Raises:
+            ValueError: 未知的匹配范围
+        """
+        if scope not in SEARCH_SCOPES:
+            raise ValueError(f"未知的搜索范围: {scope}")
+        if scope == 'basename' and ('/' in keyword or '\\' in keyword):
+            return 'path'
+        return scope
+    
+    def search_files_stream(self, keyword, callback, directory=None, depth=2, max_distance=2, use_fuzzy=False, include_extensions=None, ignore_case=False, limit=None, ranked=False, batch_size=256, scope='path', cancel_token=None, lazy=False):
+        """
+        流式搜索文件路径：匹配的文件按批交给callback，首批结果不必等待整个缓存扫描完成
+        
+        Args:
+            keyword: 搜索关键词
+            callback: 回调函数，参数为一批文件路径的列表，返回False时停止搜索
+            directory: 要搜索的目录路径（None表示使用缓存）
+            depth: 搜索深度
+            max_distance: 模糊搜索的最大编辑距离
+            use_fuzzy: 是否使用模糊搜索（与search_files一致按文件名计算编辑距离，不使用BK树索引）
+            include_extensions: 允许的文件扩展名列表，None表示所有文件
+            ignore_case: 是否忽略大小写（折叠列可用时按完整的Unicode折叠匹配，同时忽略重音与全角/半角）
+            limit: 最多返回的结果数，None表示不限
+            ranked: 是否按相关度排序；此时先分批交付最多limit个匹配项作为初步结果，
+                扫描结束后返回按得分排序的前limit项
+            batch_size: 每批的文件数
+            scope: 匹配范围，'path'匹配整个路径，'basename'只匹配文件名（关键词含路径分隔符时按'path'处理）
+            cancel_token: CancelToken，取消后正在进行的C端搜索与扫描尽快返回
+            lazy: 为True时返回ResultView（回调收到的每批结果仍是路径列表），否则返回路径列表
+            
+        Returns:
+            匹配的文件路径列表或ResultView（ranked为True时为按得分排序的结果，否则为已交付的全部结果）；
+            被callback停止时返回已交付的部分结果，且不记入搜索历史
+        
+        Raises:
+            SearchCancelled: cancel_token被取消（部分结果不记入搜索历史）
+        """
+        if not keyword:
+            return self._result_paths([], (), lazy)
+        
+        scope = self._effective_scope(scope, keyword)
+        # 模糊搜索与search_files一致，总是按文件名计算编辑距离
+        basename_only = scope == 'basename' or use_fuzzy
+        cache_key = self._result_cache_key(keyword, directory, depth, include_extensions, use_fuzzy, max_distance,
+                                           None, ignore_case, ranked, limit, scope, frecency_version=self.frecency.version)
+        results = self._cached_results(cache_key, lazy)
+        if results is not None:
+            self._deliver_in_batches(results, callback, batch_size)
+            return results
+        
+        files = []
+        corpus = None
+        pinyin_column = None
+        folded_column = None
+        generation = None
+        with self.scan_lock:
+            if self.file_cache:
+                files = self.file_cache
+                corpus = self.corpus
+                pinyin_column = self.pinyin_column
+                folded_column = self.folded_column
+                generation = self.cache_generation
+        
+        if corpus is None or directory or include_extensions:
+            # 缓存为空或C语料库不可用时一次性搜索，再按批交付；
+            # 目录与扩展名条件由search_files在缓存上过滤（缓存中没有该目录时扫描该目录）
+            results = self.search_files(directory, keyword, depth, max_distance, use_fuzzy, include_extensions,
+                                        None, ignore_case, limit, ranked, scope, cancel_token, lazy=lazy)
+            self._deliver_in_batches(results, callback, batch_size)
+            return results
+        
+        start_time = time.time()
+        delivered_indices = array('i')
+        stopped = []
+        
+        def on_batch(indices):
+            paths = [files[i] for i in indices]
+            delivered_indices.extend(indices)
+            if callback(paths) is False:
+                stopped.append(True)
+                return False
+            return True
+        
+        if ranked:
+            boosts, max_boost = self._frecency_boosts(files, corpus)
+            indices = corpus.search_stream(keyword, on_batch, batch_size=batch_size, num_threads=self.search_threads,
+                                           ranked=True, limit=limit or 0, cancel_token=cancel_token,
+                                           basename_only=basename_only, boosts=boosts, max_boost=max_boost)
+            pinyin_matches = self._pinyin_search(pinyin_column, keyword, cancel_token=cancel_token)
+            if pinyin_matches is not None:
+                indices = self._merge_pinyin_matches(indices, pinyin_matches, True, limit, files, keyword)
+        else:
+            indices = delivered_indices
+            unicode_fold = ignore_case and folded_column is not None and not use_fuzzy
+            match_keyword = _fold_unicode(keyword) if unicode_fold else keyword
+            corpus.search_stream(match_keyword, on_batch, batch_size=batch_size, use_fuzzy=use_fuzzy,
+                                 max_distance=max_distance, ignore_case=ignore_case, num_threads=self.search_threads,
+                                 limit=limit or 0, cancel_token=cancel_token, basename_only=basename_only)
+            refine_mode = self._refine_mode(use_fuzzy, ignore_case, ranked, basename_only, unicode_fold)
+            if refine_mode and not stopped and not limit:
+                # 完整交付的匹配项可作为扩展关键词的候选集
+                self._push_refine_entry(generation, refine_mode, keyword, array('i', delivered_indices))
+            extra = set()
+            if unicode_fold and len(folded_column) and not stopped:
+                extra.update(folded_column.search(match_keyword, num_threads=self.search_threads,
+                                                  cancel_token=cancel_token, basename_only=basename_only))
+            pinyin_matches = (self._pinyin_search(pinyin_column, keyword, cancel_token=cancel_token)
+                              if not use_fuzzy and not stopped else None)
+            if pinyin_matches is not None:
+                extra.update(pinyin_matches[0])
+            if extra:
+                # 折叠列与拼音列中另外匹配的项作为最后一批交付
+                extra = sorted(extra.difference(delivered_indices))
+                if limit:
+                    extra = extra[:max(limit - len(delivered_indices), 0)]
+                if extra:
+                    on_batch(extra)
+        
+        if not indices and not stopped and not directory:
+            # 缓存中没有结果时与search_files一致，扫描硬盘实时搜索
+            results = self.search_files(None, keyword, depth, max_distance, use_fuzzy, include_extensions,
+                                        None, ignore_case, limit, ranked, scope, cancel_token, lazy=lazy)
+            self._deliver_in_batches(results, callback, batch_size)
+            return results
+        
+        search_time = time.time() - start_time
+        results = ResultView(files, indices)
+        if not stopped:
+            self._store_results(cache_key, generation, results.indices)
+        print(f"流式搜索完成，耗时: {search_time:.3f}秒，找到 {len(results)} 个文件")
+        return results if lazy else results.tolist()
+    
+    @staticmethod
+    def _deliver_in_batches(results, callback, batch_size):
+        """把已得到的结果按批交给流式搜索的回调，回调返回False时停止"""
+        for start in range(0, len(results), batch_size):
+            if callback(list(results[start:start + batch_size])) is False:
+                break
+    
+    def complete_prefix(self, prefix, limit=10):
+        """
+        按前缀补全缓存中的文件名或路径（供搜索框的自动补全使用）
+        
+        前缀含路径分隔符时补全到下一级路径（目录以分隔符结尾，区分大小写），
+        否则补全为以该前缀开头的文件名（忽略ASCII大小写）；都在排序索引中二分查找，与缓存大小基本无关
+        
+        Args:
+            prefix: 已输入的文本
+            limit: 最多返回的补全数
+        
+        Returns:
+            补全文本列表（不重复，按排序索引的顺序）；缓存为空或C库不可用时为空列表
+        """
+        if not prefix or limit <= 0:
+            return []
+        with self.scan_lock:
+            files = self.file_cache
+            corpus = self.corpus
+        if corpus is None or not files:
+            return []
+        count = len(corpus)
+        if corpus.path_order_count() < count - count // 4:
+            # 未排序的项超过四分之一（刚加载或扫描中缓存增长）：在后台更新排序，本次先逐项检查未排序的项
+            self._start_corpus_order_builder(files)
+        
+        path_mode = '/' in prefix or '\\' in prefix
+        indices, _ = corpus.prefix_range(prefix, basename_only=not path_mode, distinct=True, limit=limit)
+        completions = []
+        seen = set()
+        for i in indices:
+            if i >= len(files):
+                continue
+            path = files[i]
+            if path_mode:
+                end = len(prefix)
+                while end < len(path) and path[end] not in '/\\':
+                    end += 1
+                completion = path[:end + 1]
+            else:
+                completion = _path_basename(path)
+            # 排序之后追加的项未去重
+            key = completion if path_mode else _fold_ascii(completion)
+            if key not in seen:
+                seen.add(key)
+                completions.append(completion)
+        return completions
+    
+    def search_query(self, query, limit=None, ranked=True, scope='path', ignore_case=True, max_distance=2, cancel_token=None, lazy=False):
+        """
+        按查询语言在缓存中搜索文件（语法见search.query）
+        
+        条件树经plan_query规划后求值：AND的子条件依次在前面条件留下的候选项中求值，
+        扩展名与目录过滤在语料库列上完成，第一个关键词可使用三元组索引，其余关键词只校验剩余候选项，
+        大小与修改时间最后通过读取文件属性检查
+        
+        Args:
+            query: 查询文本或parse_query返回的条件树
+            limit: 最多返回的结果数，None表示不限
+            ranked: 是否按最长的关键词对结果按相关度排序（不匹配该关键词的结果排在后面；正则表达式不参与排序）
+            scope: 关键词的匹配范围，'path'或'basename'（path:与含路径分隔符的关键词总是匹配整个路径）
+            ignore_case: 关键词是否忽略ASCII大小写
+            max_distance: 模糊关键词（~foo）的最大编辑距离
+            cancel_token: CancelToken，取消后尽快返回
+            lazy: 为True时返回ResultView，否则返回路径列表
+        
+        Returns:
+            匹配的文件路径列表或ResultView
+        
+        Raises:
+            QuerySyntaxError: 查询文本不符合语法
+            ValueError: regex:条件的正则表达式或通配符模式无效
+            SearchCancelled: cancel_token被取消
+        """
+        if scope not in SEARCH_SCOPES:
+            raise ValueError(f"未知的搜索范围: {scope}")
+        plan = plan_query(parse_query(query) if isinstance(query, str) else query)
+        # 结果依赖文件属性时不缓存（文件缓存不变时大小与修改时间仍可能变化）
+        cache_key = None if needs_stat(plan) else (str(plan), 'query', scope, bool(ignore_case), max_distance,
+                                                   bool(ranked), limit or 0) + ((self.frecency.version,) if ranked else ())
+        if cache_key is not None:
+            cached = self._cached_results(cache_key, lazy)
+            if cached is not None:
+                return cached
+        
+        with self.scan_lock:
+            empty = not self.file_cache or self.corpus is None
+        if empty:
+            print("缓存为空，开始扫描")
+            self.scan_files("C:/" if os.name == 'nt' else "/", allowed_extensions=None, cancel_token=cancel_token)
+        with self.scan_lock:
+            files = self.file_cache
+            context = {
+                'files': files,
+                'corpus': self.corpus,
+                'pinyin_column': self.pinyin_column,
+                'folded_column': self.folded_column,
+                'generation': self.cache_generation,
+                'trigram_index': self.trigram_index,
+                'basename_only': scope == 'basename',
+                'ignore_case': ignore_case,
+                'max_distance': max_distance,
+                'cancel_token': cancel_token,
+            }
+        if not files or context['corpus'] is None:
+            return self._result_paths([], (), lazy)
+        
+        start_time = time.time()
+        indices = self._evaluate_query(plan, context, None)
+        if ranked and indices:
+            terms = positive_terms(plan)
+            if terms:
+                term = max(terms, key=lambda term: len(term.text))
+                top, _ = self._ranked_search(files, context['corpus'], term.text, limit, indices, cancel_token,
+                                             context['basename_only'] and not term.whole_path)
+                ranked_set = set(top)
+                indices = list(top) + [i for i in indices if i not in ranked_set]
+        _check_cancelled(cancel_token)
+        if limit:
+            indices = indices[:limit]
+        results = ResultView(files, indices)
+        self._store_results(cache_key, context['generation'] if cache_key is not None else None, results.indices)
+        print(f"查询完成，耗时: {time.time() - start_time:.3f}秒，找到 {len(results)} 个文件，执行计划: {plan}")
+        return results if lazy else results.tolist()
+    
+    def _evaluate_query(self, node, context, candidates):
+        """
+        在candidates（升序的array('i')，None表示全部项）中求满足node的项
+        
+        Returns:
+            满足条件的项的索引（升序的array('i')）
+        """
+        corpus = context['corpus']
+        cancel_token = context['cancel_token']
+        if isinstance(node, And):
+            for child in node.children:
+                candidates = self._evaluate_query(child, context, candidates)
+                if not candidates:
+                    break
+            return candidates
+        if isinstance(node, Or):
+            matched = array('i')
+            for child in node.children:
+                matched = _merge_sorted_indices(self.lib, matched, self._evaluate_query(child, context, candidates))
+            return matched
+        if isinstance(node, Not):
+            # 没有候选集时以全部项为被减数，由C端按下标生成，不必在Python中建立全部索引
+            excluded = self._evaluate_query(node.child, context, candidates)
+            return _merge_sorted_indices(self.lib, candidates, excluded, difference=True, universe=len(context['files']))
+        if isinstance(node, ExtensionFilter):
+            return self._cache_filter(corpus, None, list(node.extensions), candidates)
+        if isinstance(node, DirectoryFilter):
+            return self._cache_filter(corpus, node.directory, None, candidates)
+        if isinstance(node, StatFilter):
+            return self._stat_filter(node, context['files'], candidates, cancel_token)
+        
+        basename_only = context['basename_only'] and not node.whole_path
+        if isinstance(node, (RegexTerm, GlobTerm)):
+            mode = 'glob' if isinstance(node, GlobTerm) else 'regex'
+            return array('i', self._pattern_search(context['files'], corpus, node.pattern, mode, context['ignore_case'],
+                                                   basename_only, cancel_token, candidates,
+                                                   context['trigram_index'] if candidates is None else None))
+        if node.fuzzy:
+            # 模糊条件与缓存模糊搜索一致按文件名匹配，只有path:与含路径分隔符的条件匹配整个路径
+            return array('i', corpus.search(node.text, use_fuzzy=True, max_distance=context['max_distance'],
+                                            ignore_case=context['ignore_case'], num_threads=self.search_threads,
+                                            candidates=candidates, cancel_token=cancel_token,
+                                            basename_only=not node.whole_path))
+        matched = self._evaluate_term(node.text, context, candidates, basename_only)
+        pinyin_matches = None if node.whole_path else self._pinyin_search(context['pinyin_column'], node.text,
+                                                                          candidates, cancel_token)
+        if pinyin_matches is not None:
+            matched = _merge_sorted_indices(self.lib, matched, pinyin_matches[0])
+        return matched
+    
+    def _evaluate_term(self, text, context, candidates, basename_only):
+        """
+        在candidates（None表示全部项）中按子串搜索关键词，返回升序的array('i')
+        
+        忽略大小写且有折叠列时按完整的Unicode折叠匹配，并入折叠列的匹配项
+        """
+        folded_column = context['folded_column']
+        if not context['ignore_case'] or folded_column is None:
+            return self._evaluate_term_in_corpus(text, context, candidates, basename_only)
+        text = _fold_unicode(text)
+        matched = self._evaluate_term_in_corpus(text, context, candidates, basename_only)
+        if not len(folded_column):
+            return matched
+        folded_matches = folded_column.search(text, num_threads=self.search_threads, candidates=candidates,
+                                              cancel_token=context['cancel_token'], basename_only=basename_only)
+        return _merge_sorted_indices(self.lib, matched, folded_matches)
+    
+    def _evaluate_term_in_corpus(self, text, context, candidates, basename_only):
+        """在candidates（None表示全部项）中按子串搜索语料库，返回升序的array('i')"""
+        corpus = context['corpus']
+        trigram_index = context['trigram_index']
+        if candidates is None and trigram_index is not None and len(text) >= INDEXED_TERM_MIN_LENGTH:
+            # 只有第一个求值的关键词使用索引，之后的关键词在缩小的候选项中逐项校验更快
+            indexed = trigram_index.search(corpus, len(context['files']), text, context['ignore_case'])
+            if indexed is not None:
+                candidates = array('i', sorted(indexed))
+                if not basename_only:
+                    return candidates
+        return array('i', corpus.search(text, ignore_case=context['ignore_case'], num_threads=self.search_threads,
+                                        candidates=candidates, cancel_token=context['cancel_token'],
+                                        basename_only=basename_only))
+    
+    @staticmethod
+    def _stat_filter(node, files, candidates, cancel_token):
+        """读取候选项的文件属性并按大小或修改时间过滤，无法读取的文件视为不满足"""
+        if candidates is None:
+            candidates = range(len(files))
+        matched = array('i')
+        for count, index in enumerate(candidates):
+            if count % 1024 == 0:
+                _check_cancelled(cancel_token)
+            try:
+                if node.accepts(os.stat(files[index])):
+                    matched.append(index)
+            except OSError:
+                pass
+        return matched
+    
+    @staticmethod
+    def _result_cache_key(keyword, directory, depth, include_extensions, use_fuzzy, max_distance, engine, ignore_case, ranked, limit, scope='path', mode='substring', frecency_version=0):
+        """查询结果缓存的键，包含所有影响结果的参数（相关度排序还取决于文件打开记录的版本）"""
+        if directory:
+            directory = os.path.normcase(os.path.abspath(directory))
+        extensions = tuple(sorted({ext.lstrip('.').lower() for ext in include_extensions})) if include_extensions else None
+        return (keyword, directory or None, depth, extensions, bool(use_fuzzy), max_distance if use_fuzzy else None,
+                engine, bool(ignore_case), bool(ranked), limit or 0, scope) + ((mode,) if mode != 'substring' else ()) + \
+               (('frecency', frecency_version) if ranked and frecency_version else ())
+    
+    def _ranked_search(self, files, corpus, keyword, limit, candidates=None, cancel_token=None, basename_only=False):
+        """
+        按相关度搜索文件列表
+        
+        语料库可用时由C端打分并用有界堆取前limit项，否则使用Python回退实现；
+        经常、最近打开的文件按打开记录加分（见_frecency_boosts）
+        
+        Returns:
+            (indices, matches)：得分最高的limit项的索引（按得分从高到低），
+            以及全部匹配项的索引（升序，Python回退实现时为None）
+        """
+        boosts, max_boost = self._frecency_boosts(files, corpus)
+        if corpus is not None:
+            return corpus.ranked_search_with_matches(keyword, limit=limit or 0, num_threads=self.search_threads,
+                                                     candidates=candidates, cancel_token=cancel_token,
+                                                     basename_only=basename_only, boosts=boosts, max_boost=max_boost)
+        if basename_only:
+            files = [_path_basename(path) for path in files]
+        return self._python_ranked_search(files, keyword, limit, boosts), None
+    
+    def record_open(self, path):
+        """
+        记录一次文件打开，之后的相关度排序给经常、最近打开的文件加分
+        
+        Args:
+            path: 文件路径（与搜索结果中的路径一致）
+        """
+        self.frecency.record(path)
+    
+    def _frecency_boosts(self, files, corpus):
+        """
+        按缓存索引排列的打开记录加分，C端排序时按索引直接读取，每个候选项O(1)
+        
+        files未被替换时只为新追加的项补充加分；打开记录变化、文件缓存被替换或距上次计算超过
+        FRECENCY_REFRESH_SECONDS时重新计算（记录中的每个路径在语料库的排序索引中二分查找）
+        
+        Returns:
+            (boosts, max_boost)：array('i')（可短于files，其余项不加分）与其中的最大值；没有打开记录时为(None, 0)
+        """
+        now = time.time()
+        version = self.frecency.version
+        with self._frecency_lock:
+            state = self._frecency_state
+            if (state is None or state['files'] is not files or state['version'] != version or
+                    now - state['time'] > FRECENCY_REFRESH_SECONDS):
+                path_boosts = self.frecency.boosts(now)
+                count = len(files)
+                boosts = None
+                if path_boosts:
+                    boosts = array('i', bytes(array('i').itemsize * count))
+                    for i, boost in self._cache_positions(files, corpus, path_boosts, count):
+                        boosts[i] = boost
+                state = {'files': files, 'version': version, 'time': now, 'count': count,
+                         'path_boosts': path_boosts, 'boosts': boosts,
+                         'max_boost': max(path_boosts.values(), default=0)}
+                self._frecency_state = state
+            elif state['boosts'] is not None and state['count'] < len(files):
+                # 新追加的项逐个查表；生成新数组，正在进行的搜索仍可使用旧数组
+                count = len(files)
+                path_boosts = state['path_boosts']
+                tail = array('i', (path_boosts.get(path, 0) for path in itertools.islice(files, state['count'], count)))
+                state['boosts'] = state['boosts'] + tail
+                state['count'] = count
+            return state['boosts'], state['max_boost']
+    
+    @staticmethod
+    def _cache_positions(files, corpus, path_boosts, count):
+        """
+        path_boosts中的路径在files[:count]中的位置
+        
+        Returns:
+            [(索引, 加分)...]
+        """
+        if corpus is None:
+            return [(i, path_boosts[path]) for i, path in enumerate(itertools.islice(files, count)) if path in path_boosts]
+        if corpus.path_order_count() < count - count // 4:
+            # 每个路径都要查找一次，先排序（后台正在排序时等待其完成），以免逐项检查大量未排序的项
+            corpus.build_path_order()
+        positions = []
+        for path, boost in path_boosts.items():
+            indices, _ = corpus.prefix_range(path)
+            positions.extend((i, boost) for i in indices if i < count and files[i] == path)
+        return positions
+    
+    @staticmethod
+    def _refine_mode(use_fuzzy, ignore_case, ranked, basename_only=False, unicode_fold=False):
+        """
+        返回支持增量缩小范围的搜索模式名（只匹配文件名时带'@basename'后缀）
+        
+        子串、忽略大小写子串（unicode_fold为True时按完整的Unicode折叠）与相关度（子序列）匹配中，
+        扩展后的关键词的匹配项一定是原关键词匹配项的子集；模糊搜索（编辑距离）不满足这一关系，返回None
+        """
+        if ranked:
+            mode = 'ranked'
+        elif use_fuzzy:
+            return None
+        elif unicode_fold:
+            mode = 'ufold'
+        else:
+            mode = 'icase' if ignore_case else 'substring'
+        return mode + '@basename' if basename_only else mode
+    
+    @staticmethod
+    def _keyword_extends(mode, previous, keyword):
+        """判断在给定模式下keyword的匹配项是否一定包含于previous的匹配项"""
+        mode = mode.partition('@')[0]
+        if mode == 'substring':
+            return previous in keyword
+        if mode == 'ufold':
+            return _fold_unicode(previous) in _fold_unicode(keyword)
+        previous = _fold_ascii(previous)
+        keyword = _fold_ascii(keyword)
+        if mode == 'icase':
+            return previous in keyword
+        remaining = iter(keyword)
+        return all(char in remaining for char in previous)  # previous是keyword的子序列
+    
+    def _find_refine_candidates(self, generation, mode, keyword):
+        """在refine_stack中查找可缩小范围的最小候选集，没有时返回None"""
+        best = None
+        with self.scan_lock:
+            for entry_generation, entry_mode, entry_keyword, matches in self.refine_stack:
+                if (entry_generation == generation and entry_mode == mode and
+                        self._keyword_extends(mode, entry_keyword, keyword) and
+                        (best is None or len(matches) < len(best))):
+                    best = matches
+        if best is not None:
+            print(f"在上次的 {len(best)} 个匹配项中继续搜索")
+        return best
+    
+    def _push_refine_entry(self, generation, mode, keyword, matches):
+        """记录一次查询的完整匹配集，丢弃其他缓存代数的条目，只保留最近refine_stack_size条"""
+        with self.scan_lock:
+            self.refine_stack = [entry for entry in self.refine_stack
+                                 if entry[0] == self.cache_generation and entry[1:3] != (mode, keyword)]
+            if generation != self.cache_generation:
+                return  # 查询期间缓存已变化
+            self.refine_stack.append((generation, mode, keyword, matches))
+            del self.refine_stack[:-self.refine_stack_size]
+    
+    def _python_ranked_search(self, files, keyword, limit, boosts=None):
+        """
+        相关度搜索的Python回退实现：关键词字符按顺序出现在文件名或路径中即匹配，
+        文件名匹配优先，其次打开记录加分（boosts，按索引）高、匹配窗口短、路径短的优先
+        """
+        boost_count = len(boosts) if boosts else 0
+        folded_keyword = keyword.lower()
+        
+        def match_span(text):
+            # 返回子序列匹配窗口的长度，不匹配时返回None
+            pos = 0
+            first = None
+            for char in folded_keyword:
+                pos = text.find(char, pos)
+                if pos < 0:
+                    return None
+                if first is None:
+                    first = pos
+                pos += 1
+            return pos - first
+        
+        ranked = []
+        for i, path in enumerate(files):
+            folded_path = path.lower()
+            basename = _path_basename(folded_path)
+            span = match_span(basename)
+            boost = -boosts[i] if i < boost_count else 0
+            if span is not None:
+                ranked.append((0, boost, span, len(path), i))
+                continue
+            span = match_span(folded_path)
+            if span is not None:
+                ranked.append((1, boost, span, len(path), i))
+        ranked.sort()
+        if limit:
+            ranked = ranked[:limit]
+        return [entry[4] for entry in ranked]
     
     def _load_library(self):
         """加载编译好的C动态链接库"""
@@ -401,7 +2325,7 @@ class SearchWrapper:
             
             # 设置函数原型
             self.dir_scan_lib.scan_directory_c.argtypes = [
-                c_char_p, c_int, POINTER(c_char_p), c_int, POINTER(c_int)
+                c_char_p, c_int, POINTER(c_char_p), c_int, POINTER(c_int), POINTER(c_int)
             ]
             self.dir_scan_lib.scan_directory_c.restype = POINTER(c_char_p)
             self.dir_scan_lib.free_scan_result.argtypes = [POINTER(c_char_p), c_int]
@@ -424,19 +2348,127 @@ class SearchWrapper:
             c_char_p,           # keyword
             c_bool,             # is_sorted
             c_bool,             # use_fuzzy
-            c_int               # max_distance
+            c_int,              # max_distance
+            c_bool,             # ignore_case
+            c_int,              # num_threads
+            POINTER(c_int)      # cancel
         ]
         self.lib.perform_search.restype = POINTER(SearchResult)
         
+        # 设置search_arena函数原型
+        self.lib.search_arena.argtypes = [
+            c_char_p,                   # blob
+            ctypes.c_longlong,          # blob_len
+            POINTER(ctypes.c_longlong), # offsets
+            c_int,                      # items_count
+            c_char_p,                   # keyword
+            c_bool,                     # use_fuzzy
+            c_int,                      # max_distance
+            c_bool,                     # ignore_case
+            c_int,                      # num_threads
+            POINTER(c_int)              # cancel
+        ]
+        self.lib.search_arena.restype = POINTER(SearchResult)
+        
+        # 设置路径语料库函数原型
+        self.lib.corpus_create.argtypes = []
+        self.lib.corpus_create.restype = ctypes.c_void_p
+        self.lib.corpus_append.argtypes = [ctypes.c_void_p, c_char_p, ctypes.c_longlong, c_int]
+        self.lib.corpus_append.restype = c_int
+        self.lib.corpus_count.argtypes = [ctypes.c_void_p]
+        self.lib.corpus_count.restype = c_int
+        self.lib.corpus_items_acquire.argtypes = [ctypes.c_void_p, POINTER(c_int)]
+        self.lib.corpus_items_acquire.restype = POINTER(c_char_p)
+        self.lib.corpus_items_release.argtypes = [ctypes.c_void_p]
+        self.lib.corpus_items_release.restype = None
+        self.lib.corpus_search.argtypes = [ctypes.c_void_p, c_char_p, POINTER(SearchOptions)]
+        self.lib.corpus_search.restype = POINTER(SearchResult)
+        self.lib.corpus_search_subset.argtypes = [ctypes.c_void_p, c_char_p, POINTER(SearchOptions), POINTER(c_int), c_int]
+        self.lib.corpus_search_subset.restype = POINTER(SearchResult)
+        self.lib.corpus_search_stream.argtypes = [ctypes.c_void_p, c_char_p, POINTER(SearchOptions), c_int, SearchBatchCallback, ctypes.c_void_p]
+        self.lib.corpus_search_stream.restype = POINTER(SearchResult)
+        self.lib.corpus_build_path_order.argtypes = [ctypes.c_void_p]
+        self.lib.corpus_build_path_order.restype = c_int
+        self.lib.corpus_filter.argtypes = [ctypes.c_void_p, c_char_p, POINTER(c_char_p), c_int, POINTER(c_int), c_int]
+        self.lib.corpus_filter.restype = POINTER(SearchResult)
+        self.lib.corpus_prefix_range.argtypes = [ctypes.c_void_p, c_char_p, c_bool, c_bool, c_int]
+        self.lib.corpus_prefix_range.restype = POINTER(SearchResult)
+        self.lib.corpus_path_order_count.argtypes = [ctypes.c_void_p]
+        self.lib.corpus_path_order_count.restype = c_int
+        self.lib.corpus_regex_search.argtypes = [ctypes.c_void_p, ctypes.c_void_p, POINTER(SearchOptions), POINTER(c_int), c_int]
+        self.lib.corpus_regex_search.restype = POINTER(SearchResult)
+        self.lib.regex_compile.argtypes = [c_char_p, c_bool, c_char_p, c_int]
+        self.lib.regex_compile.restype = ctypes.c_void_p
+        self.lib.glob_compile.argtypes = [c_char_p, c_bool, c_char_p, c_int]
+        self.lib.glob_compile.restype = ctypes.c_void_p
+        self.lib.regex_literal.argtypes = [ctypes.c_void_p]
+        self.lib.regex_literal.restype = c_char_p
+        self.lib.regex_match.argtypes = [ctypes.c_void_p, c_char_p, ctypes.c_size_t]
+        self.lib.regex_match.restype = c_bool
+        self.lib.regex_free.argtypes = [ctypes.c_void_p]
+        self.lib.regex_free.restype = None
+        self.lib.corpus_free.argtypes = [ctypes.c_void_p]
+        self.lib.corpus_free.restype = None
+        
         # 设置free_search_result函数原型
         self.lib.free_search_result.argtypes = [POINTER(SearchResult)]
         self.lib.free_search_result.restype = None
+        self.lib.merge_sorted_indices.argtypes = [POINTER(c_int), c_int, POINTER(c_int), c_int, c_bool]
+        self.lib.merge_sorted_indices.restype = POINTER(SearchResult)
+        self.lib.select_owner_rows.argtypes = [POINTER(c_int), c_int, POINTER(c_int), c_int]
+        self.lib.select_owner_rows.restype = POINTER(SearchResult)
+        
+        # 序列化缓冲区释放函数
+        self.lib.free_search_buffer.argtypes = [ctypes.c_void_p]
+        self.lib.free_search_buffer.restype = None
+        
+        # 三元组索引函数原型
+        self.lib.trigram_index_build.argtypes = [POINTER(c_char_p), c_int]
+        self.lib.trigram_index_build.restype = ctypes.c_void_p
+        self.lib.trigram_index_search.argtypes = [ctypes.c_void_p, POINTER(c_char_p), c_int, c_char_p, c_bool]
+        self.lib.trigram_index_search.restype = POINTER(SearchResult)
+        self.lib.trigram_index_item_count.argtypes = [ctypes.c_void_p]
+        self.lib.trigram_index_item_count.restype = c_int
+        self.lib.trigram_index_dump.argtypes = [ctypes.c_void_p, POINTER(ctypes.c_longlong)]
+        self.lib.trigram_index_dump.restype = ctypes.c_void_p
+        self.lib.trigram_index_restore.argtypes = [c_char_p, ctypes.c_longlong]
+        self.lib.trigram_index_restore.restype = ctypes.c_void_p
+        self.lib.trigram_index_free.argtypes = [ctypes.c_void_p]
+        self.lib.trigram_index_free.restype = None
+        
+        # 后缀数组函数原型
+        self.lib.suffix_array_build.argtypes = [POINTER(c_char_p), c_int]
+        self.lib.suffix_array_build.restype = ctypes.c_void_p
+        self.lib.suffix_array_search.argtypes = [ctypes.c_void_p, c_char_p]
+        self.lib.suffix_array_search.restype = POINTER(SearchResult)
+        self.lib.suffix_array_item_count.argtypes = [ctypes.c_void_p]
+        self.lib.suffix_array_item_count.restype = c_int
+        self.lib.suffix_array_dump.argtypes = [ctypes.c_void_p, POINTER(ctypes.c_longlong)]
+        self.lib.suffix_array_dump.restype = ctypes.c_void_p
+        self.lib.suffix_array_restore.argtypes = [c_char_p, ctypes.c_longlong]
+        self.lib.suffix_array_restore.restype = ctypes.c_void_p
+        self.lib.suffix_array_free.argtypes = [ctypes.c_void_p]
+        self.lib.suffix_array_free.restype = None
+        
+        # 模糊搜索BK树索引函数原型
+        self.lib.fuzzy_index_build.argtypes = [POINTER(c_char_p), c_int]
+        self.lib.fuzzy_index_build.restype = ctypes.c_void_p
+        self.lib.fuzzy_index_search.argtypes = [ctypes.c_void_p, c_char_p, c_int]
+        self.lib.fuzzy_index_search.restype = POINTER(SearchResult)
+        self.lib.fuzzy_index_item_count.argtypes = [ctypes.c_void_p]
+        self.lib.fuzzy_index_item_count.restype = c_int
+        self.lib.fuzzy_index_dump.argtypes = [ctypes.c_void_p, POINTER(ctypes.c_longlong)]
+        self.lib.fuzzy_index_dump.restype = ctypes.c_void_p
+        self.lib.fuzzy_index_restore.argtypes = [c_char_p, ctypes.c_longlong]
+        self.lib.fuzzy_index_restore.restype = ctypes.c_void_p
+        self.lib.fuzzy_index_free.argtypes = [ctypes.c_void_p]
+        self.lib.fuzzy_index_free.restype = None
     
     def is_available(self):
         """检查搜索库是否可用"""
         return self.lib is not None
     
-    def search(self, items, keyword, is_sorted=False, use_fuzzy=False, max_distance=2):
+    def search(self, items, keyword, is_sorted=False, use_fuzzy=False, max_distance=2, ignore_case=False, num_threads=None, cancel_token=None):
         """
         执行搜索 - 只使用C语言实现
         
@@ -446,12 +2478,16 @@ class SearchWrapper:
             is_sorted: 是否已排序
             use_fuzzy: 是否使用模糊搜索
             max_distance: 模糊搜索的最大编辑距离
+            ignore_case: 是否忽略ASCII大小写（中文等字符按原样匹配）
+            num_threads: 搜索线程数，None表示使用search_threads设置
+            cancel_token: CancelToken，None表示不可取消
         
         Returns:
             匹配项的索引列表
         
         Raises:
             Exception: 如果C语言实现不可用或出错
+            SearchCancelled: cancel_token在搜索期间被取消
         """
         # 只使用C实现的搜索功能
         if not self.is_available():
@@ -463,25 +2499,68 @@ class SearchWrapper:
             c_items[i] = item.encode('utf-8')
         
         c_keyword = keyword.encode('utf-8')
+        if num_threads is None:
+            num_threads = self.search_threads
         
-        # 调用C函数
+        # 调用C函数（C端分块并行扫描，调用期间释放GIL）
         result_ptr = self.lib.perform_search(
             c_items,
             len(items),
             c_keyword,
             is_sorted,
             use_fuzzy,
-            max_distance
+            max_distance,
+            ignore_case,
+            num_threads,
+            _cancel_pointer(cancel_token)
         )
         
-        # 提取结果
-        result = result_ptr.contents
-        indices = []
-        if result.count > 0 and result.indices:
-            indices = [result.indices[i] for i in range(result.count)]
+        # 提取结果并释放C分配的内存
+        indices = _consume_search_result(self.lib, result_ptr)
+        _check_cancelled(cancel_token)
+        return indices
+    
+    def search_arena(self, arena, keyword, use_fuzzy=False, max_distance=2, ignore_case=False, num_threads=None, cancel_token=None):
+        """
+        在连续存储区上执行搜索，每次查询只编码关键词
+        
+        Args:
+            arena: ItemArena实例
+            keyword: 搜索关键词
+            use_fuzzy: 是否使用模糊搜索
+            max_distance: 模糊搜索的最大编辑距离
+            ignore_case: 是否忽略ASCII大小写
+            num_threads: 搜索线程数，None表示使用search_threads设置
+            cancel_token: CancelToken，None表示不可取消
+        
+        Returns:
+            匹配项的索引列表
+        
+        Raises:
+            Exception: 如果C语言实现不可用或存储区数据不一致
+            SearchCancelled: cancel_token在搜索期间被取消
+        """
+        if not self.is_available():
+            raise Exception("C语言搜索实现不可用，请确保search.dll文件存在且可用")
+        if num_threads is None:
+            num_threads = self.search_threads
         
-        # 释放C分配的内存
-        self.lib.free_search_result(result_ptr)
+        result_ptr = self.lib.search_arena(
+            arena.blob,
+            len(arena.blob),
+            arena.c_offsets,
+            arena.count,
+            keyword.encode('utf-8'),
+            use_fuzzy,
+            max_distance,
+            ignore_case,
+            num_threads,
+            _cancel_pointer(cancel_token)
+        )
+        if not result_ptr:
+            raise Exception("项存储区数据不一致")
+        indices = _consume_search_result(self.lib, result_ptr)
+        _check_cancelled(cancel_token)
         return indices
     
     def _python_search(self, items, keyword, is_sorted=False, use_fuzzy=False, max_distance=2):
@@ -576,22 +2655,38 @@ class SearchWrapper:
 search_wrapper = SearchWrapper()
 
 # 导出函数
-def search(items, keyword, is_sorted=False, use_fuzzy=False, max_distance=2):
+def search(items, keyword, is_sorted=False, use_fuzzy=False, max_distance=2, ignore_case=False, num_threads=None, cancel_token=None):
     """搜索函数的便捷接口"""
-    return search_wrapper.search(items, keyword, is_sorted, use_fuzzy, max_distance)
+    return search_wrapper.search(items, keyword, is_sorted, use_fuzzy, max_distance, ignore_case, num_threads, cancel_token)
 
 def is_c_search_available():
     """检查C搜索实现是否可用"""
     return search_wrapper.is_available()
 
-def scan_files(directory, max_depth=2, allowed_extensions=None):
+def scan_files(directory, max_depth=2, allowed_extensions=None, cancel_token=None):
     """扫描文件的便捷接口"""
-    return search_wrapper.scan_files(directory, max_depth, allowed_extensions)
+    return search_wrapper.scan_files(directory, max_depth, allowed_extensions, cancel_token)
 
-def search_files(directory=None, keyword=None, depth=2, max_distance=2, use_fuzzy=False, include_extensions=None):
+def search_files(directory=None, keyword=None, depth=2, max_distance=2, use_fuzzy=False, include_extensions=None, engine=None, ignore_case=False, limit=None, ranked=False, scope='path', cancel_token=None, mode='substring', lazy=False):
     """搜索文件的便捷接口"""
-    return search_wrapper.search_files(directory, keyword, depth, max_distance, use_fuzzy, include_extensions)
+    return search_wrapper.search_files(directory, keyword, depth, max_distance, use_fuzzy, include_extensions, engine, ignore_case, limit, ranked, scope, cancel_token, mode, lazy)
+
+def search_files_stream(keyword, callback, directory=None, depth=2, max_distance=2, use_fuzzy=False, include_extensions=None, ignore_case=False, limit=None, ranked=False, batch_size=256, scope='path', cancel_token=None, lazy=False):
+    """流式搜索文件的便捷接口，匹配的文件按批交给callback"""
+    return search_wrapper.search_files_stream(keyword, callback, directory, depth, max_distance, use_fuzzy, include_extensions, ignore_case, limit, ranked, batch_size, scope, cancel_token, lazy)
+
+def search_query(query, limit=None, ranked=True, scope='path', ignore_case=True, max_distance=2, cancel_token=None, lazy=False):
+    """按查询语言搜索文件的便捷接口"""
+    return search_wrapper.search_query(query, limit, ranked, scope, ignore_case, max_distance, cancel_token, lazy)
+
+def complete_prefix(prefix, limit=10):
+    """按前缀补全文件名或路径的便捷接口"""
+    return search_wrapper.complete_prefix(prefix, limit)
+
+def record_open(path):
+    """记录一次文件打开的便捷接口（相关度排序给经常、最近打开的文件加分）"""
+    return search_wrapper.record_open(path)
 
-def pre_scan(depth=2, allowed_extensions=None):
+def pre_scan(depth=2, allowed_extensions=None, cancel_token=None):
     """预扫描整个电脑的文件路径并保存到缓存"""
-    return search_wrapper.pre_scan(depth, allowed_extensions)
+    return search_wrapper.pre_scan(depth, allowed_extensions, cancel_token)
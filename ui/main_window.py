@@ -10,9 +10,9 @@ import subprocess
 import logging
 from PySide6.QtWidgets import (
     QMainWindow, QVBoxLayout, QHBoxLayout, QWidget, QLabel, QLineEdit, QPushButton, QCheckBox,
-    QFrame, QScrollArea, QTextBrowser, QMessageBox, QSizePolicy, QListWidget, QListWidgetItem, QFileDialog
+    QFrame, QScrollArea, QTextBrowser, QMessageBox, QSizePolicy, QListWidget, QListWidgetItem, QFileDialog, QCompleter
 )
-from PySide6.QtCore import Qt, QTimer, QThread, Signal
+from PySide6.QtCore import Qt, QTimer, QThread, Signal, QStringListModel
 from PySide6.QtGui import QFont, QFontDatabase, QIcon
 
 # 导入其他模块
@@ -23,10 +23,24 @@ from .utils import load_custom_fonts
 from monitor.monitor import init_monitor, get_system_info
 # 从monitor模块导入真实的系统监控功能
 from monitor.monitor import get_system_info as get_mock_system_info
-from search.search_wrapper import is_c_search_available, search_files, scan_files
+from search.search_wrapper import is_c_search_available, search_files_stream, search_query, scan_files, complete_prefix, record_open, CancelToken, SearchCancelled
+from search.query import parse_query, plain_keyword, QuerySyntaxError
 
 logger = logging.getLogger(__name__)
 
+# 主窗口文件搜索最多显示的结果数（按相关度取前若干项）
+FILE_SEARCH_RESULT_LIMIT = 200
+# 文件搜索结果每批交给界面的数量
+FILE_SEARCH_BATCH_SIZE = 50
+# 结果窗口每页加载的结果数：先显示第一页，滚动到列表底部时再加载下一页
+RESULT_PAGE_SIZE = 100
+# 文件搜索的匹配范围：只匹配文件名（关键词含路径分隔符时自动匹配整个路径）
+FILE_SEARCH_SCOPE = 'basename'
+# 搜索框自动补全最多显示的候选数
+AUTOCOMPLETE_LIMIT = 10
+# 含这些字符的文本按查询语法处理，不做前缀补全
+AUTOCOMPLETE_SKIP_CHARS = set('"*?()|')
+
 
 class SearchResultsWindow(QMainWindow):
     """搜索结果显示窗口"""
@@ -49,16 +63,21 @@ class SearchResultsWindow(QMainWindow):
         layout = QVBoxLayout(central_widget)
         
         # 创建标题
-        title_label = QLabel("搜索结果")
-        title_label.setFont(QFont("Arial", 14, QFont.Bold))
-        title_label.setAlignment(Qt.AlignCenter)
-        layout.addWidget(title_label)
+        self.title_label = QLabel("搜索结果")
+        self.title_label.setFont(QFont("Arial", 14, QFont.Bold))
+        self.title_label.setAlignment(Qt.AlignCenter)
+        layout.addWidget(self.title_label)
         
         # 创建文件列表
         self.file_list = QListWidget()
         self.file_list.setMinimumHeight(300)
+        self.file_list.verticalScrollBar().valueChanged.connect(self.on_results_scrolled)
         layout.addWidget(self.file_list)
         
+        # 当前结果（路径序列，可以是search_wrapper返回的ResultView）与已加载到列表中的数量
+        self.results = []
+        self.loaded_count = 0
+        
         # 创建按钮布局
         button_layout = QHBoxLayout()
         
@@ -80,33 +99,58 @@ class SearchResultsWindow(QMainWindow):
         self.window_closed.emit()
         event.accept()
         
-    def set_search_results(self, results, search_time=0.0):
+    def set_search_results(self, results, search_time=0.0, ranked=False):
         """设置搜索结果
         
         Args:
-            results: 搜索结果列表
+            results: 搜索结果（列表或ResultView等支持len()与切片的路径序列，按页取出路径）
             search_time: 搜索所用时间(秒)
+            ranked: 结果是否已按相关度排序
         """
         self.file_list.clear()
+        self.results = results
+        self.loaded_count = 0
         
         # 更新标题
-        for label in self.findChildren(QLabel):
-            if label.text().startswith("搜索结果"):
-                if search_time > 0:
-                    label.setText(f"搜索结果 ({len(results)} 个文件) - 耗时: {search_time:.3f}秒")
-                else:
-                    label.setText(f"搜索结果 ({len(results)} 个文件)")
-                break
+        order_text = " - 按相关度排序" if ranked else ""
+        if search_time > 0:
+            self.title_label.setText(f"搜索结果 ({len(results)} 个文件){order_text} - 耗时: {search_time:.3f}秒")
+        else:
+            self.title_label.setText(f"搜索结果 ({len(results)} 个文件){order_text}")
         
-        # 添加结果到列表
-        for file_path in results:
-            item = QListWidgetItem(file_path)
-            self.file_list.addItem(item)
+        # 添加第一页结果到列表，其余结果在滚动到底部时加载
+        self.load_next_page()
         
         # 自动选择第一个结果
         if self.file_list.count() > 0:
             self.file_list.setCurrentRow(0)
     
+    def load_next_page(self):
+        """把下一页结果加载到列表中（只在此时从结果序列中取出路径）"""
+        page = self.results[self.loaded_count:self.loaded_count + RESULT_PAGE_SIZE]
+        for file_path in page:
+            self.file_list.addItem(QListWidgetItem(file_path))
+        self.loaded_count += len(page)
+    
+    def on_results_scrolled(self, value):
+        """列表滚动到底部时加载下一页结果"""
+        if value >= self.file_list.verticalScrollBar().maximum() and self.loaded_count < len(self.results):
+            self.load_next_page()
+    
+    def append_search_results(self, results):
+        """追加一批流式搜索结果（搜索完成后由set_search_results替换为最终结果）
+        
+        Args:
+            results: 本批搜索结果列表
+        """
+        for file_path in results:
+            self.file_list.addItem(QListWidgetItem(file_path))
+        self.title_label.setText(f"搜索结果 ({self.file_list.count()} 个文件) - 搜索中...")
+        
+        # 自动选择第一个结果
+        if self.file_list.currentRow() < 0 and self.file_list.count() > 0:
+            self.file_list.setCurrentRow(0)
+    
     def open_selected_file(self):
         """打开选中文件所在的文件夹"""
         current_item = self.file_list.currentItem()
@@ -114,6 +158,11 @@ class SearchResultsWindow(QMainWindow):
             file_path = current_item.text()
             folder_path = os.path.dirname(file_path)
             logger.info(f"尝试打开文件所在文件夹: {folder_path}")
+            # 记录打开，之后的搜索结果中经常、最近打开的文件排在前面
+            try:
+                record_open(file_path)
+            except Exception as e:
+                logger.error(f"记录文件打开失败: {e}")
             try:
                 if sys.platform.startswith('win'):
                     os.startfile(folder_path)
@@ -127,14 +176,23 @@ class SearchResultsWindow(QMainWindow):
 
 
 class SearchThread(QThread):
-    """异步搜索线程类"""
+    """异步搜索线程类：先搜索按钮，再流式搜索文件"""
     search_completed = Signal(list, str, bool, float)  # 信号：搜索结果, 搜索文本, 是否由回车键触发, 搜索时间(秒)
+    file_results_batch = Signal(str, list)  # 信号：搜索文本, 一批文件搜索结果
+    file_search_finished = Signal(str, object, float)  # 信号：搜索文本, 按相关度排序的文件搜索结果（ResultView）, 文件搜索时间(秒)
     
-    def __init__(self, button_names, search_text, triggered_by_return):
+    def __init__(self, button_names, search_text, triggered_by_return, query=None):
         super().__init__()
         self.button_names = button_names
         self.search_text = search_text
         self.triggered_by_return = triggered_by_return
+        self.query = query  # 解析后的文件搜索条件，None表示不搜索文件
+        self.cancel_token = CancelToken()  # 与C端共享，取消后正在进行的文件搜索尽快返回
+    
+    def cancel(self):
+        """取消搜索：停止交付结果并中止正在进行的C端搜索与扫描"""
+        self.requestInterruption()
+        self.cancel_token.cancel()
     
     def run(self):
         """执行搜索操作"""
@@ -158,6 +216,43 @@ class SearchThread(QThread):
             # 计算搜索时间
             search_time = time.time() - start_time
             self.search_completed.emit([], self.search_text, self.triggered_by_return, search_time)
+        
+        if self.query is None:
+            # 查询语法错误时不搜索文件，但仍需完成回车键的后续处理
+            if not self.isInterruptionRequested():
+                self.file_search_finished.emit(self.search_text, [], 0.0)
+            return
+        
+        # 搜索整个电脑（使用缓存，不指定目录）：普通关键词流式搜索，匹配的文件分批发送，完成后发送按相关度排序的结果；
+        # 含运算符或过滤条件的查询由查询规划器在缓存上求值
+        file_search_start_time = time.time()
+        try:
+            logger.info(f"开始文件搜索: {self.search_text}")
+            keyword = plain_keyword(self.query)
+            if keyword is not None:
+                file_results = search_files_stream(keyword=keyword, callback=self._emit_file_batch, depth=3,
+                                                   limit=FILE_SEARCH_RESULT_LIMIT, ranked=True,
+                                                   batch_size=FILE_SEARCH_BATCH_SIZE, scope=FILE_SEARCH_SCOPE,
+                                                   cancel_token=self.cancel_token, lazy=True)
+            else:
+                file_results = search_query(self.query, limit=FILE_SEARCH_RESULT_LIMIT, ranked=True,
+                                            scope=FILE_SEARCH_SCOPE, cancel_token=self.cancel_token, lazy=True)
+            logger.info(f"文件搜索结果: {len(file_results)} 个文件")
+        except SearchCancelled:
+            logger.info(f"文件搜索已取消: {self.search_text}")
+            return
+        except Exception as e:
+            logger.error(f"文件搜索失败: {e}")
+            file_results = []
+        if not self.isInterruptionRequested():
+            self.file_search_finished.emit(self.search_text, file_results, time.time() - file_search_start_time)
+    
+    def _emit_file_batch(self, file_paths):
+        """发送一批文件搜索结果，线程被要求中断时停止搜索"""
+        if self.isInterruptionRequested():
+            return False
+        self.file_results_batch.emit(self.search_text, file_paths)
+        return True
 
 
 class MainWindow(QMainWindow):
@@ -182,6 +277,9 @@ class MainWindow(QMainWindow):
         # 文件搜索相关变量
         self.search_files_option = False  # 是否启用文件搜索选项
         self.file_search_results = []  # 文件搜索结果
+        self.button_search_results = []  # 当前搜索的按钮匹配结果（文件搜索完成后使用）
+        self.button_search_time = 0.0  # 当前搜索的按钮搜索时间(秒)
+        self.search_triggered_by_return = False  # 当前搜索是否由回车键触发
         self.file_search_list = None  # 文件搜索结果显示组件
         self.file_search_widget = None  # 文件搜索结果显示组件
         self.current_directory = os.path.expanduser("~")  # 默认搜索目录为用户主目录
@@ -216,7 +314,8 @@ class MainWindow(QMainWindow):
         
         logger.info("Main window initialized")
         
-        # 在后台线程中执行预扫描，但只在没有缓存文件时才扫描
+        # 在后台线程中执行预扫描，但只在没有缓存文件时才扫描（关闭窗口时通过pre_scan_cancel_token取消）
+        self.pre_scan_cancel_token = CancelToken()
         def background_pre_scan():
             try:
                 import os
@@ -229,7 +328,7 @@ class MainWindow(QMainWindow):
                 if not os.path.exists(cache_path):
                     logger.info("缓存文件不存在，开始执行文件预扫描")
                     from search.search_wrapper import pre_scan
-                    file_count = pre_scan()
+                    file_count = pre_scan(cancel_token=self.pre_scan_cancel_token)
                     logger.info(f"文件预扫描完成，共扫描 {file_count} 个文件")
                 else:
                     logger.info(f"缓存文件已存在 ({cache_path})，跳过预扫描")
@@ -274,6 +373,13 @@ class MainWindow(QMainWindow):
         # 添加文本变化事件处理，当搜索框为空时重置按钮显示
         self.search_input.textChanged.connect(self.on_search_text_changed)
         
+        # 输入文件名或路径的开头时在下拉列表中补全（候选来自文件缓存的排序索引）
+        self.completion_model = QStringListModel(self)
+        self.search_completer = QCompleter(self.completion_model, self)
+        self.search_completer.setCaseSensitivity(Qt.CaseInsensitive)
+        self.search_completer.setMaxVisibleItems(AUTOCOMPLETE_LIMIT)
+        self.search_input.setCompleter(self.search_completer)
+        
         # 移除文本变化事件的自动搜索
         # 只在回车键时触发搜索
         
@@ -663,13 +769,23 @@ class MainWindow(QMainWindow):
         
         # 停止当前正在运行的搜索线程
         if self.search_thread and self.search_thread.isRunning():
+            self.search_thread.cancel()
             self.search_thread.quit()
             self.search_thread.wait()
         
+        # 解析文件搜索的查询语言（ext:、path:、size:、modified:、OR、NOT等），语法错误时只搜索按钮
+        try:
+            query = parse_query(text)
+        except QuerySyntaxError as e:
+            self.statusBar().showMessage(f"查询语法错误: {e}", 3000)
+            query = None
+        
         # 创建并启动新的搜索线程
         button_names = [btn.text() for btn in self.buttons]
-        self.search_thread = SearchThread(button_names, text, triggered_by_return)
+        self.search_thread = SearchThread(button_names, text, triggered_by_return, query)
         self.search_thread.search_completed.connect(self.on_search_completed)
+        self.search_thread.file_results_batch.connect(self.on_file_results_batch)
+        self.search_thread.file_search_finished.connect(self.on_file_search_finished)
         self.search_thread.start()
     
     def on_search_completed(self, results, search_text, triggered_by_return, button_search_time):
@@ -681,7 +797,6 @@ class MainWindow(QMainWindow):
             triggered_by_return: 是否由回车键触发
             button_search_time: 按钮搜索所用时间(秒)
         """
-        import time
         # 检查搜索文本是否与当前输入一致，避免显示过时结果
         if search_text != self.search_input.text():
             return
@@ -695,40 +810,69 @@ class MainWindow(QMainWindow):
             else:
                 btn.hide()
         
-        # 搜索整个电脑
-        file_search_start_time = time.time()
-        try:
-            logger.info(f"开始文件搜索: {search_text}")
-            
-            # 使用缓存搜索（不指定目录）
-            self.file_search_results = search_files(keyword=search_text, depth=3)
-            
-            logger.info(f"文件搜索结果: {len(self.file_search_results)} 个文件")
-        except Exception as e:
-            logger.error(f"文件搜索失败: {e}")
-            self.file_search_results = []
+        self.setUpdatesEnabled(True)  # 启用UI更新
         
-        file_search_time = time.time() - file_search_start_time
-        total_search_time = button_search_time + file_search_time
-        logger.info(f"搜索时间 - 按钮: {button_search_time:.3f}秒, 文件: {file_search_time:.3f}秒, 总计: {total_search_time:.3f}秒")
+        # 文件搜索在搜索线程中继续进行，结果通过on_file_results_batch和on_file_search_finished送达
+        self.button_search_results = results
+        self.button_search_time = button_search_time
+        self.search_triggered_by_return = triggered_by_return
+        self.file_search_results = []
+    
+    def _show_search_results_window(self):
+        """显示搜索结果窗口（不存在或已关闭时新建），并隐藏主窗口"""
+        if not hasattr(self, "search_results_window") or not self.search_results_window.isVisible():
+            self.search_results_window = SearchResultsWindow(self)
+            # 连接窗口关闭信号
+            self.search_results_window.window_closed.connect(self.on_search_results_closed)
+        self.search_results_window.show()
+        self.search_results_window.raise_()  # 确保窗口在最前面
+        # 隐藏主窗口
+        self.hide()
+        return self.search_results_window
+    
+    def on_file_results_batch(self, search_text, file_paths):
+        """收到一批文件搜索结果，立即追加到结果窗口
         
-        self.setUpdatesEnabled(True)  # 启用UI更新
+        Args:
+            search_text: 搜索文本
+            file_paths: 本批匹配的文件路径
+        """
+        # 检查搜索文本是否与当前输入一致，避免显示过时结果
+        if search_text != self.search_input.text():
+            return
+        
+        if not self.file_search_results:
+            # 首批结果：清空上一次的结果
+            self._show_search_results_window().set_search_results([])
+        self.file_search_results.extend(file_paths)
+        self.search_results_window.append_search_results(file_paths)
+    
+    def on_file_search_finished(self, search_text, file_results, file_search_time):
+        """文件搜索完成，用按相关度排序的结果替换流式结果
+        
+        Args:
+            search_text: 搜索文本
+            file_results: 按相关度排序的文件搜索结果（ResultView，结果窗口按页取出路径）
+            file_search_time: 文件搜索所用时间(秒)
+        """
+        if search_text != self.search_input.text():
+            return
+        
+        total_search_time = self.button_search_time + file_search_time
+        logger.info(f"搜索时间 - 按钮: {self.button_search_time:.3f}秒, 文件: {file_search_time:.3f}秒, 总计: {total_search_time:.3f}秒")
+        
+        streamed = bool(self.file_search_results)
+        self.file_search_results = file_results
         
         # 如果有文件搜索结果，在新窗口中显示
         if self.file_search_results:
-            # 在新窗口中显示搜索结果
-            if not hasattr(self, "search_results_window") or not self.search_results_window.isVisible():
-                self.search_results_window = SearchResultsWindow(self)
-                # 连接窗口关闭信号
-                self.search_results_window.window_closed.connect(self.on_search_results_closed)
-            self.search_results_window.set_search_results(self.file_search_results, total_search_time)
-            self.search_results_window.show()
-            self.search_results_window.raise_()  # 确保窗口在最前面
-            # 隐藏主窗口
-            self.hide()
+            self._show_search_results_window().set_search_results(self.file_search_results, total_search_time, ranked=True)
+        elif streamed:
+            self.search_results_window.set_search_results([], total_search_time)
         
         # 如果是回车键触发的搜索，根据结果数量执行不同操作
-        if triggered_by_return:
+        results = self.button_search_results
+        if self.search_triggered_by_return:
             if len(results) == 1 and len(self.file_search_results) == 0:
                 # 只有一个搜索结果，自动触发对应按钮
                 button_index = results[0]
@@ -784,6 +928,21 @@ class MainWindow(QMainWindow):
         # 当搜索框为空时，重置按钮显示
         if not self.search_input.text():
             self.reset_buttons()
+        self.update_completions(self.search_input.text())
+    
+    def update_completions(self, text):
+        """按搜索框中的文本更新自动补全的候选列表"""
+        completions = []
+        if (getattr(self, 'search_enabled', True) and text and not text.startswith(('-', '~')) and
+                not any(char.isspace() or char in AUTOCOMPLETE_SKIP_CHARS for char in text)):
+            try:
+                completions = complete_prefix(text, AUTOCOMPLETE_LIMIT)
+            except Exception as e:
+                logger.error(f"自动补全失败: {e}")
+        # 唯一的候选就是已输入的文本时不再弹出
+        if completions == [text]:
+            completions = []
+        self.completion_model.setStringList(completions)
     
     def on_button_clicked(self, button_id):
         """按钮点击事件"""
@@ -882,4 +1041,9 @@ class MainWindow(QMainWindow):
         # 停止定时器
         if hasattr(self, 'timer') and self.timer.isActive():
             self.timer.stop()
+        # 取消正在进行的文件搜索与后台预扫描
+        if self.search_thread and self.search_thread.isRunning():
+            self.search_thread.cancel()
+            self.search_thread.wait()
+        self.pre_scan_cancel_token.cancel()
         event.accept()